@@ -0,0 +1,710 @@
+#!/usr/bin/env python3
+"""
+Generador de carga y medidor de latencia para el servidor de la placa.
+
+Simula varios equipos que envían actualizaciones a un ritmo fijo y mide el
+tiempo hasta recibir el eco de cada mensaje. Cada mensaje lleva un número
+de secuencia en "bench_seq" para emparejarlo con su respuesta, los que no
+reciben respuesta a tiempo se cuentan como perdidos.
+
+Modos de conexión:
+    per-message: una conexión TCP por mensaje, como los clientes antiguos.
+    persistent: una conexión TCP por equipo con mensajes separados por
+                salto de línea.
+    websocket: una conexión WebSocket por equipo.
+
+Con --format binary las conexiones persistentes negocian con un saludo el
+registro binario de src/Models/MessageDecoder.py. Con --acks (siempre en
+binario) el servidor confirma cada lectura con el seq del último mensaje
+atendido en lugar de devolver cada mensaje, y --batch agrupa varios
+mensajes en un mismo envío. Con --delta N solo uno de cada N mensajes es
+completo y el resto llevan únicamente los campos que cambian; --skip
+descarta deltas al azar para provocar peticiones de resync.
+
+Sin --host ni --port se conecta al emulador en 127.0.0.1:8080. Para medir
+la placa se indica su IP y el puerto 80.
+
+Ejemplo:
+    python3 Debug/benchmark.py --host 127.0.0.1 --port 8080 --devices 4 \\
+        --rate 5 --duration 30 --mode persistent --output build.json \\
+        --baseline baseline.json
+"""
+import argparse
+import base64
+import datetime
+import json
+import os
+import random
+import socket
+import struct
+import threading
+import time
+
+
+# Registro binario, mismo formato que src/Models/MessageDecoder.py
+RECORD_MAGIC = 0xB1
+RECORD_HEADER = '>BBIIIIH'
+RECORD_FLAGS = 0x3F  # Todos los campos presentes
+RECORD_DELTA_FLAGS = 0x52  # Delta con pulsations_current y time
+ACK_MAGIC = 0xA1
+ACK_FORMAT = '>BI'
+
+
+def make_record (device_id, seq, delta=False):
+    """
+    Crea un registro binario con los mismos campos que make_payload().
+
+    Returns:
+        bytes: Registro de 63 bytes.
+    """
+    flags = RECORD_DELTA_FLAGS if delta else RECORD_FLAGS
+    header = struct.pack(RECORD_HEADER, RECORD_MAGIC, flags, seq,
+                         device_id, random.randint(6000, 30000),
+                         random.randint(140, 1200),
+                         random.randint(1, 400) * 10)
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime(
+        '%Y-%m-%d %H:%M:%S').encode()
+    now = datetime.datetime.now().strftime('%H:%M:%S').encode()
+
+    return header + timestamp + now + b'Benchmark'.ljust(16, b'\0')
+
+
+def read_ack (payload):
+    """
+    Returns:
+        int|None: Número de secuencia de una confirmación corta, binaria o
+                  {"ack": seq}.
+    """
+    if len(payload) == struct.calcsize(ACK_FORMAT) and payload[0] == ACK_MAGIC:
+        return struct.unpack(ACK_FORMAT, payload)[1]
+
+    try:
+        return json.loads(payload).get('ack')
+    except (ValueError, AttributeError):
+        return None
+
+
+def make_payload (device_id, seq, size, acks=False, delta=False):
+    """
+    Crea un mensaje como los de los equipos, relleno hasta el tamaño pedido.
+
+    Args:
+        device_id (int): Identificador del equipo simulado.
+        seq (int): Número de secuencia del mensaje.
+        size (int): Tamaño mínimo del mensaje en bytes.
+        acks (bool): Añade "seq" para las confirmaciones cortas y los
+                     deltas.
+        delta (bool): Solo los campos que cambian en cada mensaje.
+
+    Returns:
+        bytes: Mensaje JSON sin salto de línea.
+    """
+    data = {
+        'device_id': device_id,
+        'session': {
+            'pulsations_total': random.randint(6000, 30000)
+        },
+        'streak': {
+            'pulsations_current': random.randint(140, 1200),
+            'pulsation_average': random.randint(1, 400)
+        },
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).strftime(
+            '%Y-%m-%d %H:%M:%S'),
+        'time': datetime.datetime.now().strftime('%H:%M:%S'),
+        'system': {
+            'so': 'Benchmark',
+        },
+        'bench_seq': seq,
+    }
+
+    if acks or delta:
+        data['seq'] = seq
+
+    if delta:
+        data['delta'] = True
+
+        for name in ('session', 'timestamp', 'system'):
+            del data[name]
+
+        del data['streak']['pulsation_average']
+
+    payload = json.dumps(data)
+    missing = size - len(payload) - len(', "padding": ""')
+
+    if missing > 0:
+        data['padding'] = 'x' * missing
+        payload = json.dumps(data)
+
+    return payload.encode('utf-8')
+
+
+def read_seq (payload):
+    """
+    Returns:
+        int|None: Número de secuencia de una respuesta.
+    """
+    try:
+        return json.loads(payload).get('bench_seq')
+    except (ValueError, AttributeError):
+        return None
+
+
+def percentile (values, percent):
+    """
+    Percentil por rango más cercano de una lista ordenada.
+    """
+    if not values:
+        return None
+
+    index = max(0, min(len(values) - 1,
+                       int(round(percent / 100 * len(values) + 0.5)) - 1))
+
+    return values[index]
+
+
+class WebSocketClient:
+    """
+    Cliente WebSocket mínimo (RFC 6455) para frames de texto.
+    """
+
+    def __init__ (self, sock, host, port):
+        self.sock = sock
+        self.buffer = b''
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = ('GET / HTTP/1.1\r\n'
+                   'Host: %s:%d\r\n'
+                   'Upgrade: websocket\r\n'
+                   'Connection: Upgrade\r\n'
+                   'Sec-WebSocket-Key: %s\r\n'
+                   'Sec-WebSocket-Version: 13\r\n\r\n') % (host, port, key)
+        sock.sendall(request.encode())
+
+        while b'\r\n\r\n' not in self.buffer:
+            chunk = sock.recv(1024)
+
+            if not chunk:
+                raise ConnectionError('Handshake cerrado por el servidor')
+
+            self.buffer += chunk
+
+        head, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
+
+        if b' 101 ' not in head.split(b'\r\n', 1)[0]:
+            raise ConnectionError('Handshake rechazado: ' + repr(head[:40]))
+
+    def send (self, payload, opcode=0x1):
+        mask = os.urandom(4)
+        size = len(payload)
+        header = bytearray((0x80 | opcode,))
+
+        if size < 126:
+            header.append(0x80 | size)
+        elif size < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack('>H', size)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack('>Q', size)
+
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(bytes(header) + mask + masked)
+
+    def messages (self, chunk):
+        """
+        Añade los bytes recibidos y devuelve los mensajes completos.
+        """
+        self.buffer += chunk
+        messages = []
+
+        while len(self.buffer) >= 2:
+            opcode = self.buffer[0] & 0x0F
+            size = self.buffer[1] & 0x7F
+            offset = 2
+
+            if size == 126:
+                if len(self.buffer) < 4:
+                    break
+
+                size = struct.unpack('>H', self.buffer[2:4])[0]
+                offset = 4
+            elif size == 127:
+                if len(self.buffer) < 10:
+                    break
+
+                size = struct.unpack('>Q', self.buffer[2:10])[0]
+                offset = 10
+
+            if len(self.buffer) < offset + size:
+                break
+
+            payload = self.buffer[offset:offset + size]
+            self.buffer = self.buffer[offset + size:]
+
+            if opcode == 0x8:
+                raise ConnectionError('Cierre WebSocket')
+
+            if opcode in (0x1, 0x2):
+                messages.append(payload)
+
+        return messages
+
+
+class Device(threading.Thread):
+    """
+    Equipo simulado que envía mensajes a un ritmo fijo.
+    """
+
+    def __init__ (self, device_id, args, start_at):
+        super().__init__(daemon=True)
+        self.device_id = device_id
+        self.args = args
+        self.start_at = start_at
+
+        self.lock = threading.Lock()
+        self.in_flight = {}  # seq -> instante de envío
+        self.latencies = []
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+        self.connections = 0
+
+        # Peticiones de un mensaje completo recibidas del servidor
+        self.resyncs = 0
+        self.force_full = False
+
+    def schedule (self):
+        """
+        Genera los números de secuencia en instantes fijos: si un envío se
+        retrasa, los siguientes no se desplazan (carga abierta).
+        """
+        interval = 1 / self.args.rate
+        # Desfase aleatorio para no enviar todos los equipos a la vez
+        next_send = self.start_at + random.random() * interval
+        end = self.start_at + self.args.duration
+        seq = 0
+
+        while next_send < end:
+            wait = next_send - time.perf_counter()
+
+            if wait > 0:
+                time.sleep(wait)
+
+            yield seq
+            seq += 1
+            next_send += interval
+
+    def connect (self):
+        sock = socket.create_connection((self.args.host, self.args.port),
+                                        timeout=self.args.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connections += 1
+
+        return sock
+
+    def ack (self, seq, now):
+        with self.lock:
+            sent_at = self.in_flight.pop(seq, None)
+
+            if sent_at is not None:
+                self.acked += 1
+                self.latencies.append((now - sent_at) * 1000)
+
+    def ack_upto (self, seq, now):
+        """
+        Confirmación acumulada: da por recibidos todos los mensajes hasta
+        seq.
+        """
+        with self.lock:
+            for pending in [s for s in self.in_flight if s <= seq]:
+                sent_at = self.in_flight.pop(pending)
+                self.acked += 1
+                self.latencies.append((now - sent_at) * 1000)
+
+    def run (self):
+        if self.args.mode == 'per-message':
+            self.run_per_message()
+        else:
+            self.run_persistent()
+
+    def run_per_message (self):
+        for seq in self.schedule():
+            payload = make_payload(self.device_id, seq, self.args.size)
+            self.sent += 1
+
+            try:
+                with self.connect() as sock:
+                    sent_at = time.perf_counter()
+                    self.in_flight[seq] = sent_at
+                    sock.sendall(payload)
+
+                    reply = b''
+
+                    while not reply.endswith(b'\n'):
+                        chunk = sock.recv(4096)
+
+                        if not chunk:
+                            break
+
+                        reply += chunk
+
+                    if read_seq(reply) == seq:
+                        self.ack(seq, time.perf_counter())
+            except OSError:
+                self.errors += 1
+
+    def hello (self, sock, ws):
+        """
+        Negocia el formato y las confirmaciones cortas y espera la respuesta
+        del servidor.
+        """
+        hello = json.dumps({'hello': 1, 'format': self.args.format,
+                            'acks': True}).encode()
+
+        if ws:
+            ws.send(hello)
+            replies = []
+
+            while not replies:
+                chunk = sock.recv(4096)
+
+                if not chunk:
+                    raise ConnectionError('Saludo cerrado por el servidor')
+
+                replies = ws.messages(chunk)
+
+            reply = replies[0]
+        else:
+            sock.sendall(hello + b'\n')
+            reply = b''
+
+            while not reply.endswith(b'\n'):
+                chunk = sock.recv(1)
+
+                if not chunk:
+                    raise ConnectionError('Saludo cerrado por el servidor')
+
+                reply += chunk
+
+        reply = json.loads(reply)
+
+        if reply.get('format') != self.args.format or not reply.get('acks'):
+            raise ConnectionError('El servidor no acepta el formato pedido')
+
+    def frame (self, payloads):
+        """
+        Une los mensajes pendientes en un único envío: un array JSON o
+        registros binarios seguidos.
+        """
+        if self.args.format == 'binary':
+            return b''.join(payloads)
+
+        if len(payloads) == 1:
+            return payloads[0]
+
+        return b'[' + b','.join(payloads) + b']'
+
+    def send_frame (self, sock, ws, frame):
+        if ws:
+            ws.send(frame, 0x2 if self.args.format == 'binary' else 0x1)
+        elif self.args.format == 'binary':
+            sock.sendall(struct.pack('>I', len(frame)) + frame)
+        else:
+            sock.sendall(frame + b'\n')
+
+    def run_persistent (self):
+        sock = None
+        ws = None
+        receiver = None
+        binary = self.args.format == 'binary'
+        negotiate = binary or self.args.acks
+        pending = []  # [(seq, mensaje)] a la espera de completar el lote
+
+        for seq in self.schedule():
+            delta = self.args.delta > 1 and seq % self.args.delta != 0 \
+                and not self.force_full
+
+            # Deltas perdidos a propósito: el servidor verá el hueco
+            if delta and random.random() < self.args.skip:
+                continue
+
+            if not delta:
+                self.force_full = False
+
+            if binary:
+                payload = make_record(self.device_id, seq, delta)
+            else:
+                payload = make_payload(self.device_id, seq, self.args.size,
+                                       self.args.acks or self.args.delta > 1,
+                                       delta)
+
+            self.sent += 1
+            pending.append((seq, payload))
+
+            if len(pending) < self.args.batch:
+                continue
+
+            try:
+                if sock is None:
+                    sock = self.connect()
+
+                    if self.args.mode == 'websocket':
+                        ws = WebSocketClient(sock, self.args.host,
+                                             self.args.port)
+
+                    if negotiate:
+                        self.hello(sock, ws)
+
+                    receiver = threading.Thread(target=self.receive,
+                                                args=(sock, ws), daemon=True)
+                    receiver.start()
+
+                self.flush(sock, ws, pending)
+            except OSError:
+                self.errors += 1
+
+                if sock is not None:
+                    sock.close()
+                    sock = None
+
+            pending = []
+
+        # Último lote incompleto
+        if pending and sock is not None:
+            try:
+                self.flush(sock, ws, pending)
+            except OSError:
+                self.errors += 1
+
+        # Esperamos las últimas respuestas antes de cerrar
+        deadline = time.perf_counter() + self.args.timeout
+
+        while self.in_flight and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+        if sock is not None:
+            sock.close()
+
+    def flush (self, sock, ws, pending):
+        now = time.perf_counter()
+
+        with self.lock:
+            for seq, _ in pending:
+                self.in_flight[seq] = now
+
+        self.send_frame(sock, ws, self.frame([p for _, p in pending]))
+
+    def receive (self, sock, ws):
+        buffer = b''
+        binary = self.args.format == 'binary'
+        acks = binary or self.args.acks
+        sock.settimeout(None)
+
+        try:
+            while True:
+                chunk = sock.recv(4096)
+                now = time.perf_counter()
+
+                if not chunk:
+                    return
+
+                if ws:
+                    replies = ws.messages(chunk)
+                elif binary:
+                    # Respuestas precedidas por su longitud en 4 bytes
+                    buffer += chunk
+                    replies = []
+
+                    while len(buffer) >= 4:
+                        size = struct.unpack('>I', buffer[:4])[0]
+
+                        if len(buffer) < 4 + size:
+                            break
+
+                        replies.append(buffer[4:4 + size])
+                        buffer = buffer[4 + size:]
+                else:
+                    buffer += chunk
+                    *replies, buffer = buffer.split(b'\n')
+
+                for reply in replies:
+                    if reply.startswith(b'{"resync"'):
+                        self.resyncs += 1
+                        self.force_full = True
+                        continue
+
+                    if acks:
+                        seq = read_ack(reply)
+
+                        if seq is not None:
+                            self.ack_upto(seq, now)
+                    else:
+                        seq = read_seq(reply)
+
+                        if seq is not None:
+                            self.ack(seq, now)
+        except (OSError, ConnectionError):
+            return
+
+
+def run_benchmark (args):
+    start_at = time.perf_counter() + 0.1
+    devices = [Device(args.first_device_id + i, args, start_at)
+               for i in range(args.devices)]
+
+    for device in devices:
+        device.start()
+
+    for device in devices:
+        device.join()
+
+    elapsed = time.perf_counter() - start_at
+    latencies = sorted(l for device in devices for l in device.latencies)
+    sent = sum(device.sent for device in devices)
+    acked = sum(device.acked for device in devices)
+    errors = sum(device.errors for device in devices)
+
+    return {
+        'label': args.label,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'config': {
+            'host': args.host,
+            'port': args.port,
+            'mode': args.mode,
+            'format': args.format,
+            'acks': args.acks or args.format == 'binary',
+            'batch': args.batch,
+            'delta': args.delta,
+            'skip': args.skip,
+            'devices': args.devices,
+            'rate': args.rate,
+            'size': args.size,
+            'duration': args.duration,
+            'timeout': args.timeout,
+        },
+        'sent': sent,
+        'acked': acked,
+        'lost': sent - acked,
+        'errors': errors,
+        'connections': sum(device.connections for device in devices),
+        'resyncs': sum(device.resyncs for device in devices),
+        'error_rate': errors / sent if sent else 0,
+        'loss_rate': (sent - acked) / sent if sent else 0,
+        'offered_per_s': sent / elapsed,
+        'throughput_per_s': acked / elapsed,
+        'latency_ms': {
+            'min': latencies[0] if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+        },
+    }
+
+
+def flatten (results):
+    """
+    Métricas numéricas para comparar con una ejecución de referencia.
+    """
+    metrics = {
+        'throughput_per_s': results['throughput_per_s'],
+        'loss_rate': results['loss_rate'],
+        'error_rate': results['error_rate'],
+    }
+
+    for name, value in results['latency_ms'].items():
+        metrics['latency_' + name + '_ms'] = value
+
+    return metrics
+
+
+def print_results (results, baseline=None):
+    current = flatten(results)
+    reference = flatten(baseline) if baseline else {}
+
+    print('Modo %s (%s), %d equipos a %s msg/s, %d bytes, %ss' % (
+        results['config']['mode'], results['config'].get('format', 'json'),
+        results['config']['devices'],
+        results['config']['rate'], results['config']['size'],
+        results['config']['duration']))
+    print('Enviados: %d  Confirmados: %d  Perdidos: %d  Errores: %d' % (
+        results['sent'], results['acked'], results['lost'], results['errors']))
+
+    if results.get('resyncs'):
+        print('Mensajes completos pedidos por el servidor: %d' %
+              results['resyncs'])
+
+    for name, value in current.items():
+        line = '  %-20s %12s' % (name, 'N/A' if value is None
+                                  else '%.3f' % value)
+        base = reference.get(name)
+
+        if base is not None and value is not None:
+            change = (value - base) / base * 100 if base else 0
+            line += '   referencia %10.3f  (%+.1f%%)' % (base, change)
+
+        print(line)
+
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Dirección del servidor. Por defecto el '
+                             'emulador en este ordenador; para la placa, '
+                             'su IP')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='Puerto del servidor. Por defecto el del '
+                             'emulador (Emulation/run.py --port); la placa '
+                             'escucha en el 80')
+    parser.add_argument('--mode', default='persistent',
+                        choices=('per-message', 'persistent', 'websocket'))
+    parser.add_argument('--format', default='json', choices=('json', 'binary'),
+                        help='Formato de los mensajes en las conexiones '
+                             'persistentes')
+    parser.add_argument('--acks', action='store_true',
+                        help='Confirmaciones cortas con seq en lugar del eco')
+    parser.add_argument('--batch', type=int, default=1,
+                        help='Mensajes por envío')
+    parser.add_argument('--delta', type=int, default=1,
+                        help='Uno de cada N mensajes es completo, el resto '
+                             'deltas')
+    parser.add_argument('--skip', type=float, default=0,
+                        help='Probabilidad de no enviar un delta')
+    parser.add_argument('--devices', type=int, default=2,
+                        help='Número de equipos simulados')
+    parser.add_argument('--first-device-id', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=1,
+                        help='Mensajes por segundo de cada equipo')
+    parser.add_argument('--size', type=int, default=0,
+                        help='Tamaño mínimo de cada mensaje en bytes')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Segundos enviando mensajes')
+    parser.add_argument('--timeout', type=float, default=2,
+                        help='Segundos de espera para cada respuesta')
+    parser.add_argument('--label', default='', help='Nombre de la ejecución')
+    parser.add_argument('--output', help='Guarda los resultados como JSON')
+    parser.add_argument('--baseline', help='Resultados JSON de referencia')
+    args = parser.parse_args()
+
+    if args.mode == 'per-message' and (args.format == 'binary' or args.acks
+                                        or args.batch > 1 or args.delta > 1):
+        parser.error('El formato binario, las confirmaciones cortas, los '
+                     'lotes y los deltas necesitan una conexión persistente')
+
+    results = run_benchmark(args)
+    baseline = None
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
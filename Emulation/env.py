@@ -0,0 +1,26 @@
+# Configuración para ejecutar el firmware en el emulador (ver run.py)
+
+# Wireless: red que anuncia el sustituto de network
+AP_NAME = "Emulation"
+AP_PASS = "emulation"
+ALTERNATIVES_AP = []
+
+# Datos para la API
+API_URL = "http://127.0.0.1:8000/api/v1"
+API_PATH = "ink/resume"
+API_TOKEN = "apitoken"
+API_CACHE_MINUTES = 15 # Minutos antes de revalidar el listado de equipos
+
+# Nombre del equipo para identificarlo en la api, id y nombre.
+DEVICE_ID = 1
+
+# Configuración de la pantalla.
+TIME_TO_DISPLAY_OFF = 10 # Minutos para apagar la pantalla automáticamente
+DISPLAY_FPS = 10 # Fotogramas por segundo máximos al dibujar
+DISPLAY_DEVICES = 8 # Equipos en las páginas de la pantalla, dos por página
+
+# Estado guardado en la flash para mostrarlo nada más arrancar
+SNAPSHOT_WRITES_PER_HOUR = 12 # Escrituras máximas por hora en la flash
+
+# Indica si está en modo debug la aplicación
+DEBUG = False
@@ -0,0 +1,130 @@
+"""
+Sustituto de framebuf con los formatos que usa el firmware: GS8 (un byte
+por píxel, como el framebuffer P8 de PicoGraphics) y MONO_HLSB.
+"""
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+class FrameBuffer:
+    def __init__ (self, buffer, width, height, format, stride=None):
+        if format not in (GS8, MONO_HLSB):
+            raise ValueError('Formato no emulado')
+
+        self.buffer = memoryview(buffer).cast('B')
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = width if stride is None else stride
+
+        if format == GS8:
+            needed = (height - 1) * self.stride + width
+        else:
+            needed = ((self.stride + 7) // 8) * height
+
+        if len(self.buffer) < needed:
+            raise ValueError('buffer too small')
+
+    def pixel (self, x, y, color=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+
+        if self.format == GS8:
+            index = y * self.stride + x
+
+            if color is None:
+                return self.buffer[index]
+
+            self.buffer[index] = color & 0xff
+            return
+
+        index = y * ((self.stride + 7) // 8) + (x >> 3)
+        bit = 0x80 >> (x & 7)
+
+        if color is None:
+            return 1 if self.buffer[index] & bit else 0
+
+        if color:
+            self.buffer[index] |= bit
+        else:
+            self.buffer[index] &= ~bit & 0xff
+
+    def fill_rect (self, x, y, width, height, color):
+        x0 = max(0, x)
+        x1 = min(self.width, x + width)
+
+        for row in range(max(0, y), min(self.height, y + height)):
+            if self.format == GS8:
+                start = row * self.stride
+                self.buffer[start + x0:start + x1] = bytes((color,)) * max(0, x1 - x0)
+            else:
+                for column in range(x0, x1):
+                    self.pixel(column, row, color)
+
+    def fill (self, color):
+        self.fill_rect(0, 0, self.width, self.height, color)
+
+    def hline (self, x, y, width, color):
+        self.fill_rect(x, y, width, 1, color)
+
+    def vline (self, x, y, height, color):
+        self.fill_rect(x, y, 1, height, color)
+
+    def rect (self, x, y, width, height, color, fill=False):
+        if fill:
+            self.fill_rect(x, y, width, height, color)
+            return
+
+        self.hline(x, y, width, color)
+        self.hline(x, y + height - 1, width, color)
+        self.vline(x, y, height, color)
+        self.vline(x + width - 1, y, height, color)
+
+    def scroll (self, xstep, ystep):
+        rows = range(self.height) if ystep <= 0 else range(self.height - 1, -1, -1)
+
+        for y in rows:
+            source_y = y - ystep
+
+            if not 0 <= source_y < self.height:
+                continue
+
+            if self.format == GS8:
+                # Como en MicroPython, la zona que queda libre no se limpia
+                x0 = max(0, xstep)
+                x1 = min(self.width, self.width + xstep)
+
+                if x1 > x0:
+                    target = y * self.stride
+                    source = source_y * self.stride
+                    self.buffer[target + x0:target + x1] = bytes(
+                        self.buffer[source + x0 - xstep:source + x1 - xstep])
+                continue
+
+            columns = range(self.width) if xstep <= 0 else range(self.width - 1, -1, -1)
+
+            for x in columns:
+                source_x = x - xstep
+
+                if 0 <= source_x < self.width:
+                    self.pixel(x, y, self.pixel(source_x, source_y))
+
+    def blit (self, source, x, y, key=-1, palette=None):
+        for sy in range(source.height):
+            for sx in range(source.width):
+                color = source.pixel(sx, sy)
+
+                # Como en MicroPython, la clave se compara con el color ya
+                # traducido por la paleta
+                if palette is not None:
+                    color = palette.pixel(color, 0)
+
+                if color == key:
+                    continue
+
+                self.pixel(x + sx, y + sy, color)
@@ -0,0 +1,173 @@
+"""
+Sustituto de machine para el RP2040.
+
+Los Timer se ejecutan en hilos de threading, como las interrupciones
+blandas de MicroPython, y los Pin permiten simular flancos con
+Pin.simulate() para probar los botones.
+"""
+import threading
+import time as _time
+
+_pins = {}
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__ (self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self.handler = None
+        self.trigger = 0
+        self._value = 1 if pull == Pin.PULL_UP else 0
+
+        if value is not None:
+            self._value = value
+
+        _pins[id] = self
+
+    @staticmethod
+    def get (id):
+        """
+        Returns:
+            Pin|None: Último Pin creado con ese identificador.
+        """
+        return _pins.get(id)
+
+    def init (self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        self.pull = pull
+
+        if value is not None:
+            self._value = value
+
+    def value (self, value=None):
+        if value is None:
+            return self._value
+
+        self._value = 1 if value else 0
+
+    def __call__ (self, value=None):
+        return self.value(value)
+
+    def on (self):
+        self._value = 1
+
+    def off (self):
+        self._value = 0
+
+    def toggle (self):
+        self._value ^= 1
+
+    def irq (self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def simulate (self, value):
+        """
+        Cambia el nivel del pin desde fuera y dispara la interrupción si
+        corresponde, como haría una pulsación real.
+        """
+        old = self._value
+        self._value = 1 if value else 0
+
+        if old == self._value or self.handler is None:
+            return
+
+        edge = Pin.IRQ_RISING if self._value else Pin.IRQ_FALLING
+
+        if self.trigger & edge:
+            self.handler(self)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__ (self, id=-1, mode=PERIODIC, period=-1, freq=None,
+                  callback=None):
+        self._timer = None
+        self._lock = threading.Lock()
+
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init (self, mode=PERIODIC, period=-1, freq=None, callback=None):
+        self.deinit()
+
+        if freq:
+            period = 1000 / freq
+
+        self.mode = mode
+        self.period = period
+        self.callback = callback
+        self._schedule()
+
+    def _schedule (self):
+        with self._lock:
+            self._timer = threading.Timer(self.period / 1000, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire (self):
+        if self.mode == Timer.PERIODIC:
+            self._schedule()
+
+        if self.callback:
+            self.callback(self)
+
+    def deinit (self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    # Lectura del sensor interno equivalente a unos 27 ºC
+    TEMP_READING = 14022
+
+    def __init__ (self, pin):
+        self.pin = pin
+        self.reading = self.TEMP_READING if pin == self.CORE_TEMP else 0
+
+    def read_u16 (self):
+        return self.reading
+
+
+_freq = 125000000
+
+
+def freq (hz=None):
+    global _freq
+
+    if hz is None:
+        return _freq
+
+    _freq = hz
+
+
+def unique_id ():
+    return b'\xe6\x61\x38\x52\x43\x5e\x2a\x2e'
+
+
+def idle ():
+    _time.sleep(0)
+
+
+def lightsleep (ms=None):
+    if ms:
+        _time.sleep(ms / 1000)
+
+
+def reset ():
+    raise SystemExit('machine.reset()')
@@ -0,0 +1,128 @@
+"""
+Sustituto de network para el CYW43 del Pico W.
+
+La interfaz se "conecta" al instante a cualquier red de NETWORKS y usa la
+dirección de loopback, de modo que los servidores y clientes del firmware
+funcionan en el ordenador.
+"""
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+STAT_CONNECT_FAIL = -1
+STAT_NO_AP_FOUND = -2
+STAT_WRONG_PASSWORD = -3
+
+# Redes visibles: (ssid, bssid, canal, RSSI, seguridad, oculta)
+NETWORKS = [
+    (b'Emulation', b'\x02\x00\x00\x00\x00\x01', 6, -40, 3, 0),
+]
+
+IFCONFIG = ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
+
+# Con False el punto de acceso desaparece, para simular cortes del enlace
+LINK_UP = True
+
+_hostname = 'PicoW'
+_country = 'XX'
+
+
+def hostname (name=None):
+    global _hostname
+
+    if name is None:
+        return _hostname
+
+    _hostname = name
+
+
+def country (code=None):
+    global _country
+
+    if code is None:
+        return _country
+
+    _country = code
+
+
+class WLAN:
+    PM_NONE = 0x000010
+    PM_PERFORMANCE = 0xa11142
+    PM_POWERSAVE = 0x111022
+
+    def __init__ (self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._status = STAT_IDLE
+        self._config = {
+            'mac': b'\x28\xcd\xc1\x00\x00\x01',
+            'essid': '',
+            'channel': 0,
+            'txpower': 31,
+            'pm': self.PM_PERFORMANCE,
+        }
+
+    def active (self, state=None):
+        if state is None:
+            return self._active
+
+        self._active = bool(state)
+
+        if not self._active:
+            self._status = STAT_IDLE
+
+    def scan (self):
+        return list(NETWORKS)
+
+    def connect (self, ssid=None, key=None, bssid=None):
+        if not LINK_UP:
+            self._status = STAT_NO_AP_FOUND
+            return
+
+        for network in NETWORKS:
+            if network[0].decode() == ssid and (bssid is None
+                                                or network[1] == bssid):
+                self._config['essid'] = ssid
+                self._config['channel'] = network[2]
+                self._status = STAT_GOT_IP
+                return
+
+        self._status = STAT_NO_AP_FOUND
+
+    def disconnect (self):
+        self._status = STAT_IDLE
+
+    def isconnected (self):
+        if not LINK_UP and self._status == STAT_GOT_IP:
+            self._status = STAT_IDLE
+
+        return self._active and self._status == STAT_GOT_IP
+
+    def status (self, param=None):
+        if param == 'rssi':
+            return NETWORKS[0][3] if NETWORKS else 0
+
+        self.isconnected()
+
+        return self._status
+
+    def ifconfig (self, config=None):
+        if config is None:
+            return IFCONFIG if self.isconnected() else ('0.0.0.0',) * 4
+
+    def config (self, *args, **kwargs):
+        if args:
+            name = args[0]
+
+            if name == 'hostname':
+                return _hostname
+
+            return self._config[name]
+
+        for name, value in kwargs.items():
+            if name == 'hostname':
+                hostname(value)
+            else:
+                self._config[name] = value
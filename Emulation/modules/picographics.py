@@ -0,0 +1,260 @@
+"""
+Sustituto de picographics para la Pico Display 2 (ST7789, 320x240).
+
+Mantiene un framebuffer real: en PEN_P8 es un byte por píxel con el índice
+de la paleta, igual que en la placa, y el objeto expone el protocolo buffer
+para que memoryview(display) y framebuf funcionen. update() copia el
+framebuffer a la "pantalla" (front), que es lo que se guarda con save().
+
+Las fuentes bitmap no se reproducen: cada carácter se dibuja con un patrón
+determinista del tamaño de la fuente, suficiente para medir y comparar
+fotogramas. Cada primitiva registra número de llamadas y tiempo empleado,
+y cada envío a la pantalla su duración y el tiempo estimado del bus SPI.
+"""
+import time
+
+DISPLAY_PICO_DISPLAY_2 = 2
+DISPLAY_PICO_DISPLAY = 1
+
+PEN_P4 = 2
+PEN_P8 = 3
+PEN_RGB332 = 4
+PEN_RGB565 = 5
+
+# Frecuencia del bus SPI de la pantalla, para estimar el coste de update()
+SPI_HZ = 62500000
+
+# Ancho y alto del glifo sin escalar por fuente
+FONTS = {
+    'bitmap6': (5, 6),
+    'bitmap8': (5, 8),
+    'bitmap14_outline': (9, 14),
+    'bitmap16': (8, 16),
+}
+
+# Pantallas creadas, para que el lanzador pueda leer sus estadísticas
+INSTANCES = []
+
+_SIZES = {
+    DISPLAY_PICO_DISPLAY: (240, 135),
+    DISPLAY_PICO_DISPLAY_2: (320, 240),
+}
+
+
+def _timed (method):
+    name = method.__name__
+
+    def wrapper (self, *args, **kwargs):
+        start = time.perf_counter_ns()
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._record(name, time.perf_counter_ns() - start)
+
+    wrapper.__name__ = name
+
+    return wrapper
+
+
+class PicoGraphics(bytearray):
+    def __init__ (self, display=DISPLAY_PICO_DISPLAY_2, rotate=0, bus=None,
+                  buffer=None, pen_type=PEN_RGB332):
+        if pen_type != PEN_P8:
+            raise ValueError('Solo se emula PEN_P8')
+
+        self.width, self.height = _SIZES[display]
+        super().__init__(self.width * self.height)
+
+        self.palette = [(0, 0, 0)] * 256
+        self.pens = 0
+        self.pen = 0
+        self.font = 'bitmap8'
+        self.backlight = 1.0
+
+        # Contenido enviado a la pantalla en el último update()
+        self.front = bytes(len(self))
+
+        self.calls = {}  # nombre -> [llamadas, ns]
+        self.flushes = 0
+        self.flush_ns = 0
+        self.bus_ns = 0  # Tiempo estimado de transferencia SPI
+
+        INSTANCES.append(self)
+
+    def _record (self, name, elapsed):
+        entry = self.calls.get(name)
+
+        if entry is None:
+            self.calls[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def stats (self):
+        """
+        Returns:
+            dict: Llamadas y tiempos de dibujado y envío a la pantalla.
+        """
+        return {
+            'calls': {name: {'count': count, 'us': ns // 1000}
+                      for name, (count, ns) in self.calls.items()},
+            'flushes': self.flushes,
+            'flush_us': self.flush_ns // 1000,
+            'bus_us': self.bus_ns // 1000,
+        }
+
+    def reset_stats (self):
+        self.calls = {}
+        self.flushes = 0
+        self.flush_ns = 0
+        self.bus_ns = 0
+
+    def get_bounds (self):
+        return self.width, self.height
+
+    def create_pen (self, r, g, b):
+        if self.pens >= 256:
+            raise RuntimeError('No quedan colores en la paleta')
+
+        self.palette[self.pens] = (r, g, b)
+        self.pens += 1
+
+        return self.pens - 1
+
+    def update_pen (self, index, r, g, b):
+        self.palette[index] = (r, g, b)
+
+    def set_pen (self, pen):
+        self.pen = pen
+
+    def set_font (self, font):
+        if font not in FONTS:
+            raise ValueError('Fuente desconocida: ' + str(font))
+
+        self.font = font
+
+    def set_backlight (self, brightness):
+        self.backlight = brightness
+
+    def _span (self, x, y, width):
+        if y < 0 or y >= self.height:
+            return
+
+        if x < 0:
+            width += x
+            x = 0
+
+        if x + width > self.width:
+            width = self.width - x
+
+        if width > 0:
+            start = y * self.width + x
+            self[start:start + width] = bytes((self.pen,)) * width
+
+    def _pixel (self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self[y * self.width + x] = self.pen
+
+    @_timed
+    def clear (self):
+        self[:] = bytes((self.pen,)) * len(self)
+
+    @_timed
+    def pixel (self, x, y):
+        self._pixel(x, y)
+
+    @_timed
+    def pixel_span (self, x, y, length):
+        self._span(x, y, length)
+
+    @_timed
+    def rectangle (self, x, y, width, height):
+        for row in range(y, y + height):
+            self._span(x, row, width)
+
+    @_timed
+    def circle (self, x, y, radius):
+        for dy in range(-radius, radius + 1):
+            dx = 0
+
+            while (dx + 1) * (dx + 1) + dy * dy <= radius * radius:
+                dx += 1
+
+            self._span(x - dx, y + dy, dx * 2 + 1)
+
+    @_timed
+    def line (self, x1, y1, x2, y2, thickness=1):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        error = dx + dy
+
+        while True:
+            if thickness > 1:
+                half = thickness // 2
+
+                for row in range(y1 - half, y1 - half + thickness):
+                    self._span(x1 - half, row, thickness)
+            else:
+                self._pixel(x1, y1)
+
+            if x1 == x2 and y1 == y2:
+                return
+
+            double = 2 * error
+
+            if double >= dy:
+                error += dy
+                x1 += sx
+
+            if double <= dx:
+                error += dx
+                y1 += sy
+
+    def measure_text (self, text, scale=2, spacing=1, fixed_width=False):
+        glyph_width = FONTS[self.font][0]
+
+        return len(text) * (glyph_width + spacing) * scale
+
+    @_timed
+    def text (self, text, x, y, wordwrap=-1, scale=2, angle=0, spacing=1,
+              fixed_width=False):
+        glyph_width, glyph_height = FONTS[self.font]
+        advance = (glyph_width + spacing) * scale
+
+        for char in str(text):
+            code = ord(char)
+
+            if char != ' ':
+                for gy in range(glyph_height):
+                    for gx in range(glyph_width):
+                        if (code * (gy + 3) * (gx + 7)) % 5 < 2:
+                            for sy in range(scale):
+                                self._span(x + gx * scale, y + gy * scale + sy,
+                                           scale)
+
+            x += advance
+
+    def update (self):
+        start = time.perf_counter_ns()
+        self.front = bytes(self)
+        self.flush_ns += time.perf_counter_ns() - start
+        self.flushes += 1
+
+        # RGB565 en el bus: 16 bits por píxel
+        self.bus_ns += len(self) * 16 * 1000000000 // SPI_HZ
+
+    def save (self, path):
+        """
+        Guarda lo último enviado a la pantalla como imagen PPM.
+
+        Args:
+            path (str): Ruta del fichero.
+        """
+        palette = [bytes(color) for color in self.palette]
+
+        with open(path, 'wb') as image:
+            image.write(b'P6 %d %d 255\n' % (self.width, self.height))
+            image.write(b''.join(palette[index] for index in self.front))
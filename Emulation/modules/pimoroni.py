@@ -0,0 +1,39 @@
+"""
+Sustituto de los periféricos de pimoroni usados por la Pico Display 2.
+"""
+from machine import Pin
+
+
+class Button:
+    def __init__ (self, button, invert=True, repeat_time=200, hold_time=1000):
+        self.pin = Pin(button, Pin.IN, Pin.PULL_UP if invert else Pin.PULL_DOWN)
+        self.invert = invert
+        self.pressed = False
+
+    def press (self):
+        """
+        Simula una pulsación que leerá el siguiente read().
+        """
+        self.pressed = True
+        self.pin.simulate(0 if self.invert else 1)
+        self.pin.simulate(1 if self.invert else 0)
+
+    def read (self):
+        pressed = self.pressed
+        self.pressed = False
+
+        return pressed
+
+    def raw (self):
+        return self.pin.value() == (0 if self.invert else 1)
+
+    def is_pressed (self):
+        return self.raw()
+
+
+class RGBLED:
+    def __init__ (self, r, g, b, invert=True):
+        self.color = (0, 0, 0)
+
+    def set_rgb (self, r, g, b):
+        self.color = (r, g, b)
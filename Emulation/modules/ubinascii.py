@@ -0,0 +1,4 @@
+"""
+Sustituto de ubinascii.
+"""
+from binascii import *  # noqa: F401,F403
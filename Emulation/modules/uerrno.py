@@ -0,0 +1,5 @@
+"""
+Sustituto de uerrno.
+"""
+from errno import *  # noqa: F401,F403
+from errno import errorcode  # noqa: F401
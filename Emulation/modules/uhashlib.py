@@ -0,0 +1,4 @@
+"""
+Sustituto de uhashlib.
+"""
+from hashlib import sha1, sha256  # noqa: F401
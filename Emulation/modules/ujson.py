@@ -0,0 +1,18 @@
+"""
+Sustituto de ujson. Como en MicroPython, loads() acepta cualquier buffer.
+"""
+import json as _json
+
+dumps = _json.dumps
+dump = _json.dump
+
+
+def loads (data):
+    if isinstance(data, (bytearray, memoryview)):
+        data = bytes(data)
+
+    return _json.loads(data)
+
+
+def load (stream):
+    return loads(stream.read())
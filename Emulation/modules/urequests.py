@@ -0,0 +1,92 @@
+"""
+Sustituto de urequests sobre http.client.
+
+Como en MicroPython, los errores de red se lanzan como OSError y la
+respuesta expone el stream en raw para poder leerla por partes.
+"""
+import http.client
+import json as _json
+from urllib.parse import urlsplit
+
+
+class Response:
+    def __init__ (self, raw):
+        self.raw = raw
+        self.status_code = raw.status
+        self.reason = raw.reason.encode()
+        self.headers = dict(raw.getheaders())
+        self.encoding = 'utf-8'
+        self._content = None
+
+    @property
+    def content (self):
+        if self._content is None:
+            self._content = self.raw.read()
+            self.raw.close()
+
+        return self._content
+
+    @property
+    def text (self):
+        return str(self.content, self.encoding)
+
+    def json (self):
+        return _json.loads(self.content)
+
+    def close (self):
+        self.raw.close()
+
+
+def request (method, url, data=None, json=None, headers=None, stream=None,
+             timeout=None):
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection \
+        if parts.scheme == 'https' else http.client.HTTPConnection
+    path = parts.path or '/'
+
+    if parts.query:
+        path += '?' + parts.query
+
+    headers = dict(headers or {})
+
+    if json is not None:
+        data = _json.dumps(json)
+        headers.setdefault('Content-Type', 'application/json')
+
+    if isinstance(data, str):
+        data = data.encode()
+
+    try:
+        connection = connection_class(parts.hostname, parts.port,
+                                      timeout=timeout)
+        connection.request(method, path, body=data, headers=headers)
+
+        return Response(connection.getresponse())
+    except OSError:
+        raise
+    except Exception as e:
+        raise OSError(str(e))
+
+
+def head (url, **kwargs):
+    return request('HEAD', url, **kwargs)
+
+
+def get (url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post (url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def put (url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+
+def patch (url, **kwargs):
+    return request('PATCH', url, **kwargs)
+
+
+def delete (url, **kwargs):
+    return request('DELETE', url, **kwargs)
@@ -0,0 +1,49 @@
+"""
+Sustituto de uselect. A diferencia de CPython, poll() devuelve los objetos
+registrados y no sus descriptores.
+"""
+import select as _select
+
+POLLIN = _select.POLLIN
+POLLOUT = _select.POLLOUT
+POLLERR = _select.POLLERR
+POLLHUP = _select.POLLHUP
+
+
+class poll:
+    def __init__ (self):
+        self._poll = _select.poll()
+        self._objects = {}
+
+    def register (self, obj, eventmask=POLLIN | POLLOUT):
+        fd = obj.fileno()
+        self._objects[fd] = obj
+        self._poll.register(fd, eventmask)
+
+    def modify (self, obj, eventmask):
+        self._poll.modify(obj.fileno(), eventmask)
+
+    def unregister (self, obj):
+        for fd, registered in list(self._objects.items()):
+            if registered is obj:
+                del self._objects[fd]
+
+                try:
+                    self._poll.unregister(fd)
+                except (KeyError, ValueError, OSError):
+                    pass
+
+    def poll (self, timeout=-1):
+        if timeout is not None and timeout < 0:
+            timeout = None
+
+        return [(self._objects[fd], event)
+                for fd, event in self._poll.poll(timeout)
+                if fd in self._objects]
+
+    def ipoll (self, timeout=-1, flags=0):
+        return iter(self.poll(timeout))
+
+
+def select (rlist, wlist, xlist, timeout=None):
+    return _select.select(rlist, wlist, xlist, timeout)
@@ -0,0 +1,134 @@
+"""
+Sustituto de usocket sobre los sockets de CPython.
+
+Reproduce las diferencias de MicroPython que afectan al firmware: los
+sockets son streams con readinto()/write() que devuelven None cuando no
+bloquean y no hay datos, y accept() devuelve otro socket del mismo tipo.
+
+Los puertos privilegiados se redirigen con PORT_MAP para poder escuchar
+sin root (el servidor usa el 80 en la placa).
+"""
+import socket as _socket
+
+AF_INET = _socket.AF_INET
+SOCK_STREAM = _socket.SOCK_STREAM
+SOCK_DGRAM = _socket.SOCK_DGRAM
+SOL_SOCKET = _socket.SOL_SOCKET
+SO_REUSEADDR = _socket.SO_REUSEADDR
+IPPROTO_TCP = _socket.IPPROTO_TCP
+TCP_NODELAY = _socket.TCP_NODELAY
+
+# Puerto de la placa -> puerto en el ordenador
+PORT_MAP = {80: 8080}
+
+
+def getaddrinfo (host, port, af=0, type=0, proto=0, flags=0):
+    return _socket.getaddrinfo(host, port, af, type, proto, flags)
+
+
+def _map (address):
+    host, port = address[0], address[1]
+
+    return host, PORT_MAP.get(port, port)
+
+
+class socket:
+    def __init__ (self, af=AF_INET, type=SOCK_STREAM, proto=0, _sock=None):
+        self._sock = _sock if _sock is not None else _socket.socket(af, type,
+                                                                     proto)
+
+    def fileno (self):
+        return self._sock.fileno()
+
+    def setsockopt (self, level, option, value):
+        self._sock.setsockopt(level, option, value)
+
+    def setblocking (self, flag):
+        self._sock.setblocking(flag)
+
+    def settimeout (self, value):
+        self._sock.settimeout(value)
+
+    def bind (self, address):
+        self._sock.bind(_map(address))
+
+    def listen (self, backlog=0):
+        self._sock.listen(backlog)
+
+    def connect (self, address):
+        self._sock.connect(address)
+
+    def accept (self):
+        conn, address = self._sock.accept()
+
+        return socket(_sock=conn), address
+
+    def send (self, data):
+        return self._sock.send(data)
+
+    def sendall (self, data):
+        self._sock.sendall(data)
+
+    def recv (self, size):
+        return self._sock.recv(size)
+
+    def recvfrom (self, size):
+        return self._sock.recvfrom(size)
+
+    def sendto (self, data, address):
+        return self._sock.sendto(data, address)
+
+    def read (self, size=-1):
+        try:
+            if size is None or size < 0:
+                chunks = []
+
+                while True:
+                    chunk = self._sock.recv(4096)
+
+                    if not chunk:
+                        return b''.join(chunks)
+
+                    chunks.append(chunk)
+
+            return self._sock.recv(size)
+        except BlockingIOError:
+            return None
+
+    def readinto (self, buffer, size=None):
+        try:
+            return self._sock.recv_into(buffer, size or 0)
+        except BlockingIOError:
+            return None
+
+    def readline (self):
+        line = bytearray()
+
+        while True:
+            char = self._sock.recv(1)
+
+            if not char:
+                return bytes(line)
+
+            line += char
+
+            if char == b'\n':
+                return bytes(line)
+
+    def write (self, data):
+        try:
+            return self._sock.send(data)
+        except BlockingIOError:
+            return None
+
+    def makefile (self, mode='rb', buffering=0):
+        return self
+
+    def close (self):
+        self._sock.close()
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.close()
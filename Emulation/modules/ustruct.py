@@ -0,0 +1,4 @@
+"""
+Sustituto de ustruct.
+"""
+from struct import *  # noqa: F401,F403
@@ -0,0 +1,70 @@
+"""
+Sustituto de utime para ejecutar el firmware en CPython.
+
+Los ticks se envuelven igual que en el RP2040 (30 bits) para que los
+errores con ticks_diff/ticks_add aparezcan también en el ordenador.
+"""
+import time as _time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+_start = _time.monotonic_ns()
+
+
+def ticks_ms ():
+    return ((_time.monotonic_ns() - _start) // 1000000) & TICKS_MAX
+
+
+def ticks_us ():
+    return ((_time.monotonic_ns() - _start) // 1000) & TICKS_MAX
+
+
+def ticks_cpu ():
+    return ticks_us()
+
+
+def ticks_add (ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff (ticks1, ticks2):
+    diff = (ticks1 - ticks2) & TICKS_MAX
+
+    return diff - TICKS_PERIOD if diff >= TICKS_HALFPERIOD else diff
+
+
+def sleep (seconds):
+    _time.sleep(seconds)
+
+
+def sleep_ms (ms):
+    if ms > 0:
+        _time.sleep(ms / 1000)
+
+
+def sleep_us (us):
+    if us > 0:
+        _time.sleep(us / 1000000)
+
+
+def time ():
+    # En el Pico time() devuelve segundos enteros
+    return int(_time.time())
+
+
+def time_ns ():
+    return _time.time_ns()
+
+
+def localtime (secs=None):
+    return _time.localtime(secs)[:8]
+
+
+def gmtime (secs=None):
+    return _time.gmtime(secs)[:8]
+
+
+def mktime (t):
+    return int(_time.mktime(tuple(t[:8]) + (-1,)))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Ejecuta el firmware de src/ sin modificar en CPython usando los módulos de
+Emulation/modules en lugar de los de MicroPython.
+
+Uso:
+    python3 Emulation/run.py [--port 8080] [--duration 30] [--capture out.ppm]
+                             [--stats stats.json] [--env ruta/env.py] [script]
+
+Por defecto ejecuta src/main.py con Emulation/env.py. El servidor escucha
+en el puerto 80 de la placa, que se redirige a --port en el ordenador. Al
+terminar (Ctrl+C o --duration) muestra las estadísticas de dibujado y
+guarda la última imagen enviada a la pantalla si se pide.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import runpy
+import sys
+import threading
+import _thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = os.path.join(ROOT, 'Emulation', 'modules')
+SRC = os.path.join(ROOT, 'src')
+
+# Memoria libre aproximada del RP2040 tras arrancar MicroPython
+HEAP_SIZE = 192 * 1024
+
+
+def install_micropython_builtins ():
+    """
+    Añade a time y gc las funciones que MicroPython incluye en ellos.
+    """
+    import time
+    import tracemalloc
+    import utime
+
+    for name in ('sleep_ms', 'sleep_us', 'ticks_ms', 'ticks_us', 'ticks_cpu',
+                 'ticks_add', 'ticks_diff'):
+        setattr(time, name, getattr(utime, name))
+
+    def mem_alloc ():
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+
+        return 0
+
+    gc.mem_alloc = mem_alloc
+    gc.mem_free = lambda: max(0, HEAP_SIZE - mem_alloc())
+    gc.threshold = lambda *args: -1
+
+
+def load_env (path):
+    spec = importlib.util.spec_from_file_location('env', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules['env'] = module
+
+
+def report (args):
+    import picographics
+
+    results = [display.stats() for display in picographics.INSTANCES]
+
+    for stats in results:
+        print('Envíos a la pantalla:', stats['flushes'],
+              '| copia:', stats['flush_us'], 'us',
+              '| bus SPI estimado:', stats['bus_us'], 'us')
+
+        for name, call in sorted(stats['calls'].items()):
+            print('  %-12s %8d llamadas %10d us' % (name, call['count'],
+                                                   call['us']))
+
+    if args.stats:
+        with open(args.stats, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.capture and picographics.INSTANCES:
+        picographics.INSTANCES[-1].save(args.capture)
+        print('Pantalla guardada en', args.capture)
+
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('script', nargs='?',
+                        default=os.path.join(SRC, 'main.py'))
+    parser.add_argument('--port', type=int, default=8080,
+                        help='Puerto local para el puerto 80 de la placa')
+    parser.add_argument('--duration', type=float,
+                        help='Segundos de ejecución antes de parar')
+    parser.add_argument('--capture', help='Guarda la pantalla como PPM')
+    parser.add_argument('--stats', help='Guarda las estadísticas como JSON')
+    parser.add_argument('--env', default=os.path.join(ROOT, 'Emulation',
+                                                      'env.py'))
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Mide la memoria reservada con tracemalloc')
+    args = parser.parse_args()
+
+    sys.path[:0] = [MODULES, os.path.dirname(os.path.abspath(args.script))]
+
+    import usocket
+
+    usocket.PORT_MAP[80] = args.port
+
+    install_micropython_builtins()
+    load_env(args.env)
+
+    if args.trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+
+    if args.duration:
+        timer = threading.Timer(args.duration, _thread.interrupt_main)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        report(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,18 @@ AP_PASS = ""
 API_URL = "http://localhost:8000/api/v1"
 API_PATH = "ink/resume"
 API_TOKEN = "apitoken"
+API_CACHE_MINUTES = 15 # Minutos antes de revalidar el listado de equipos
 
 # Nombre del equipo para identificarlo en la api, id y nombre.
 DEVICE_ID = 1
 
 # Configuración de la pantalla.
 TIME_TO_DISPLAY_OFF = 10 # Minutos para apagar la pantalla automáticamente
+DISPLAY_FPS = 10 # Fotogramas por segundo máximos al dibujar
+DISPLAY_DEVICES = 8 # Equipos en las páginas de la pantalla, dos por página
+
+# Estado guardado en la flash para mostrarlo nada más arrancar
+SNAPSHOT_WRITES_PER_HOUR = 12 # Escrituras máximas por hora en la flash
 
 # Indica si está en modo debug la aplicación
 DEBUG = False
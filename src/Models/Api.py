@@ -3,13 +3,31 @@
 #
 import urequests, gc
 import ujson
-from time import sleep
+import os
+import utime
+from Models.HttpRequest import HttpRequest, parse_url
 
 gc.enable()
 
 
 class Api():
-    def __init__(self, controller, url, path, token, device_id, debug=False):
+    def __init__(self, controller, url, path, token, device_id, debug=False,
+                 cache_path='api_cache.json', ttl_ms=900000,
+                 retry_ms=60000, timeout=5):
+        """
+        Args:
+            controller (RpiPico): Controlador de la placa.
+            url (str): URL base de la api.
+            path (str): Ruta del listado de equipos.
+            token (str): Token de acceso.
+            device_id (int): Identificador de esta placa en la api.
+            debug (bool): Indica si se muestran los mensajes de debug.
+            cache_path (str): Fichero de la flash con el último listado.
+            ttl_ms (int): Tiempo tras el que se revalida el listado.
+            retry_ms (int): Espera tras el primer error; se dobla con cada
+                            error seguido hasta ttl_ms.
+            timeout (int): Segundos máximos de cada petición.
+        """
         self.URL = url
         self.TOKEN = token
         self.DEVICE_ID = device_id
@@ -17,26 +35,405 @@ class Api():
         self.CONTROLLER = controller
         self.DEBUG = debug
 
+        self.cache_path = cache_path
+        self.ttl_ms = ttl_ms
+        self.retry_ms = retry_ms
+        self.timeout = timeout
+
+        # Último listado válido y su ETag, cargados de la flash al arrancar
+        self.computers = {}
+        self.etag = None
+
+        # Índice de equipos autorizados: device_id (int|str) -> datos del
+        # equipo. None mientras no haya listado; vacío si no hay ninguno
+        self.allowed = None
+        self.load_cache()
+
+        # Próxima revalidación; la primera en cuanto lo permita el servidor
+        self.next_check = None
+        self.backoff_ms = retry_ms
+
+        # Petición en curso y dirección del servidor, resuelta con resolve()
+        # fuera del bucle del servidor
+        self.request = None
+        self.address = None
+
+        # Contadores para diagnóstico
+        self.fetches = 0  # Listados descargados
+        self.not_modified = 0  # Revalidaciones respondidas con 304
+        self.errors = 0
+        self.failures = 0  # Errores seguidos desde la última respuesta
+
+    def load_cache (self):
+        """
+        Carga el último listado guardado en la flash, si existe.
+        """
+        try:
+            with open(self.cache_path) as f:
+                cache = ujson.load(f)
+
+            computers = cache.get('computers', {})
+            allowed = self.build_index(computers)
+
+            if allowed is None:
+                raise ValueError('Listado de equipos no reconocido')
+
+            self.computers = computers
+            self.etag = cache.get('etag')
+            self.allowed = allowed
+        except Exception as e:
+            if self.DEBUG:
+                print("Sin caché del listado de equipos: ", e)
+
+    def save_cache (self):
+        """
+        Guarda el listado en la flash. Se escribe en un fichero temporal y
+        se renombra para no dejar una caché a medias si se corta la
+        alimentación.
+        """
+        tmp_path = self.cache_path + '.tmp'
+
+        try:
+            with open(tmp_path, 'w') as f:
+                ujson.dump({'etag': self.etag, 'computers': self.computers}, f)
+
+            os.rename(tmp_path, self.cache_path)
+        except Exception as e:
+            if self.DEBUG:
+                print("Error al guardar la caché del listado: ", e)
+
     def get_computers_list (self):
         """
-        :return: List of computers retrieved from the API. If an error occurs, an empty dictionary is returned.
+        Devuelve el último listado conocido sin esperar a la red. Se
+        mantiene actualizado con revalidate().
+
+        :return: List of computers retrieved from the API. If it has never been retrieved, an empty dictionary is returned.
+        """
+        return self.computers
+
+    def revalidate (self, now=None):
+        """
+        Tarea periódica: pide el listado si ha caducado y hace avanzar la
+        petición en curso. La petición no bloquea, cada llamada solo hace
+        lo que no espera a la red, así que debe registrarse con un
+        intervalo corto para que termine pronto.
+
+        Args:
+            now (int): ticks_ms actual.
         """
+        if now is None:
+            now = utime.ticks_ms()
+
+        if self.request is not None:
+            if self.request.step():
+                request = self.request
+                self.request = None
+                self.finish(self.handle(request), now)
+
+            return
+
+        if self.next_check is not None \
+                and utime.ticks_diff(now, self.next_check) < 0:
+            return
+
+        if not self.URL.startswith('http://'):
+            # HTTPS necesita urequests, que bloquea hasta el timeout
+            self.finish(self.refresh(), now)
+            return
+
         try:
-            ip_address = str(self.CONTROLLER.wifi.ifconfig()[0])
+            if self.address is None:
+                # Sin dirección no se resuelve aquí: bloquearía el bucle
+                raise OSError('Servidor de la api sin resolver')
 
-            headers = {
-                "Authorization": "Bearer " + self.TOKEN,
-                "Local-Ip": ip_address,
-                "Device-Id": str(self.DEVICE_ID)
-            }
+            self.request = self.start()
+        except Exception as e:
+            self.fail(e)
+            self.finish(False, now)
 
-            response = urequests.get(self.URL + '/' + self.URL_PATH,
-                                     headers=headers)
+    def finish (self, ok, now):
+        """
+        Programa la siguiente revalidación. Tras un error se espera el
+        doble que la vez anterior, hasta ttl_ms, para no insistir mientras
+        la api no responde.
+        """
+        if ok:
+            self.failures = 0
+            self.backoff_ms = self.retry_ms
+            self.next_check = utime.ticks_add(now, self.ttl_ms)
+            return
+
+        self.failures += 1
+        self.next_check = utime.ticks_add(now, self.backoff_ms)
+        self.backoff_ms = min(self.backoff_ms * 2, self.ttl_ms)
+
+    def invalidate (self):
+        """
+        Fuerza la revalidación en la siguiente llamada a revalidate(), por
+        ejemplo tras reconectar el Wi-Fi con otra IP.
+        """
+        self.next_check = None
+        self.backoff_ms = self.retry_ms
+
+        if self.request is not None:
+            self.request.close()
+            self.request = None
+
+    def resolve (self):
+        """
+        Resuelve la dirección del servidor de la api. La consulta DNS
+        bloquea, por eso se hace al arrancar y al recuperar el Wi-Fi, nunca
+        en revalidate(). Con una URL https:// no hace nada.
+
+        Returns:
+            bool: True si el servidor tiene dirección.
+        """
+        if not self.URL.startswith('http://'):
+            return True
 
-            data = ujson.loads(response.text)
-            return data
+        try:
+            host, port, _ = parse_url(self.URL)
+            self.address = HttpRequest.resolve(host, port)
         except Exception as e:
             if self.DEBUG:
-                print("Error al obtener los datos de la api: ", e)
-            return {}
+                print("Error al resolver el servidor de la api: ", e)
+
+            return False
+
+        return True
+
+    def request_headers (self):
+        """
+        Returns:
+            dict: Cabeceras de la petición del listado.
+        """
+        headers = {
+            "Authorization": "Bearer " + self.TOKEN,
+            "Local-Ip": str(self.CONTROLLER.wifi.ifconfig()[0]),
+            "Device-Id": str(self.DEVICE_ID)
+        }
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        return headers
+
+    def start (self):
+        """
+        Lanza la petición condicional del listado con If-None-Match sin
+        esperar a la respuesta.
+
+        Returns:
+            HttpRequest: Petición en curso.
+        """
+        host, _, path = parse_url(self.URL + '/' + self.URL_PATH)
+
+        return HttpRequest(self.address, host, path,
+                           headers=self.request_headers(),
+                           timeout_ms=self.timeout * 1000)
+
+    def handle (self, request):
+        """
+        Aplica la respuesta de una petición terminada. Si el listado no ha
+        cambiado la api responde 304 sin cuerpo.
+
+        Returns:
+            bool: True si el listado está al día.
+        """
+        try:
+            if request.error is not None:
+                raise request.error
+
+            if request.status == 304:
+                self.not_modified += 1
+                return True
+
+            if request.status != 200:
+                raise OSError('HTTP ' + str(request.status))
+
+            self.update(ujson.loads(request.body),
+                        request.headers.get('etag'))
+
+            return True
+        except Exception as e:
+            self.fail(e)
+
+            return False
+        finally:
+            request.body = None
+            gc.collect()
+
+    def refresh (self):
+        """
+        Petición condicional bloqueante con urequests, solo para URL
+        https://. El JSON se decodifica directamente del socket sin copiar
+        el cuerpo entero.
+
+        Returns:
+            bool: True si el listado está al día.
+        """
+        response = None
+
+        try:
+            response = urequests.get(self.URL + '/' + self.URL_PATH,
+                                     headers=self.request_headers(),
+                                     timeout=self.timeout)
+
+            if response.status_code == 304:
+                self.not_modified += 1
+                return True
+
+            if response.status_code != 200:
+                raise OSError('HTTP ' + str(response.status_code))
+
+            self.update(ujson.load(response.raw), self.header(response, 'etag'))
+
+            return True
+        except Exception as e:
+            self.fail(e)
+
+            return False
+        finally:
+            if response is not None:
+                response.close()
+
+            gc.collect()
+
+    def update (self, computers, etag):
+        """
+        Guarda un listado nuevo y su ETag. Si no se reconoce ningún equipo
+        se mantienen el listado y el índice anteriores, para no rechazar
+        todos los equipos por una respuesta inesperada.
+        """
+        allowed = self.build_index(computers)
+
+        if allowed is None:
+            raise ValueError('Listado de equipos no reconocido')
+
+        self.computers = computers
+        self.allowed = allowed
+        self.etag = etag
+        self.fetches += 1
+        self.save_cache()
+
+    def fail (self, error):
+        self.errors += 1
+
+        if self.DEBUG:
+            print("Error al obtener los datos de la api: ", error)
+
+    @staticmethod
+    def build_index (computers):
+        """
+        Crea el índice de equipos autorizados a partir del listado de la
+        api: una lista de equipos con "device_id" (o "id"), sola o dentro
+        de "data". Una lista vacía da un índice vacío, que no autoriza a
+        ningún equipo.
+
+        Args:
+            computers (list|dict): Listado devuelto por la api.
+
+        Returns:
+            dict|None: Datos de cada equipo indexados por device_id, o None
+                       si el listado no tiene esa forma o ningún equipo
+                       trae un id válido.
+        """
+        if isinstance(computers, dict):
+            computers = computers.get('data')
 
+        if not isinstance(computers, list):
+            return None
+
+        index = {}
+
+        for info in computers:
+            if not isinstance(info, dict):
+                continue
+
+            device_id = info.get('device_id', info.get('id'))
+
+            if isinstance(device_id, (int, str)) \
+                    and not isinstance(device_id, bool) and device_id != '':
+                index[Api.key(device_id)] = info
+
+        if computers and not index:
+            return None
+
+        return index
+
+    @staticmethod
+    def key (device_id):
+        """
+        Normaliza un device_id para el índice: los numéricos como int, que
+        es como llegan en los mensajes y no reserva memoria al buscarlos.
+
+        Returns:
+            int|str: Clave del índice.
+        """
+        if isinstance(device_id, str) and device_id.isdigit():
+            return int(device_id)
+
+        return device_id if isinstance(device_id, int) else str(device_id)
+
+    def is_allowed (self, device_id):
+        """
+        Comprueba si un equipo puede mostrarse. Mientras no haya listado
+        (primer arranque sin red) se admiten todos para no dejar la
+        pantalla vacía; con un listado vacío no se admite ninguno.
+
+        Args:
+            device_id (str|int): Identificador del equipo.
+
+        Returns:
+            bool: True si el equipo está autorizado.
+        """
+        allowed = self.allowed
+
+        if allowed is None:
+            return True
+
+        if not isinstance(device_id, int):
+            device_id = self.key(device_id)
+
+        return device_id in allowed
+
+    def device_info (self, device_id):
+        """
+        Returns:
+            dict|None: Datos del equipo según la api.
+        """
+        if self.allowed is None:
+            return None
+
+        return self.allowed.get(self.key(device_id))
+
+    @staticmethod
+    def header (response, name):
+        """
+        Busca una cabecera de la respuesta sin distinguir mayúsculas.
+
+        Returns:
+            str|None: Valor de la cabecera.
+        """
+        headers = getattr(response, 'headers', None) or {}
+
+        for key, value in headers.items():
+            if key.lower() == name:
+                return value
+
+        return None
+
+    def stats (self):
+        """
+        Returns:
+            dict: Descargas, respuestas 304, errores y errores seguidos del
+                  listado.
+        """
+        return {
+            'fetches': self.fetches,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'failures': self.failures,
+            'cached': bool(self.computers),
+            'allowed': len(self.allowed or ()),
+        }
@@ -0,0 +1,86 @@
+import utime
+
+
+class BootTimer:
+    """
+    Mide la duración de cada fase del arranque.
+
+    Cada marca guarda los milisegundos desde la marca anterior y desde el
+    inicio, para poder ver qué fase retrasa la primera pantalla o el primer
+    mensaje atendido.
+    """
+
+    def __init__ (self, debug=False):
+        """
+        Args:
+            debug (bool): Indica si se muestra cada fase al marcarla.
+        """
+        self.DEBUG = debug
+        self.start = utime.ticks_ms()
+        self.last = self.start
+        self.phases = []  # [(nombre, ms de la fase, ms desde el inicio)]
+        self.marked = set()
+
+    def mark (self, name):
+        """
+        Cierra la fase actual.
+
+        Args:
+            name (str): Nombre de la fase que termina.
+
+        Returns:
+            int: Milisegundos desde el inicio del arranque.
+        """
+        now = utime.ticks_ms()
+        phase = (name, utime.ticks_diff(now, self.last),
+                 utime.ticks_diff(now, self.start))
+        self.phases.append(phase)
+        self.marked.add(name)
+        self.last = now
+
+        if self.DEBUG:
+            print('Arranque:', phase[0], phase[1], 'ms (total', phase[2], 'ms)')
+
+        return phase[2]
+
+    def mark_once (self, name):
+        """
+        Marca una fase solo la primera vez, para hitos como el primer
+        mensaje recibido. Es barata si ya estaba marcada.
+
+        Returns:
+            bool: True si se ha marcado ahora.
+        """
+        if name in self.marked:
+            return False
+
+        self.mark(name)
+
+        return True
+
+    def elapsed (self, name):
+        """
+        Returns:
+            int|None: Milisegundos desde el inicio hasta una fase.
+        """
+        for phase in self.phases:
+            if phase[0] == name:
+                return phase[2]
+
+        return None
+
+    def report (self):
+        """
+        Muestra el resumen de las fases del arranque.
+        """
+        print('Fases del arranque:')
+
+        for name, duration, total in self.phases:
+            print('  {:<14} {:>6} ms  {:>6} ms'.format(name, duration, total))
+
+    def stats (self):
+        """
+        Returns:
+            dict: Milisegundos desde el inicio hasta cada fase.
+        """
+        return {name: total for name, _, total in self.phases}
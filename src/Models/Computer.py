@@ -1,37 +1,248 @@
-import utime
+from Models.RingStats import RingStats
+from Models.MessageDecoder import intern
 
 
 class Computer:
-    avg_collection = []
+    """
+    Estado de un equipo que envía sus pulsaciones.
+
+    Los datos del mensaje se guardan en atributos planos en lugar de
+    conservar los diccionarios anidados, y el histórico de medias de cada
+    equipo vive en su propio buffer circular de tamaño fijo.
+
+    Acepta tanto el diccionario de json.loads como el MessageRecord del
+    decodificador especializado. Con este último los textos se comparan
+    con su copia en bytes y solo se crean de nuevo si han cambiado.
+
+    Los mensajes delta solo traen los campos que han cambiado y se mezclan
+    con el estado actual. Su seq debe ser el siguiente al último recibido:
+    si falta alguno se marca resync hasta que llegue un mensaje completo.
+    """
+
+    __slots__ = ('device_id', 'pulsations_total', 'pulsations_current',
+                 'pulsation_average', 'timestamp', 'time', 'so', 'counter',
+                 'history', 'last_seen', 'slot', 'older', 'newer',
+                 'time_raw', 'timestamp_raw', 'so_raw', 'seq', 'resync',
+                 'resync_wait')
+
+    # Número de medias que se conservan para la gráfica
+    HISTORY_SIZE = 30
+
+    # El histórico guarda las medias en centésimas (punto fijo) para no
+    # perder los decimales en un array de enteros
+    HISTORY_SCALE = 100
+
+    # Deltas tras los que se repite la petición de resync si no llega
+    RESYNC_RETRY = 16
 
     def __init__ (self, data):
         self.device_id = None
-        self.session = None
-        self.streak = None
+
+        # session
+        self.pulsations_total = None
+
+        # streak
+        self.pulsations_current = None
+        self.pulsation_average = None
+
         self.timestamp = None
         self.time = None
-        self.system = None
+
+        # system
+        self.so = None
+
+        # Bytes de los últimos textos recibidos, para compararlos sin crear
+        # objetos nuevos
+        self.time_raw = None
+        self.timestamp_raw = None
+        self.so_raw = None
+
         self.counter = 0
+        self.history = RingStats(self.HISTORY_SIZE)
+
+        # Último seq aplicado y si falta un mensaje completo tras un hueco
+        self.seq = None
+        self.resync = False
+        self.resync_wait = 0  # Deltas recibidos desde el hueco
+
+        # Gestionados por DeviceRegistry
+        self.last_seen = None  # ticks_ms del último mensaje
+        self.slot = None  # Posición en pantalla
+        self.older = None
+        self.newer = None
+
         self.update(data)
-        self.last_seen = utime.localtime()
 
     def update (self, data):
+        """
+        Args:
+            data (dict|MessageRecord): Mensaje recibido.
+
+        Returns:
+            bool: True si ha cambiado algún dato y hay que redibujarlo.
+        """
+        if isinstance(data, dict):
+            if not self.check_seq(data.get('seq'), data.get('delta')):
+                return False
+
+            changed = self.update_dict(data)
+        else:
+            if not self.check_seq(data.seq, data.delta):
+                return False
+
+            changed = self.apply(data)
+
+        self.counter += 1
+
+        if self.counter >= 100000:
+            self.counter = 0
+
+        return changed
+
+    def check_seq (self, seq, delta):
+        """
+        Comprueba el orden de un mensaje antes de aplicarlo.
+
+        Args:
+            seq (int|None): Número de secuencia del equipo.
+            delta (bool): Indica si solo trae los campos cambiados.
+
+        Returns:
+            bool: False si es un delta repetido o atrasado y debe ignorarse.
+        """
+        if not delta:
+            # Un mensaje completo pone el estado al día y fija la referencia
+            self.seq = seq
+            self.resync = False
+
+            return True
+
+        if seq is None:
+            return True
+
+        last = self.seq
+
+        if last is not None and seq <= last:
+            return False
+
+        # Hueco en la secuencia o equipo sin estado previo
+        if last is None or seq != last + 1:
+            if not self.resync:
+                self.resync = True
+                self.resync_wait = 0
+            else:
+                self.resync_wait += 1
+        elif self.resync:
+            self.resync_wait += 1
+
+        self.seq = seq
+
+        return True
+
+    def history_value (self, average):
+        """
+        Args:
+            average (int|float): Media recibida.
+
+        Returns:
+            int: Media en centésimas para el histórico.
+        """
+        return int(round(average * self.HISTORY_SCALE))
+
+    def resync_due (self):
+        """
+        Indica si hay que pedir un mensaje completo: al detectar el hueco y
+        después cada RESYNC_RETRY deltas, por si la petición se perdió.
+
+        Returns:
+            bool: True si debe pedirse ahora.
+        """
+        return self.resync and self.resync_wait % self.RESYNC_RETRY == 0
+
+    def apply (self, record):
+        """
+        Copia los campos de un MessageRecord. Los números se asignan sin
+        reservar memoria (enteros pequeños) y los textos solo se copian del
+        buffer si han cambiado.
+
+        Returns:
+            bool: True si ha cambiado algún dato.
+        """
+        self.device_id = record.device_id
+        changed = False
+        value = record.pulsations_total
+
+        if value is not None and value != self.pulsations_total:
+            self.pulsations_total = value
+            changed = True
+
+        value = record.pulsations_current
+
+        if value is not None and value != self.pulsations_current:
+            self.pulsations_current = value
+            changed = True
+
+        # La media siempre entra en el histórico de la gráfica
+        if record.pulsation_average is not None:
+            self.pulsation_average = record.pulsation_average
+            self.history.append(self.history_value(self.pulsation_average))
+            changed = True
+
+        start, end = record.time_start, record.time_end
+
+        if start >= 0 and not record.same(start, end, self.time_raw):
+            self.time_raw = record.raw(start, end)
+            self.time = self.time_raw.decode()
+            changed = True
+
+        start, end = record.timestamp_start, record.timestamp_end
+
+        if start >= 0 and not record.same(start, end, self.timestamp_raw):
+            self.timestamp_raw = record.raw(start, end)
+            self.timestamp = self.timestamp_raw.decode()
+            changed = True
+
+        start, end = record.so_start, record.so_end
+
+        if start >= 0 and not record.same(start, end, self.so_raw):
+            self.so_raw = record.raw(start, end)
+            self.so = intern(self.so_raw.decode())
+            changed = True
+
+        return changed
+
+    def update_dict (self, data):
+        # Los textos ya no corresponden a los bytes guardados
+        self.time_raw = None
+        self.timestamp_raw = None
+        self.so_raw = None
+
         self.device_id = data.get('device_id', self.device_id)
-        self.session = data.get('session', self.session)
-        self.streak = data.get('streak', self.streak)
         self.timestamp = data.get('timestamp', self.timestamp)
         self.time = data.get('time', self.time)
-        self.system = data.get('system', self.system)
-        self.last_seen = utime.localtime()
 
-        self.counter += 1
+        session = data.get('session')
 
-        # Check if streak exists and if it does, add pulsation_average to avg_collection
-        if self.streak and 'pulsation_average' in self.streak:
-            self.avg_collection.append(self.streak['pulsation_average'])
+        if session:
+            self.pulsations_total = session.get('pulsations_total',
+                                                self.pulsations_total)
 
-            if len(self.avg_collection) > 30:  # If there are more than 10  elements
-                self.avg_collection.pop(0)  # Remove the first element
+        system = data.get('system')
 
-        if self.counter >= 100000:
-            self.counter = 0
+        if system:
+            self.so = system.get('so', self.so)
+
+        streak = data.get('streak')
+
+        if streak:
+            self.pulsations_current = streak.get('pulsations_current',
+                                                 self.pulsations_current)
+
+            # Añadimos la media al histórico si viene en el mensaje
+            if 'pulsation_average' in streak:
+                self.pulsation_average = streak['pulsation_average']
+                self.history.append(
+                    self.history_value(self.pulsation_average))
+
+        # Alternativa poco frecuente a apply(), no compara los valores
+        return True
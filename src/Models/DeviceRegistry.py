@@ -0,0 +1,186 @@
+import utime
+
+
+class DeviceRegistry:
+    """
+    Registro de los dispositivos que envían datos.
+
+    Los dispositivos se indexan por device_id en un diccionario y además se
+    enlazan en una lista doblemente enlazada ordenada por la última vez que
+    se vieron. Cada mensaje mueve su dispositivo al final de la lista, así
+    los candidatos a caducar siempre están al principio y barrer la lista
+    solo recorre los que realmente caducan.
+
+    Cada dispositivo ocupa una posición fija en pantalla (slot) mientras no
+    caduque, aunque otros dispositivos entren o salgan.
+    """
+
+    def __init__ (self, ttl_ms=300000, max_slots=2, on_slot=None):
+        """
+        Args:
+            ttl_ms (int): Tiempo sin recibir datos tras el que caduca un
+                          dispositivo.
+            max_slots (int): Número de posiciones disponibles en pantalla.
+            on_slot (function): Se llama con (slot, dispositivo o None)
+                                cuando una posición cambia de ocupante al
+                                caducar un dispositivo.
+        """
+        self.ttl_ms = ttl_ms
+        self.on_slot = on_slot
+        self.devices = {}
+        self.slots = [None] * max_slots
+
+        # Extremos de la lista: oldest caduca primero, newest es el último
+        self.oldest = None
+        self.newest = None
+
+    def __len__ (self):
+        return len(self.devices)
+
+    def __iter__ (self):
+        """
+        Recorre los dispositivos del más antiguo al más reciente.
+        """
+        device = self.oldest
+
+        while device is not None:
+            yield device
+            device = device.newer
+
+    def get (self, device_id):
+        """
+        Args:
+            device_id (int): Identificador del dispositivo.
+
+        Returns:
+            Computer|None: Dispositivo registrado o None.
+        """
+        return self.devices.get(device_id)
+
+    def add (self, device, now=None, slot=None):
+        """
+        Registra un dispositivo nuevo y le asigna una posición libre.
+
+        Args:
+            device (Computer): Dispositivo a registrar.
+            now (int): ticks_ms actual.
+            slot (int): Posición preferida, se usa si existe y está libre.
+        """
+        self.devices[device.device_id] = device
+        device.older = None
+        device.newer = None
+        device.slot = None
+        self.assign_slot(device, slot)
+        self.touch(device, now)
+
+    def touch (self, device, now=None):
+        """
+        Marca el dispositivo como visto y lo mueve al final de la lista.
+
+        Args:
+            device (Computer): Dispositivo que ha enviado datos.
+            now (int): ticks_ms actual.
+        """
+        device.last_seen = utime.ticks_ms() if now is None else now
+
+        if self.newest is device:
+            return
+
+        self.unlink(device)
+
+        device.older = self.newest
+        device.newer = None
+
+        if self.newest is None:
+            self.oldest = device
+        else:
+            self.newest.newer = device
+
+        self.newest = device
+
+    def unlink (self, device):
+        if device.older is not None:
+            device.older.newer = device.newer
+        elif self.oldest is device:
+            self.oldest = device.newer
+
+        if device.newer is not None:
+            device.newer.older = device.older
+        elif self.newest is device:
+            self.newest = device.older
+
+        device.older = None
+        device.newer = None
+
+    def assign_slot (self, device, preferred=None):
+        """
+        Asigna al dispositivo la posición preferida o, si no está libre, la
+        primera posición libre en pantalla.
+
+        Returns:
+            bool: True si había una posición libre.
+        """
+        if preferred is not None and 0 <= preferred < len(self.slots) \
+                and self.slots[preferred] is None:
+            self.slots[preferred] = device
+            device.slot = preferred
+            return True
+
+        for index, current in enumerate(self.slots):
+            if current is None:
+                self.slots[index] = device
+                device.slot = index
+                return True
+
+        return False
+
+    def remove (self, device):
+        """
+        Elimina un dispositivo y cede su posición al dispositivo sin posición
+        visto más recientemente.
+
+        Args:
+            device (Computer): Dispositivo a eliminar.
+        """
+        self.unlink(device)
+        self.devices.pop(device.device_id, None)
+
+        if device.slot is None:
+            return
+
+        slot = device.slot
+        self.slots[slot] = None
+        device.slot = None
+
+        # Solo ocurre al caducar, podemos recorrer la lista
+        waiting = self.newest
+
+        while waiting is not None and waiting.slot is not None:
+            waiting = waiting.older
+
+        if waiting is not None:
+            self.assign_slot(waiting)
+
+        if self.on_slot:
+            self.on_slot(slot, waiting)
+
+    def sweep (self, now=None):
+        """
+        Elimina los dispositivos caducados. Solo revisa el principio de la
+        lista, por lo que sin caducados el coste es constante.
+
+        Args:
+            now (int): ticks_ms actual.
+
+        Returns:
+            int: Número de dispositivos eliminados.
+        """
+        now = utime.ticks_ms() if now is None else now
+        removed = 0
+
+        while self.oldest is not None and utime.ticks_diff(
+                now, self.oldest.last_seen) > self.ttl_ms:
+            self.remove(self.oldest)
+            removed += 1
+
+        return removed
@@ -0,0 +1,169 @@
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+
+class DigitAtlas:
+    """
+    Sprites de los dígitos prerenderizados para los campos numéricos.
+
+    Cada carácter se rasteriza una única vez al arrancar con la fuente de
+    PicoGraphics y se guarda como sprite de 1 bit. Al dibujar un número se
+    copian los sprites sobre el framebuffer P8 con framebuf.blit, usando una
+    paleta de dos colores por cada pen y el fondo como color transparente,
+    así el resultado es el mismo que con display.text() sin pasar por el
+    rasterizador de fuentes.
+    """
+
+    CHARS = '0123456789-.'
+
+    def __init__ (self, graphics, width, height, background, ink):
+        """
+        Args:
+            graphics (PicoGraphics): Pantalla en modo PEN_P8.
+            width (int): Ancho de la pantalla.
+            height (int): Alto de la pantalla.
+            background (int): Pen del fondo.
+            ink (int): Pen distinto del fondo usado solo al rasterizar.
+        """
+        self.graphics = graphics
+        self.background = background
+        self.ink = ink
+        self.fonts = {}
+        self.palettes = {}
+
+        # En PEN_P8 el framebuffer es un byte (índice de paleta) por píxel
+        self.screen = framebuf.FrameBuffer(memoryview(graphics), width,
+                                           height, framebuf.GS8)
+
+        # Paleta que convierte el pen de tinta en 1 y el resto en 0
+        to_mono = bytearray(256)
+        to_mono[ink] = 1
+        self.to_mono = framebuf.FrameBuffer(to_mono, 256, 1, framebuf.GS8)
+
+    @staticmethod
+    def available ():
+        """
+        Returns:
+            bool: True si el firmware incluye el módulo framebuf.
+        """
+        return framebuf is not None
+
+    def add (self, font, scale, height):
+        """
+        Rasteriza los caracteres de una fuente y escala. Debe llamarse antes
+        de dibujar nada en pantalla, ya que usa la esquina superior izquierda
+        como lienzo.
+
+        Args:
+            font (str): Fuente de PicoGraphics.
+            scale (int): Escala del texto.
+            height (int): Alto de la fuente escalada.
+
+        Returns:
+            dict: Sprites por carácter como tuplas (FrameBuffer, ancho).
+        """
+        key = (font, scale)
+
+        if key in self.fonts:
+            return self.fonts[key]
+
+        graphics = self.graphics
+        graphics.set_font(font)
+        sprites = {}
+
+        for char in self.CHARS:
+            width = graphics.measure_text(char, scale)
+
+            graphics.set_pen(self.background)
+            graphics.rectangle(0, 0, width, height)
+            graphics.set_pen(self.ink)
+            graphics.text(char, 0, 0, scale=scale)
+
+            sprite = framebuf.FrameBuffer(bytearray(((width + 7) // 8) * height),
+                                          width, height, framebuf.MONO_HLSB)
+            sprite.blit(self.screen, 0, 0, -1, self.to_mono)
+            sprites[char] = (sprite, width)
+
+        graphics.set_pen(self.background)
+        graphics.rectangle(0, 0, width, height)
+
+        self.fonts[key] = sprites
+
+        return sprites
+
+    def get (self, font, scale):
+        """
+        Args:
+            font (str): Fuente de PicoGraphics.
+            scale (int): Escala del texto.
+
+        Returns:
+            dict|None: Sprites ya rasterizados para esa fuente y escala.
+        """
+        return self.fonts.get((font, scale))
+
+    def palette (self, pen):
+        """
+        Args:
+            pen (int): Pen con el que se dibujarán los sprites.
+
+        Returns:
+            FrameBuffer: Paleta de dos colores (fondo, pen).
+        """
+        palette = self.palettes.get(pen)
+
+        if palette is None:
+            palette = framebuf.FrameBuffer(bytearray((self.background, pen)),
+                                           2, 1, framebuf.GS8)
+            self.palettes[pen] = palette
+
+        return palette
+
+    @staticmethod
+    def supports (sprites, text):
+        """
+        Returns:
+            bool: True si todos los caracteres del texto tienen sprite.
+        """
+        for char in text:
+            if char not in sprites:
+                return False
+
+        return True
+
+    @staticmethod
+    def measure (sprites, text):
+        """
+        Returns:
+            int: Ancho del texto dibujado con los sprites.
+        """
+        width = 0
+
+        for char in text:
+            width += sprites[char][1]
+
+        return width
+
+    def draw (self, sprites, text, x, y, pen):
+        """
+        Dibuja el texto copiando los sprites. El fondo es transparente.
+
+        Args:
+            sprites (dict): Sprites devueltos por add().
+            text (str): Texto a dibujar.
+            x (int): Posición horizontal.
+            y (int): Posición vertical.
+            pen (int): Color del texto.
+        """
+        screen = self.screen
+        palette = self.palette(pen)
+        # blit compara la clave con el color ya traducido por la paleta: el
+        # fondo transparente es el pen del fondo, no el índice 0 del sprite
+        key = self.background
+
+        for char in text:
+            sprite, width = sprites[char]
+            screen.blit(sprite, x, y, key, palette)
+            x += width
@@ -0,0 +1,232 @@
+import usocket as socket
+import uselect as select
+import uerrno as errno
+import utime
+
+# Fases de la petición
+CONNECTING = 0
+SENDING = 1
+RECEIVING = 2
+DONE = 3
+
+# Bytes leídos del socket en cada recv
+CHUNK_SIZE = 512
+
+# Errores de un socket no bloqueante que solo indican que hay que esperar
+WOULD_BLOCK = (errno.EAGAIN, errno.EINPROGRESS, errno.EALREADY)
+
+
+def parse_url (url):
+    """
+    Separa una URL http:// en servidor, puerto y ruta.
+
+    Returns:
+        tuple: (host, puerto, ruta).
+    """
+    if not url.startswith('http://'):
+        raise ValueError('Solo se admiten URL http://')
+
+    host, _, path = url[7:].partition('/')
+    port = 80
+
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+
+    return host, port, '/' + path
+
+
+class HttpRequest:
+    """
+    Petición HTTP GET sobre un socket no bloqueante que avanza a pasos.
+
+    Cada llamada a step() hace solo lo que no espera a la red: comprobar
+    si ya ha conectado, enviar lo que admita el socket o leer lo que haya
+    llegado. Así la petición se reparte entre vueltas del bucle del
+    servidor y nunca lo detiene más que unas copias de memoria.
+
+    Se usa HTTP/1.0 para que el servidor cierre la conexión al terminar y
+    no envíe el cuerpo por trozos (chunked). La respuesta completa se
+    guarda en memoria, con un máximo de max_size bytes (16 KB por defecto);
+    una más grande termina con error ENOMEM.
+
+    La resolución del nombre bloquea, por eso la petición recibe la
+    dirección ya resuelta con resolve() fuera del bucle del servidor.
+    """
+
+    def __init__ (self, address, host, path, headers=None, timeout_ms=5000,
+                  max_size=16384):
+        """
+        Args:
+            address (tuple): Resultado de getaddrinfo para el servidor.
+            host (str): Nombre del servidor para la cabecera Host.
+            path (str): Ruta pedida.
+            headers (dict): Cabeceras adicionales.
+            timeout_ms (int): Tiempo máximo de la petición completa.
+            max_size (int): Tamaño máximo de la respuesta, cabeceras
+                            incluidas.
+        """
+        self.max_size = max_size
+        self.deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+
+        request = 'GET {} HTTP/1.0\r\nHost: {}\r\nConnection: close\r\n'.format(
+            path, host)
+
+        for name, value in (headers or {}).items():
+            request += '{}: {}\r\n'.format(name, value)
+
+        self.request = memoryview((request + '\r\n').encode())
+        self.sent = 0
+        self.response = bytearray()
+
+        # Resultado al terminar
+        self.status = None
+        self.headers = {}
+        self.body = None
+        self.error = None
+
+        self.poller = None
+        self.sock = socket.socket(address[0], address[1], address[2])
+        self.sock.setblocking(False)
+        self.state = CONNECTING
+
+        try:
+            self.sock.connect(address[-1])
+        except OSError as e:
+            if e.args[0] not in WOULD_BLOCK:
+                self.fail(e)
+                return
+
+        # Se sabe que ha conectado cuando el socket admite escritura
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLOUT)
+
+    @staticmethod
+    def resolve (host, port):
+        """
+        Resuelve el servidor. Bloquea, debe llamarse fuera del bucle del
+        servidor (al arrancar o al recuperar la red) y reutilizar el
+        resultado.
+
+        Returns:
+            tuple: (familia, tipo, protocolo, nombre, dirección).
+        """
+        return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0]
+
+    def step (self):
+        """
+        Avanza la petición sin esperar a la red.
+
+        Returns:
+            bool: True si ha terminado, con respuesta o con error.
+        """
+        if self.state == DONE:
+            return True
+
+        if utime.ticks_diff(utime.ticks_ms(), self.deadline) > 0:
+            self.fail(OSError(errno.ETIMEDOUT))
+            return True
+
+        try:
+            if self.state == CONNECTING:
+                self.check_connected()
+
+            if self.state == SENDING:
+                self.send()
+
+            if self.state == RECEIVING:
+                self.receive()
+        except Exception as e:
+            self.fail(e)
+
+        return self.state == DONE
+
+    def check_connected (self):
+        for _, event in self.poller.poll(0):
+            if event & (select.POLLERR | select.POLLHUP):
+                raise OSError(errno.ECONNREFUSED)
+
+            if event & select.POLLOUT:
+                self.state = SENDING
+
+    def send (self):
+        try:
+            sent = self.sock.send(self.request[self.sent:])
+        except OSError as e:
+            if e.args[0] not in WOULD_BLOCK:
+                raise
+
+            return
+
+        self.sent += sent or 0
+
+        if self.sent >= len(self.request):
+            self.state = RECEIVING
+
+    def receive (self):
+        response = self.response
+
+        while True:
+            try:
+                chunk = self.sock.recv(CHUNK_SIZE)
+            except OSError as e:
+                if e.args[0] not in WOULD_BLOCK:
+                    raise
+
+                return
+
+            if not chunk:
+                # El servidor cierra la conexión al acabar la respuesta
+                self.parse()
+                return
+
+            response.extend(chunk)
+
+            if len(response) > self.max_size:
+                raise OSError(errno.ENOMEM)
+
+    def parse (self):
+        """
+        Separa el código de estado, las cabeceras (en minúsculas) y el
+        cuerpo de la respuesta completa.
+        """
+        response = bytes(self.response)
+        self.response = None
+        end = response.find(b'\r\n\r\n')
+
+        if end < 0:
+            raise OSError(errno.EIO)
+
+        lines = response[:end].decode().split('\r\n')
+        self.status = int(lines[0].split(' ', 2)[1])
+
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            self.headers[name.strip().lower()] = value.strip()
+
+        self.body = response[end + 4:]
+        self.close()
+        self.state = DONE
+
+    def fail (self, error):
+        self.error = error
+        self.response = None
+        self.close()
+        self.state = DONE
+
+    def close (self):
+        if self.sock is None:
+            return
+
+        if self.poller is not None:
+            try:
+                self.poller.unregister(self.sock)
+            except Exception:
+                pass
+
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+        self.sock = None
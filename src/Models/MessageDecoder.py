@@ -0,0 +1,711 @@
+import ustruct as struct
+
+try:
+    import micropython
+    native = micropython.native
+except (ImportError, AttributeError):
+    def native (function):
+        return function
+
+# Caracteres JSON que usa el decodificador
+QUOTE = 0x22
+BACKSLASH = 0x5C
+COLON = 0x3A
+COMMA = 0x2C
+MINUS = 0x2D
+DOT = 0x2E
+OPEN_OBJECT = 0x7B
+CLOSE_OBJECT = 0x7D
+OPEN_ARRAY = 0x5B
+CLOSE_ARRAY = 0x5D
+
+# Ámbitos del esquema y campos conocidos de cada uno
+SCOPE_ROOT = 0
+SCOPE_SESSION = 1
+SCOPE_STREAK = 2
+SCOPE_SYSTEM = 3
+
+FIELD_UNKNOWN = 0
+FIELD_DEVICE_ID = 1
+FIELD_SESSION = 2
+FIELD_STREAK = 3
+FIELD_SYSTEM = 4
+FIELD_TIME = 5
+FIELD_TIMESTAMP = 6
+FIELD_PULSATIONS_TOTAL = 7
+FIELD_PULSATIONS_CURRENT = 8
+FIELD_PULSATION_AVERAGE = 9
+FIELD_SO = 10
+FIELD_SEQ = 11
+FIELD_DELTA = 12
+
+KEYS = (
+    ((b'device_id', FIELD_DEVICE_ID), (b'session', FIELD_SESSION),
+     (b'streak', FIELD_STREAK), (b'system', FIELD_SYSTEM),
+     (b'time', FIELD_TIME), (b'timestamp', FIELD_TIMESTAMP),
+     (b'seq', FIELD_SEQ), (b'delta', FIELD_DELTA)),
+    ((b'pulsations_total', FIELD_PULSATIONS_TOTAL),),
+    ((b'pulsations_current', FIELD_PULSATIONS_CURRENT),
+     (b'pulsation_average', FIELD_PULSATION_AVERAGE)),
+    ((b'so', FIELD_SO),),
+)
+
+# Formato binario negociado por conexión (versión 1, big endian):
+#   B   RECORD_MAGIC
+#   B   campos presentes y delta (FLAG_*)
+#   I   seq
+#   I   device_id
+#   I   pulsations_total
+#   I   pulsations_current
+#   H   pulsation_average en décimas
+#   19s timestamp, 8s time, 16s so (rellenos con ceros)
+# Un lote son varios registros seguidos en el mismo mensaje.
+BINARY_VERSION = 1
+RECORD_MAGIC = 0xB1
+RECORD_HEADER = '>BBIIIIH'
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER)
+RECORD_TEXTS = (('timestamp', 19), ('time', 8), ('so', 16))
+RECORD_SIZE = RECORD_HEADER_SIZE + 19 + 8 + 16
+
+# Confirmación binaria: B ACK_MAGIC, I seq
+ACK_MAGIC = 0xA1
+ACK_FORMAT = '>BI'
+
+FLAG_PULSATIONS_TOTAL = 0x01
+FLAG_PULSATIONS_CURRENT = 0x02
+FLAG_PULSATION_AVERAGE = 0x04
+FLAG_TIMESTAMP = 0x08
+FLAG_TIME = 0x10
+FLAG_SO = 0x20
+FLAG_DELTA = 0x40  # Solo lleva los campos que han cambiado
+
+# Textos repetidos entre equipos (sistema operativo) compartidos en memoria
+MAX_INTERNED = 32
+_interned = {}
+
+
+def intern (text):
+    """
+    Devuelve una única instancia para cada texto repetido.
+
+    Args:
+        text (str): Texto recién decodificado.
+
+    Returns:
+        str: Instancia compartida con el mismo contenido.
+    """
+    shared = _interned.get(text)
+
+    if shared is not None:
+        return shared
+
+    if len(_interned) >= MAX_INTERNED:
+        _interned.clear()
+
+    _interned[text] = text
+
+    return text
+
+
+class MessageRecord:
+    """
+    Campos de un mensaje decodificado. Se reserva una vez y se reutiliza:
+    los números se guardan como valores y los textos como posiciones en el
+    buffer recibido, que solo es válido mientras dura el callback.
+    """
+
+    __slots__ = ('buf', 'seq', 'delta', 'device_id', 'pulsations_total',
+                 'pulsations_current',
+                 'pulsation_average', 'time_start', 'time_end',
+                 'timestamp_start', 'timestamp_end', 'so_start', 'so_end')
+
+    def __init__ (self):
+        self.reset(None)
+
+    def reset (self, buf):
+        self.buf = buf
+        self.seq = None
+        self.delta = False
+        self.device_id = None
+        self.pulsations_total = None
+        self.pulsations_current = None
+        self.pulsation_average = None
+        self.time_start = -1
+        self.time_end = -1
+        self.timestamp_start = -1
+        self.timestamp_end = -1
+        self.so_start = -1
+        self.so_end = -1
+
+    @native
+    def same (self, start, end, raw):
+        """
+        Compara un texto del buffer con uno guardado sin crear objetos.
+
+        Args:
+            start (int): Inicio del texto en el buffer.
+            end (int): Fin del texto en el buffer.
+            raw (bytes): Texto guardado.
+
+        Returns:
+            bool: True si son iguales.
+        """
+        if raw is None or len(raw) != end - start:
+            return False
+
+        buf = self.buf
+
+        for i in range(end - start):
+            if buf[start + i] != raw[i]:
+                return False
+
+        return True
+
+    def raw (self, start, end):
+        """
+        Returns:
+            bytes: Copia de un texto del buffer.
+        """
+        return bytes(self.buf[start:end])
+
+
+class MessageDecoder:
+    """
+    Decodificador especializado en los mensajes de los contadores de
+    pulsaciones.
+
+    Recorre el JSON byte a byte sobre el buffer recibido y escribe los
+    campos conocidos en un MessageRecord reservado de antemano, sin crear
+    diccionarios ni textos intermedios. Los campos desconocidos se saltan.
+    Si el mensaje no encaja en el esquema (textos con escapes, exponentes,
+    valores de otro tipo...) decode() devuelve None y debe usarse
+    json.loads como alternativa.
+
+    Los lotes (un array JSON de mensajes) se recorren de uno en uno con
+    begin_batch() y next_in_batch(), reutilizando el mismo registro.
+    """
+
+    def __init__ (self):
+        self.record = MessageRecord()
+
+        # Resultado del último valor leído, para no devolver tuplas
+        self.value = None
+        self.start = 0
+        self.end = 0
+
+        # Lote en curso
+        self.batch = None
+        self.position = 0
+        self.expect_item = False
+
+    def decode (self, payload):
+        """
+        Args:
+            payload (memoryview): Mensaje JSON recibido.
+
+        Returns:
+            MessageRecord|None: Campos del mensaje o None si no encaja en el
+                                esquema.
+        """
+        record = self.record
+        record.reset(payload)
+
+        size = len(payload)
+        i = self.skip_spaces(payload, 0, size)
+
+        if i >= size or payload[i] != OPEN_OBJECT:
+            return None
+
+        i = self.parse_object(payload, i + 1, size, SCOPE_ROOT)
+
+        if i < 0 or record.device_id is None:
+            return None
+
+        if self.skip_spaces(payload, i, size) != size:
+            return None
+
+        return record
+
+    def begin_batch (self, payload):
+        """
+        Comprueba si el mensaje es un lote y lo prepara para recorrerlo.
+
+        Args:
+            payload (memoryview): Mensaje JSON recibido.
+
+        Returns:
+            bool: True si es un array de mensajes.
+        """
+        size = len(payload)
+        i = self.skip_spaces(payload, 0, size)
+
+        if i >= size or payload[i] != OPEN_ARRAY:
+            return False
+
+        self.batch = payload
+        self.position = i + 1
+        self.expect_item = False
+
+        return True
+
+    def next_in_batch (self):
+        """
+        Decodifica el siguiente mensaje del lote. El registro es el mismo
+        para todos, debe procesarse antes de pedir el siguiente.
+
+        Returns:
+            MessageRecord|None: Campos del mensaje o None al terminar.
+
+        Raises:
+            ValueError: Si el lote está mal formado o un mensaje no encaja en
+                        el esquema; debe usarse json.loads como alternativa.
+        """
+        buf = self.batch
+        size = len(buf)
+        i = self.skip_spaces(buf, self.position, size)
+
+        if i < size and buf[i] == CLOSE_ARRAY and not self.expect_item:
+            if self.skip_spaces(buf, i + 1, size) != size:
+                raise ValueError('Lote mal formado')
+
+            self.position = size
+            self.expect_item = True
+
+            return None
+
+        if i >= size or buf[i] != OPEN_OBJECT:
+            raise ValueError('Lote mal formado')
+
+        record = self.record
+        record.reset(buf)
+        i = self.parse_object(buf, i + 1, size, SCOPE_ROOT)
+
+        if i < 0 or record.device_id is None:
+            raise ValueError('Mensaje fuera del esquema')
+
+        i = self.skip_spaces(buf, i, size)
+
+        if i < size and buf[i] == COMMA:
+            i += 1
+            self.expect_item = True
+        elif i < size and buf[i] == CLOSE_ARRAY:
+            self.expect_item = False
+        else:
+            raise ValueError('Lote mal formado')
+
+        self.position = i
+
+        return record
+
+    def decode_binary (self, payload, offset=0):
+        """
+        Lee un registro del formato binario con struct.unpack_from sobre el
+        propio buffer; los textos quedan como posiciones, igual que en JSON.
+
+        Args:
+            payload (memoryview): Registro o lote de registros recibido.
+            offset (int): Posición del registro dentro del lote.
+
+        Returns:
+            MessageRecord|None: Campos del registro o None si no es válido.
+        """
+        if len(payload) < offset + RECORD_SIZE \
+                or payload[offset] != RECORD_MAGIC:
+            return None
+
+        record = self.record
+        record.reset(payload)
+
+        _, flags, record.seq, record.device_id, total, current, average = \
+            struct.unpack_from(RECORD_HEADER, payload, offset)
+
+        record.delta = bool(flags & FLAG_DELTA)
+
+        if flags & FLAG_PULSATIONS_TOTAL:
+            record.pulsations_total = total
+
+        if flags & FLAG_PULSATIONS_CURRENT:
+            record.pulsations_current = current
+
+        if flags & FLAG_PULSATION_AVERAGE:
+            # Las medias enteras siguen siendo int, como llegan en JSON
+            record.pulsation_average = average // 10 if average % 10 == 0 \
+                else average / 10
+
+        start = offset + RECORD_HEADER_SIZE
+        end = start + 19
+
+        if flags & FLAG_TIMESTAMP:
+            record.timestamp_start = start
+            record.timestamp_end = self.text_end(payload, start, end)
+
+        start = end
+        end = start + 8
+
+        if flags & FLAG_TIME:
+            record.time_start = start
+            record.time_end = self.text_end(payload, start, end)
+
+        start = end
+        end = start + 16
+
+        if flags & FLAG_SO:
+            record.so_start = start
+            record.so_end = self.text_end(payload, start, end)
+
+        return record
+
+    @staticmethod
+    def encode_binary (data, seq=0):
+        """
+        Codifica un mensaje con el formato binario, para los clientes y las
+        pruebas.
+
+        Args:
+            data (dict): Mensaje con la misma forma que el JSON.
+            seq (int): Número de secuencia.
+
+        Returns:
+            bytes: Registro de RECORD_SIZE bytes.
+        """
+        session = data.get('session') or {}
+        streak = data.get('streak') or {}
+        system = data.get('system') or {}
+        values = (session.get('pulsations_total'),
+                  streak.get('pulsations_current'),
+                  streak.get('pulsation_average'))
+        flags = 0
+
+        for i, value in enumerate(values):
+            if value is not None:
+                flags |= 1 << i
+
+        texts = (data.get('timestamp'), data.get('time'), system.get('so'))
+        out = bytearray(struct.pack(
+            RECORD_HEADER, RECORD_MAGIC, flags, seq, data['device_id'],
+            values[0] or 0, values[1] or 0, int(round((values[2] or 0) * 10))))
+
+        for i, (name, size) in enumerate(RECORD_TEXTS):
+            text = texts[i]
+
+            if text is not None:
+                flags |= FLAG_TIMESTAMP << i
+                text = text.encode()[:size]
+            else:
+                text = b''
+
+            out.extend(text + bytes(size - len(text)))
+
+        if data.get('delta'):
+            flags |= FLAG_DELTA
+
+        out[1] = flags
+
+        return bytes(out)
+
+    @staticmethod
+    def encode_ack (seq):
+        """
+        Returns:
+            bytes: Confirmación binaria de un registro.
+        """
+        return struct.pack(ACK_FORMAT, ACK_MAGIC, seq)
+
+    @native
+    def text_end (self, buf, start, end):
+        """
+        Returns:
+            int: Fin de un texto de ancho fijo sin el relleno de ceros.
+        """
+        i = start
+
+        while i < end and buf[i] != 0:
+            i += 1
+
+        return i
+
+    @native
+    def skip_spaces (self, buf, i, size):
+        while i < size:
+            char = buf[i]
+
+            if char != 0x20 and char != 0x0A and char != 0x0D and char != 0x09:
+                return i
+
+            i += 1
+
+        return i
+
+    @native
+    def match_key (self, buf, start, end, scope):
+        """
+        Busca una clave entre las conocidas de su ámbito.
+
+        Returns:
+            int: Campo reconocido o FIELD_UNKNOWN.
+        """
+        length = end - start
+
+        for key, field in KEYS[scope]:
+            if len(key) != length:
+                continue
+
+            matched = True
+
+            for j in range(length):
+                if buf[start + j] != key[j]:
+                    matched = False
+                    break
+
+            if matched:
+                return field
+
+        return FIELD_UNKNOWN
+
+    @native
+    def parse_string (self, buf, i, size):
+        """
+        Lee un texto sin escapes. Deja sus límites en start y end.
+
+        Returns:
+            int: Posición tras las comillas de cierre o -1.
+        """
+        if i >= size or buf[i] != QUOTE:
+            return -1
+
+        i += 1
+        start = i
+
+        while i < size:
+            char = buf[i]
+
+            if char == QUOTE:
+                self.start = start
+                self.end = i
+                return i + 1
+
+            if char == BACKSLASH:
+                return -1
+
+            i += 1
+
+        return -1
+
+    @native
+    def parse_number (self, buf, i, size):
+        """
+        Lee un entero o un decimal sin exponente. Deja el resultado en
+        value.
+
+        Returns:
+            int: Posición tras el número o -1.
+        """
+        negative = False
+
+        if i < size and buf[i] == MINUS:
+            negative = True
+            i += 1
+
+        start = i
+        value = 0
+
+        while i < size and 0x30 <= buf[i] <= 0x39:
+            value = value * 10 + (buf[i] - 0x30)
+            i += 1
+
+        if i == start:
+            return -1
+
+        if i < size and buf[i] == DOT:
+            i += 1
+            fraction = 0
+            scale = 1
+
+            while i < size and 0x30 <= buf[i] <= 0x39:
+                fraction = fraction * 10 + (buf[i] - 0x30)
+                scale *= 10
+                i += 1
+
+            if scale == 1:
+                return -1
+
+            # Solo los decimales reservan memoria (float)
+            value = value + fraction / scale
+
+        # Los exponentes no se usan en estos mensajes
+        if i < size and (buf[i] == 0x65 or buf[i] == 0x45):
+            return -1
+
+        self.value = -value if negative else value
+
+        return i
+
+    @native
+    def skip_value (self, buf, i, size):
+        """
+        Salta un valor de un campo desconocido, sea del tipo que sea.
+
+        Returns:
+            int: Posición tras el valor o -1.
+        """
+        if i >= size:
+            return -1
+
+        char = buf[i]
+
+        if char == QUOTE:
+            i += 1
+
+            while i < size:
+                char = buf[i]
+
+                if char == BACKSLASH:
+                    i += 2
+                    continue
+
+                if char == QUOTE:
+                    return i + 1
+
+                i += 1
+
+            return -1
+
+        if char == OPEN_OBJECT or char == OPEN_ARRAY:
+            depth = 0
+            in_string = False
+
+            while i < size:
+                char = buf[i]
+
+                if in_string:
+                    if char == BACKSLASH:
+                        i += 1
+                    elif char == QUOTE:
+                        in_string = False
+                elif char == QUOTE:
+                    in_string = True
+                elif char == OPEN_OBJECT or char == OPEN_ARRAY:
+                    depth += 1
+                elif char == CLOSE_OBJECT or char == CLOSE_ARRAY:
+                    depth -= 1
+
+                    if depth == 0:
+                        return i + 1
+
+                i += 1
+
+            return -1
+
+        # Números, true, false o null
+        while i < size:
+            char = buf[i]
+
+            if char == COMMA or char == CLOSE_OBJECT or char == CLOSE_ARRAY \
+                    or char == 0x20 or char == 0x0A or char == 0x0D \
+                    or char == 0x09:
+                return i
+
+            i += 1
+
+        return i
+
+    def parse_object (self, buf, i, size, scope):
+        """
+        Recorre un objeto del esquema a partir de la llave de apertura.
+
+        Returns:
+            int: Posición tras la llave de cierre o -1.
+        """
+        record = self.record
+        i = self.skip_spaces(buf, i, size)
+
+        if i < size and buf[i] == CLOSE_OBJECT:
+            return i + 1
+
+        while i < size:
+            # Las claves del esquema nunca llevan escapes
+            i = self.parse_string(buf, i, size)
+
+            if i < 0:
+                return -1
+
+            field = self.match_key(buf, self.start, self.end, scope)
+
+            i = self.skip_spaces(buf, i, size)
+
+            if i >= size or buf[i] != COLON:
+                return -1
+
+            i = self.skip_spaces(buf, i + 1, size)
+
+            if i >= size:
+                return -1
+
+            char = buf[i]
+
+            if field == FIELD_UNKNOWN or char == 0x6E:  # null se ignora
+                i = self.skip_value(buf, i, size)
+            elif field == FIELD_SESSION or field == FIELD_STREAK \
+                    or field == FIELD_SYSTEM:
+                if char != OPEN_OBJECT:
+                    return -1
+
+                i = self.parse_object(buf, i + 1, size, field - 1)
+            elif field == FIELD_TIME or field == FIELD_TIMESTAMP \
+                    or field == FIELD_SO:
+                i = self.parse_string(buf, i, size)
+
+                if field == FIELD_TIME:
+                    record.time_start = self.start
+                    record.time_end = self.end
+                elif field == FIELD_TIMESTAMP:
+                    record.timestamp_start = self.start
+                    record.timestamp_end = self.end
+                else:
+                    record.so_start = self.start
+                    record.so_end = self.end
+            elif field == FIELD_DELTA and (char == 0x74 or char == 0x66):
+                # true o false
+                record.delta = char == 0x74
+                i = self.skip_value(buf, i, size)
+            elif field == FIELD_DEVICE_ID and char == QUOTE:
+                # Identificadores de texto: poco habituales, se copian
+                i = self.parse_string(buf, i, size)
+
+                if i >= 0:
+                    record.device_id = str(buf[self.start:self.end], 'utf-8')
+            else:
+                i = self.parse_number(buf, i, size)
+
+                if field == FIELD_DEVICE_ID:
+                    record.device_id = self.value
+                elif field == FIELD_PULSATIONS_TOTAL:
+                    record.pulsations_total = self.value
+                elif field == FIELD_PULSATIONS_CURRENT:
+                    record.pulsations_current = self.value
+                elif field == FIELD_SEQ:
+                    record.seq = self.value
+                elif field == FIELD_DELTA:
+                    record.delta = bool(self.value)
+                else:
+                    record.pulsation_average = self.value
+
+            if i < 0:
+                return -1
+
+            i = self.skip_spaces(buf, i, size)
+
+            if i >= size:
+                return -1
+
+            char = buf[i]
+
+            if char == CLOSE_OBJECT:
+                return i + 1
+
+            if char != COMMA:
+                return -1
+
+            i = self.skip_spaces(buf, i + 1, size)
+
+        return -1
@@ -0,0 +1,238 @@
+FRAMING_NEWLINE = 'newline'  # Mensajes JSON separados por salto de línea
+FRAMING_LENGTH = 'length'  # Mensajes precedidos por su longitud (4 bytes BE)
+
+# Tamaño de la cabecera en el modo FRAMING_LENGTH
+LENGTH_PREFIX_SIZE = 4
+
+NEWLINE = 0x0A
+CARRIAGE_RETURN = 0x0D
+QUOTE = 0x22
+BACKSLASH = 0x5C
+OPEN_BRACE = 0x7B
+CLOSE_BRACE = 0x7D
+OPEN_BRACKET = 0x5B
+CLOSE_BRACKET = 0x5D
+
+
+class MessageFramer:
+    """
+    Separa el flujo de bytes de una conexión en mensajes completos.
+
+    Los datos se leen con readinto() directamente sobre un bytearray
+    reservado una única vez. Los mensajes se devuelven como memoryview sobre
+    ese mismo buffer, por lo que no se crean objetos bytes ni str por cada
+    lectura. Un memoryview devuelto solo es válido hasta la siguiente
+    llamada a fill().
+
+    En el modo FRAMING_NEWLINE un objeto (o lote de objetos) JSON cuyas
+    llaves y corchetes quedan equilibrados también cierra el mensaje, así
+    los clientes antiguos que envían un documento por escritura sin salto
+    de línea siguen funcionando.
+    """
+
+    def __init__ (self, max_message_size=2048, read_size=512,
+                  mode=FRAMING_NEWLINE):
+        """
+        Args:
+            max_message_size (int): Tamaño máximo de un mensaje.
+            read_size (int): Hueco mínimo libre para cada lectura del socket.
+            mode (str): FRAMING_NEWLINE o FRAMING_LENGTH.
+        """
+        self.max_message_size = max_message_size
+        self.read_size = read_size
+        self.buf = bytearray(max_message_size + LENGTH_PREFIX_SIZE + read_size)
+        self.view = memoryview(self.buf)
+        self.reset(mode)
+
+    def reset (self, mode=FRAMING_NEWLINE):
+        """
+        Vacía el buffer para reutilizarlo con otra conexión.
+
+        Args:
+            mode (str): Modo de separación de mensajes.
+        """
+        self.mode = mode
+        self.start = 0  # Inicio de los datos sin consumir
+        self.end = 0  # Final de los datos recibidos
+
+        # Estado del escaneo en modo FRAMING_NEWLINE
+        self.scan = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def pending (self):
+        """
+        Returns:
+            int: Bytes recibidos que aún no forman un mensaje completo.
+        """
+        return self.end - self.start
+
+    def compact (self):
+        """
+        Mueve los datos pendientes al principio del buffer para dejar hueco
+        libre al final.
+        """
+        size = self.end - self.start
+
+        if self.start and size:
+            # La copia va hacia posiciones anteriores, es segura aunque las
+            # regiones se solapen.
+            self.buf[0:size] = self.view[self.start:self.end]
+
+        self.scan -= self.start
+        self.start = 0
+        self.end = size
+
+    def fill (self, stream):
+        """
+        Lee del socket todo lo que quepa en el hueco libre del buffer.
+
+        Args:
+            stream (socket): Socket no bloqueante del que leer.
+
+        Returns:
+            int|None: Bytes leídos, 0 si el cliente cerró o None si no había
+                      datos disponibles.
+        """
+        if len(self.buf) - self.end < self.read_size:
+            self.compact()
+
+        n = stream.readinto(self.view[self.end:])
+
+        if n:
+            self.end += n
+
+        return n
+
+    def consume (self, size):
+        """
+        Marca como procesados los primeros bytes pendientes.
+
+        Args:
+            size (int): Número de bytes consumidos.
+        """
+        self.start += size
+
+        if self.scan < self.start:
+            self.scan = self.start
+
+        if self.start == self.end:
+            # Buffer vacío: volvemos al principio sin copiar nada
+            self.start = self.end = self.scan = 0
+
+    def next_message (self):
+        """
+        Extrae el siguiente mensaje completo del buffer.
+
+        Returns:
+            memoryview|None: Mensaje sin delimitadores o None si está
+                             incompleto.
+
+        Raises:
+            ValueError: Si el mensaje supera el tamaño máximo permitido.
+        """
+        if self.mode == FRAMING_LENGTH:
+            return self.next_length_message()
+
+        return self.next_newline_message()
+
+    def next_length_message (self):
+        buf = self.buf
+        start = self.start
+
+        # Saltos de línea que quedan tras un saludo en JSON al cambiar de
+        # modo. Una longitud nunca empieza por ellos: su primer byte es 0.
+        while start < self.end and (buf[start] == NEWLINE
+                                    or buf[start] == CARRIAGE_RETURN):
+            self.consume(1)
+            start = self.start
+
+        if self.end - start < LENGTH_PREFIX_SIZE:
+            return None
+
+        size = (buf[start] << 24) | (buf[start + 1] << 16) | (
+                buf[start + 2] << 8) | buf[start + 3]
+
+        if size > self.max_message_size:
+            raise ValueError('Mensaje demasiado grande')
+
+        begin = start + LENGTH_PREFIX_SIZE
+
+        if self.end - begin < size:
+            return None
+
+        self.consume(LENGTH_PREFIX_SIZE + size)
+
+        return self.view[begin:begin + size]
+
+    def next_newline_message (self):
+        buf = self.buf
+        end = self.end
+        i = self.scan
+        depth = self.depth
+        in_string = self.in_string
+        escaped = self.escaped
+
+        while i < end:
+            c = buf[i]
+            i += 1
+
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == BACKSLASH:
+                    escaped = True
+                elif c == QUOTE:
+                    in_string = False
+            elif c == QUOTE:
+                in_string = True
+            elif c == OPEN_BRACE or c == OPEN_BRACKET:
+                depth += 1
+            elif c == CLOSE_BRACE or c == CLOSE_BRACKET:
+                depth -= 1
+
+                if depth <= 0:
+                    return self.cut_message(i, i)
+            elif c == NEWLINE and depth <= 0:
+                return self.cut_message(i - 1, i)
+
+        self.scan = i
+        self.depth = depth
+        self.in_string = in_string
+        self.escaped = escaped
+
+        if end - self.start > self.max_message_size:
+            raise ValueError('Mensaje demasiado grande')
+
+        return None
+
+    def cut_message (self, message_end, next_start):
+        """
+        Devuelve el mensaje que termina en message_end y consume hasta
+        next_start, descartando espacios y saltos de línea sobrantes.
+        """
+        start = self.start
+        buf = self.buf
+
+        # Ignoramos separadores al principio (restos de '\r\n' entre mensajes)
+        while start < message_end and buf[start] <= 0x20:
+            start += 1
+
+        while message_end > start and buf[message_end - 1] in (
+                CARRIAGE_RETURN, NEWLINE):
+            message_end -= 1
+
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.consume(next_start - self.start)
+
+        if message_end - start > self.max_message_size:
+            raise ValueError('Mensaje demasiado grande')
+
+        if message_end == start:
+            # Línea vacía: buscamos el siguiente mensaje
+            return self.next_newline_message()
+
+        return self.view[start:message_end]
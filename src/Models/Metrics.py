@@ -0,0 +1,145 @@
+import gc
+import utime
+from Models.RingStats import RingStats
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = b'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metrics:
+    """
+    Métricas de funcionamiento en el formato de texto de Prometheus.
+
+    Los contadores siguen viviendo como enteros en cada modelo (servidor,
+    cola, renderizado...) y solo se leen a través de sus stats() cuando se
+    pide /metrics, así el camino de cada mensaje no paga nada extra.
+    """
+
+    def __init__ (self, prefix='keycounter', controller=None, debug=False):
+        """
+        Args:
+            prefix (str): Prefijo de todas las métricas.
+            controller (RpiPico): Controlador del que leer la temperatura.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.prefix = prefix
+        self.controller = controller
+        self.DEBUG = debug
+
+        # Fuentes registradas [(nombre, función stats, claves contador)]
+        self.sources = []
+
+        # Pausas de las recolecciones de basura programadas (us)
+        self.gc_collections = 0
+        self.gc_pauses = RingStats(30)
+
+        self.scrapes = 0
+
+    def register (self, name, stats, counters=()):
+        """
+        Añade una fuente de métricas.
+
+        Args:
+            name (str): Nombre de la fuente, forma parte de cada métrica.
+            stats (function): Devuelve un dict con valores numéricos.
+            counters (tuple): Claves que solo crecen; el resto son gauges.
+        """
+        self.sources.append((name, stats, counters))
+
+    def collect_garbage (self, now=None):
+        """
+        Libera memoria midiendo la pausa. Como tarea periódica adelanta la
+        recolección a momentos sin mensajes en lugar de dejar que salte en
+        mitad de uno.
+
+        Args:
+            now (int): ticks_ms actual, para usarla como tarea del servidor.
+
+        Returns:
+            int: Duración de la pausa en microsegundos.
+        """
+        start = utime.ticks_us()
+        gc.collect()
+        pause = utime.ticks_diff(utime.ticks_us(), start)
+
+        self.gc_collections += 1
+        self.gc_pauses.append(pause)
+
+        return pause
+
+    def stats (self):
+        """
+        Returns:
+            dict: Memoria libre y ocupada y pausas de recolección.
+        """
+        gc_pauses = self.gc_pauses
+
+        return {
+            'mem_free_bytes': gc.mem_free(),
+            'mem_alloc_bytes': gc.mem_alloc(),
+            'collections': self.gc_collections,
+            'pause_us_last': gc_pauses.last(),
+            'pause_us_avg': gc_pauses.mean(),
+            'pause_us_max': gc_pauses.max(),
+        }
+
+    def temperature (self):
+        """
+        Returns:
+            dict: Estadísticas de temperatura con una lectura reciente.
+        """
+        # Con el muestreo en segundo plano ya hay una lectura reciente
+        if not self.controller.temp_sampler.running:
+            self.controller.read_sensor_temp()
+
+        return self.controller.get_temp_stats()
+
+    def render (self):
+        """
+        Genera la respuesta de /metrics.
+
+        Returns:
+            bytes: Métricas en el formato de texto de Prometheus.
+        """
+        self.scrapes += 1
+        lines = []
+
+        self.render_source(lines, 'gc', self.stats(), ('collections',))
+
+        if self.controller:
+            self.render_source(lines, 'temperature_celsius',
+                               self.temperature(), ('samples',))
+
+        for name, stats, counters in self.sources:
+            try:
+                self.render_source(lines, name, stats(), counters)
+            except Exception as e:
+                if self.DEBUG:
+                    print('Error en las métricas de', name, e)
+
+        self.render_value(lines, 'metrics_scrapes', self.scrapes, True)
+
+        lines.append('')
+
+        return '\n'.join(lines).encode()
+
+    def render_source (self, lines, name, values, counters):
+        """
+        Añade las líneas de una fuente. Se omiten los valores que no son
+        numéricos o aún no existen.
+        """
+        for key, value in values.items():
+            if value is None or isinstance(value, str):
+                continue
+
+            self.render_value(lines, name + '_' + key, value, key in counters)
+
+    def render_value (self, lines, name, value, counter):
+        name = self.prefix + '_' + name
+
+        if counter:
+            name += '_total'
+
+        lines.append('# TYPE ' + name + (' counter' if counter else ' gauge'))
+        lines.append(name + ' ' + str(int(value) if isinstance(value, bool)
+                                      else value))
@@ -0,0 +1,364 @@
+class DeviceCard:
+    """
+    Estado de un dispositivo listo para dibujarse: los textos de sus campos
+    y su fila del resumen.
+    """
+
+    __slots__ = ('device', 'texts', 'row')
+
+    def __init__ (self):
+        self.device = None
+        self.texts = {}
+        self.row = None
+
+    def refresh (self, device, display):
+        """
+        Recalcula los textos con los datos actuales del dispositivo.
+
+        Args:
+            device (Computer): Dispositivo.
+            display (PicoDisplay2): Pantalla que define los campos.
+        """
+        self.device = device
+        texts = display.device_texts(device, self.texts)
+        self.row = '{}: {} | {}'.format(device.device_id,
+                                        texts['pulsation_average'],
+                                        texts['pulsations_total'])
+
+
+class PageView:
+    """
+    Interfaz por páginas manejada con los botones de la pantalla.
+
+    Cada posición del registro de dispositivos es un hueco en las páginas
+    de equipos, con dos equipos por página (uno en cada mitad). Después
+    vienen el resumen, con una fila por equipo repartidas en las páginas
+    que hagan falta, y una página con la gráfica de un equipo.
+
+    Cada cambio recibido actualiza la tarjeta del equipo (sus textos ya
+    formateados) aunque no esté a la vista, sin dibujar ni ocupar el bus
+    SPI. Al cambiar de página se dibuja todo desde las tarjetas y se envía
+    en un único fotograma.
+
+    Las páginas no se guardan ya dibujadas: cada una ocuparía un
+    framebuffer P8 de 75 KB y el heap de la placa ronda los 190 KB, así que
+    solo se guardan los textos. Por lo mismo las páginas cubren las
+    posiciones del registro (DISPLAY_DEVICES): los equipos que llegan con
+    todas ocupadas esperan sin posición y ocupan la primera que quede libre
+    al caducar otro.
+
+    Botones: A página anterior, B siguiente, X resumen e Y gráfica; pulsar
+    X en el resumen pasa a su siguiente página e Y en la página de gráfica
+    al siguiente equipo.
+    """
+
+    # Equipos por página, uno en cada mitad de la pantalla
+    DEVICES_PER_PAGE = 2
+
+    # Páginas que no son de equipos
+    SUMMARY_PAGE = -1
+    CHART_PAGE = -2
+
+    def __init__ (self, display, slots, buttons=(), on_press=None,
+                  debug=False):
+        """
+        Args:
+            display (PicoDisplay2): Pantalla en la que dibujar.
+            slots (int): Posiciones del registro de dispositivos.
+            buttons (tuple): Botones A, B, X e Y de pimoroni.
+            on_press (function): Se llama al pulsar cualquier botón, por
+                                 ejemplo para despertar la pantalla.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.display = display
+        self.cards = [None] * slots
+        self.buttons = buttons
+        self.on_press = on_press
+        self.DEBUG = debug
+
+        self.page = 0  # Página a la vista
+        self.pending = None  # Página pedida con los botones
+        self.focus = 0  # Posición del equipo de la página de gráfica
+        self.summary = 0  # Página del resumen a la vista
+        self.summary_rows = display.summary_rows()  # Filas por página
+        self.header = None  # Título del resumen dibujado
+
+        # Contadores para diagnóstico
+        self.switches = 0  # Cambios de página
+        self.background_updates = 0  # Cambios guardados sin dibujar
+
+    def last_slot (self):
+        """
+        Returns:
+            int: Última posición ocupada, 0 si no hay ninguna.
+        """
+        last = 0
+
+        for slot, card in enumerate(self.cards):
+            if card is not None:
+                last = slot
+
+        return last
+
+    def device_pages (self):
+        """
+        Returns:
+            int: Páginas de equipos hasta el último que está registrado.
+        """
+        return self.last_slot() // self.DEVICES_PER_PAGE + 1
+
+    def summary_pages (self):
+        """
+        Returns:
+            int: Páginas del resumen hasta el último equipo registrado.
+        """
+        return self.last_slot() // self.summary_rows + 1
+
+    def order (self):
+        """
+        Returns:
+            list: Páginas en el orden en que se recorren con A y B.
+        """
+        return list(range(self.device_pages())) + [self.SUMMARY_PAGE,
+                                                   self.CHART_PAGE]
+
+    def step (self, offset):
+        order = self.order()
+        page = self.page if self.page in order else 0
+
+        return order[(order.index(page) + offset) % len(order)]
+
+    def poll (self):
+        """
+        Lee los botones y deja pendiente el cambio de página. Se llama en
+        cada vuelta del bucle de renderizado, el cambio se dibuja en el
+        siguiente fotograma.
+        """
+        if not self.buttons:
+            return
+
+        button_a, button_b, button_x, button_y = self.buttons
+
+        if button_a.read():
+            self.pending = self.step(-1)
+        elif button_b.read():
+            self.pending = self.step(1)
+        elif button_x.read():
+            if self.page == self.SUMMARY_PAGE:
+                self.summary = (self.summary + 1) % self.summary_pages()
+            else:
+                self.summary = 0
+
+            self.pending = self.SUMMARY_PAGE
+        elif button_y.read():
+            if self.page == self.CHART_PAGE:
+                self.focus = self.next_device(self.focus + 1)
+            elif self.page >= 0:
+                self.focus = self.next_device(self.page *
+                                              self.DEVICES_PER_PAGE)
+
+            self.pending = self.CHART_PAGE
+        else:
+            return
+
+        if self.on_press:
+            self.on_press()
+
+    def next_device (self, start):
+        """
+        Returns:
+            int: Primera posición ocupada desde start, dando la vuelta.
+        """
+        cards = self.cards
+        size = len(cards)
+
+        for i in range(size):
+            slot = (start + i) % size
+
+            if cards[slot] is not None:
+                return slot
+
+        return 0
+
+    def switch_pending (self):
+        return self.pending is not None
+
+    def render (self, items):
+        """
+        Aplica los cambios de un fotograma. Debe llamarse entre
+        begin_frame() y end_frame() de la pantalla.
+
+        Args:
+            items (dict): Cambios de la cola como (posición, dispositivo o
+                          None).
+
+        Returns:
+            int: Número de cambios aplicados.
+        """
+        for slot, device in items.values():
+            self.refresh(slot, device)
+
+        page = self.pending
+
+        if page is not None:
+            self.pending = None
+            self.page = page
+            self.switches += 1
+            self.draw_page()
+        else:
+            for slot, device in items.values():
+                if not self.draw_slot(slot):
+                    self.background_updates += 1
+
+        return len(items)
+
+    def refresh (self, slot, device):
+        if device is None:
+            self.cards[slot] = None
+            return
+
+        card = self.cards[slot]
+
+        if card is None:
+            card = DeviceCard()
+            self.cards[slot] = card
+
+        card.refresh(device, self.display)
+
+    def draw_page (self):
+        """
+        Dibuja la página actual entera desde las tarjetas.
+        """
+        display = self.display
+        page = self.page
+
+        if self.DEBUG:
+            print('Página:', page)
+
+        display.clear_content(divider=page != self.SUMMARY_PAGE)
+
+        if page == self.SUMMARY_PAGE:
+            if self.summary >= self.summary_pages():
+                self.summary = 0
+
+            rows = self.summary_rows
+            first = self.summary * rows
+            self.header = None
+            self.draw_summary_header()
+
+            for row, card in enumerate(self.cards[first:first + rows]):
+                if card is not None:
+                    display.draw_summary_row(row, card.row)
+        elif page == self.CHART_PAGE:
+            if self.cards[self.focus] is None:
+                self.focus = self.next_device(self.focus)
+
+            self.draw_chart()
+        else:
+            first = page * self.DEVICES_PER_PAGE
+
+            # Las mitades vacías ya están limpias
+            for slot in range(first, first + self.DEVICES_PER_PAGE):
+                if slot < len(self.cards) and self.cards[slot] is not None:
+                    self.draw_half(slot)
+
+    def draw_slot (self, slot):
+        """
+        Redibuja lo que cambia en la página actual por un equipo.
+
+        Returns:
+            bool: False si el equipo no está a la vista.
+        """
+        page = self.page
+
+        if page == self.SUMMARY_PAGE:
+            if self.summary >= self.summary_pages():
+                # La página del resumen a la vista se ha quedado vacía
+                self.draw_page()
+                return True
+
+            self.draw_summary_header()
+
+            if slot // self.summary_rows != self.summary:
+                return False
+
+            card = self.cards[slot]
+            self.display.draw_summary_row(slot % self.summary_rows,
+                                          None if card is None else card.row)
+        elif page == self.CHART_PAGE:
+            if slot != self.focus:
+                return False
+
+            if self.cards[slot] is None:
+                # El equipo de la gráfica ha caducado, pasamos a otro
+                self.focus = self.next_device(slot)
+                self.display.clear_content()
+
+            self.draw_chart()
+        elif slot // self.DEVICES_PER_PAGE == page:
+            self.draw_half(slot)
+        else:
+            return False
+
+        return True
+
+    def draw_half (self, slot):
+        """
+        Dibuja un equipo en su mitad. Si está solo en la página, la otra
+        mitad muestra su gráfica.
+        """
+        display = self.display
+        position = slot % self.DEVICES_PER_PAGE
+        partner = slot + 1 if position == 0 else slot - 1
+        card = self.cards[slot]
+        partner_card = self.cards[partner] if partner < len(self.cards) \
+            else None
+
+        if card is None:
+            display.clear_half(position, present=False)
+
+            if partner_card is not None:
+                display.showbar(partner_card.device.history, position)
+
+            return
+
+        display.draw_device(position, card.device, card.texts)
+
+        if partner_card is None:
+            display.showbar(card.device.history, 1 - position)
+
+    def draw_summary_header (self):
+        """
+        Dibuja el título del resumen si ha cambiado: los equipos
+        registrados y, si hay varias, la página del resumen a la vista.
+        """
+        text = 'Equipos: {}'.format(len(self.cards) - self.cards.count(None))
+        pages = self.summary_pages()
+
+        if pages > 1:
+            text += ' ({}/{})'.format(self.summary + 1, pages)
+
+        if text != self.header:
+            self.header = text
+            self.display.draw_summary_header(text)
+
+    def draw_chart (self):
+        card = self.cards[self.focus]
+
+        if card is None:
+            return
+
+        self.display.draw_device(0, card.device, card.texts)
+        self.display.showbar(card.device.history, 1)
+
+    def stats (self):
+        """
+        Returns:
+            dict: Página actual, cambios de página y cambios guardados sin
+                  dibujar.
+        """
+        return {
+            'page': self.page,
+            'switches': self.switches,
+            'background_updates': self.background_updates,
+        }
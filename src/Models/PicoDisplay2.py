@@ -2,10 +2,116 @@ import time
 import random
 from pimoroni import Button, RGBLED
 from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY_2, PEN_P8
+from Models.DigitAtlas import DigitAtlas
+
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+class Field:
+    """
+    Campo de texto de la pantalla que recuerda lo último que dibujó.
+    """
+
+    def __init__ (self, x, y, font, scale, pen, area, fixed=None, atlas=None):
+        """
+        Args:
+            x (int): Posición horizontal.
+            y (int): Posición vertical.
+            font (str): Fuente de PicoGraphics.
+            scale (int): Escala del texto.
+            pen (int): Color.
+            area (tuple): Límites (x0, y0, x1, y1) que el campo no puede
+                          sobrepasar al limpiarse.
+            fixed (str): Texto fijo para las etiquetas.
+            atlas (DigitAtlas): Sprites para dibujar los números sin pasar
+                                por el rasterizador de fuentes.
+        """
+        self.x = x
+        self.y = y
+        self.font = font
+        self.scale = scale
+        self.pen = pen
+        self.area = area
+        self.fixed = fixed
+
+        # Altura aproximada de la fuente escalada
+        self.height = FONT_HEIGHTS.get(font, 16) * scale
+
+        self.atlas = atlas
+        self.sprites = atlas.get(font, scale) if atlas else None
+
+        self.last = None  # Texto dibujado actualmente
+        self.last_width = 0
+        self.text = None  # Texto pendiente de dibujar
+        self.width = 0
+
+    def use_sprites (self):
+        return self.sprites is not None and DigitAtlas.supports(self.sprites,
+                                                                self.text)
+
+    def measure (self, display):
+        if self.use_sprites():
+            self.width = DigitAtlas.measure(self.sprites, self.text)
+        else:
+            self.width = display.measure_text(self.text, self.scale)
+
+    def box (self):
+        """
+        Returns:
+            tuple: Rectángulo (x, y, ancho, alto) que cubre el texto anterior
+                   y el nuevo, recortado al área del campo.
+        """
+        x0, y0, x1, y1 = self.area
+        width = min(max(self.width, self.last_width), x1 - self.x)
+        height = min(self.height, y1 - self.y)
+
+        return self.x, self.y, width, height
+
+    def overlaps (self, box):
+        if self.last is None:
+            return False
+
+        x, y, width, height = box
+
+        return (self.x < x + width and x < self.x + self.last_width and
+                self.y < y + height and y < self.y + self.height)
+
+    def draw (self, display):
+        if self.use_sprites():
+            self.atlas.draw(self.sprites, self.text, self.x, self.y, self.pen)
+        else:
+            display.set_font(self.font)
+            display.set_pen(self.pen)
+            display.text(self.text, self.x, self.y, scale=self.scale)
+
+        self.last = self.text
+        self.last_width = self.width
+        self.text = None
+
+
+# Altura en píxeles de las fuentes de mapa de bits a escala 1
+FONT_HEIGHTS = {
+    "bitmap6": 6,
+    "bitmap8": 8,
+    "bitmap14_outline": 14,
+    "bitmap16": 16,
+}
+
 
 class PicoDisplay2:
-    MODES = ['A', 'B', 'C', 'D']
-    current_mode = 'A'
+    # Campos de cada dispositivo que dibuja draw_device(), en el orden del
+    # diseño y con el nombre del atributo de Computer
+    DEVICE_FIELDS = ('so', 'pulsation_average', 'pulsations_total', 'time',
+                     'pulsations_current')
+
+    # Las medias del histórico llegan en centésimas (Computer.HISTORY_SCALE)
+    CHART_SCALE = 100
+
+    # Filas del resumen de equipos
+    SUMMARY_TOP = 34
+    SUMMARY_ROW = 24
 
     button_a = Button(12)
     button_b = Button(13)
@@ -14,7 +120,14 @@ class PicoDisplay2:
 
     led = RGBLED(6, 7, 8)
 
-    def __init__(self, controller, debug=False) -> None:
+    def __init__(self, controller, debug=False, partial_updates=False) -> None:
+        """
+        Args:
+            controller (RpiPico): Controlador de la placa.
+            debug (bool): Indica si se muestran los mensajes de debug.
+            partial_updates (bool): Envía solo la región modificada si el
+                                    driver de la pantalla lo permite.
+        """
         self.DEBUG = debug
         self.controller = controller
 
@@ -25,6 +138,20 @@ class PicoDisplay2:
 
         self.WIDTH, self.HEIGHT = self.display.get_bounds()
 
+        # Solo algunos drivers de PicoGraphics implementan partial_update
+        self.partial_updates = partial_updates and hasattr(self.display,
+                                                           'partial_update')
+
+        # Estado retenido de lo dibujado en cada mitad
+        self.layouts = [None, None]
+        self.drawn_devices = [None, None]
+        self.dirty = None
+
+        # Estado de la gráfica dibujada, para añadir solo las barras nuevas
+        self.bar_geometry = None
+        self.chart_buffers = [None, None]
+        self.reset_chart()
+
         self.WHITE = self.display.create_pen(255, 255, 255)
         self.BLACK = self.display.create_pen(0, 0, 0)
         self.CYAN = self.display.create_pen(0, 255, 255)
@@ -41,6 +168,17 @@ class PicoDisplay2:
         self.MAGENTA = self.display.create_pen(255, 33, 140)
         self.CYAN = self.display.create_pen(33, 177, 255)
 
+        # Dígitos prerenderizados para los campos numéricos grandes. Se crean
+        # antes de dibujar nada porque usan la pantalla como lienzo.
+        self.atlas = None
+
+        if DigitAtlas.available():
+            self.atlas = DigitAtlas(self.display, self.WIDTH, self.HEIGHT,
+                                    self.BLACK, self.WHITE)
+
+            for scale in (3, 4):
+                self.atlas.add("bitmap16", scale, FONT_HEIGHTS["bitmap16"] * scale)
+
         self.initialize()
 
     def initialize(self):
@@ -57,13 +195,41 @@ class PicoDisplay2:
         self.on = False
         self.display.set_backlight(0.2)
 
+    def dim(self, brightness):
+        """
+        Atenúa la pantalla sin apagarla.
+
+        Args:
+            brightness (float): Brillo entre 0.0 y 1.0.
+        """
+        self.display.set_backlight(brightness)
+
+    def wake(self):
+        self.on = True
+        self.led.set_rgb(0, 200, 0)
+        self.display.set_backlight(1.0)
+
     def create_frame (self):
+        self.draw_frame()
+
+        # Show changes on the display
+        self.display.update()
+
+    def draw_frame (self, divider=True):
+        """
+        Dibuja el marco y, si se pide, la línea central sin enviarlos a la
+        pantalla.
+
+        Args:
+            divider (bool): Dibuja la línea que separa las dos mitades.
+        """
         # Grosor del trazo para el marco
         border_thickness = 3
 
         # Set pen to yellow and draw a horizontal line in the middle of the screen
-        self.display.set_pen(self.YELLOW)
-        self.display.line(0, self.HEIGHT // 2, self.WIDTH, self.HEIGHT // 2)
+        if divider:
+            self.display.set_pen(self.YELLOW)
+            self.display.line(0, self.HEIGHT // 2, self.WIDTH, self.HEIGHT // 2)
 
         # Set pen to blue
         self.display.set_pen(self.BLUE)
@@ -81,11 +247,6 @@ class PicoDisplay2:
         self.display.line(border_thickness, border_thickness, border_thickness,
                           self.HEIGHT - border_thickness)  # Left border
 
-
-
-        # Show changes on the display
-        self.display.update()
-
     def clear(self):
         if self.DEBUG:
             print("Clearing Pico Display")
@@ -94,147 +255,558 @@ class PicoDisplay2:
         self.led.set_rgb(0, 200, 0)
         self.display.clear()
         self.display.update()
+        self.reset_chart()
 
-    def update (self, position, device, showbar = False):
-        self.on = True
-        self.display.set_backlight(1.0)
-        self.led.set_rgb(200, 0, 0)
-
-        if self.DEBUG:
-            print("Actualizando Pico Display")
+    def half_area (self, position):
+        """
+        Calcula el rectángulo interior de una mitad de la pantalla, sin el
+        borde ni la línea central.
 
-        self.display.set_pen(self.BLACK)
+        Args:
+            position (int): 0 para la mitad superior, 1 para la inferior.
 
+        Returns:
+            tuple: (x, y, ancho, alto).
+        """
         border_thickness = 3
         clear_height = (self.HEIGHT // 2) - (2 * border_thickness)
         start_y = 2 * border_thickness if position == 0 else self.HEIGHT // 2 + border_thickness
         start_x = border_thickness * 2
         clear_width = self.WIDTH - start_x - border_thickness
 
-        # Clear only half of the screen, preserving border and line.
-        self.display.rectangle(start_x, start_y, clear_width, clear_height)
-
-        system_data = device.system
-        streak_data = device.streak
-        session_data = device.session
+        return start_x, start_y, clear_width, clear_height
 
-        self.display.set_font("bitmap16")
+    def create_layout (self, position):
+        """
+        Define los campos de una mitad de la pantalla. Las etiquetas son
+        campos de texto fijo para poder restaurarlas si un valor vecino las
+        pisa al limpiarse.
 
+        Args:
+            position (int): 0 para la mitad superior, 1 para la inferior.
 
+        Returns:
+            dict: Campos indexados por nombre, en orden de dibujado.
+        """
+        border_thickness = 3
+        start_x, start_y, clear_width, clear_height = self.half_area(position)
+        area = (start_x, start_y, start_x + clear_width, start_y + clear_height)
         offset_text = start_y + 6
-        self.display.set_pen(self.GREEN)  # set pen color to green for title
-        self.display.text(f"OS:", 10 + border_thickness, offset_text)
 
-        self.display.set_pen(self.RED)  # set pen color to red for value
-        self.display.text(f"{system_data['so'] if system_data else 'N/A'}",
-                          50 + border_thickness, offset_text)
+        fields = {
+            'os_label': Field(10 + border_thickness, offset_text, "bitmap16",
+                              2, self.GREEN, area, "OS:"),
+            'so': Field(50 + border_thickness, offset_text, "bitmap16", 2,
+                        self.RED, area),
+            'avg_label': Field(10 + border_thickness, offset_text + 28,
+                               "bitmap16", 3, self.GREEN, area, "AVG:"),
+            'pulsation_average': Field(76 + border_thickness, offset_text + 28,
+                                       "bitmap16", 3, self.MAGENTA, area,
+                                       atlas=self.atlas),
+            'all_label': Field(10 + border_thickness, offset_text + 50,
+                               "bitmap16", 3, self.GREEN, area, "ALL:"),
+            'pulsations_total': Field(76 + border_thickness, offset_text + 50,
+                                      "bitmap16", 3, self.RED, area,
+                                      atlas=self.atlas),
+            'time': Field(105 + border_thickness, offset_text + 78,
+                          "bitmap14_outline", 2, self.ORANGE, area),
+            'pulsations_current': Field(self.WIDTH - 132 - border_thickness * 2,
+                                        start_y + ((clear_height - 70) // 2),
+                                        "bitmap16", 4, self.YELLOW, area,
+                                        atlas=self.atlas),
+        }
+
+        return fields
+
+    def mark_dirty (self, x, y, width, height):
+        """
+        Amplía la región pendiente de enviar a la pantalla.
+        """
+        dirty = self.dirty
+
+        if dirty is None:
+            self.dirty = [x, y, x + width, y + height]
+            return
 
+        if x < dirty[0]:
+            dirty[0] = x
+        if y < dirty[1]:
+            dirty[1] = y
+        if x + width > dirty[2]:
+            dirty[2] = x + width
+        if y + height > dirty[3]:
+            dirty[3] = y + height
+
+    def present (self):
+        """
+        Envía a la pantalla lo dibujado desde el último envío. Se llama una
+        única vez por fotograma.
+        """
+        dirty = self.dirty
+
+        if dirty is None:
+            return
 
-        offset_text += 28
-        self.display.set_pen(self.GREEN)
-        self.display.text(f"AVG:", 10 + border_thickness, offset_text, scale=3)
+        self.dirty = None
 
-        self.display.set_pen(self.MAGENTA)
-        self.display.text(
-            f"{streak_data['pulsation_average'] if streak_data else 'N/A'}",
-            76 + border_thickness, offset_text, scale=3)
+        if self.partial_updates:
+            self.display.partial_update(dirty[0], dirty[1], dirty[2] - dirty[0],
+                                        dirty[3] - dirty[1])
+        else:
+            self.display.update()
 
-        offset_text += 22
-        self.display.set_pen(self.GREEN)
-        self.display.text(f"ALL:", 10 + border_thickness, offset_text, scale=3)
+    def show_status (self, text, detail=None, position=0):
+        """
+        Muestra un mensaje de estado (arranque, conexión...) en una mitad de
+        la pantalla y lo envía. El primer dispositivo que se dibuje en esa
+        mitad lo sustituye.
 
-        self.display.set_pen(self.RED)
-        self.display.text(
-            f"{session_data['pulsations_total'] if session_data else 'N/A'}",
-            76 + border_thickness, offset_text, scale=3)
+        Args:
+            text (str): Mensaje principal.
+            detail (str): Texto secundario, por ejemplo la IP.
+            position (int): 0 para la mitad superior, 1 para la inferior.
+        """
+        self.clear_half(position, present=False)
 
-        offset_text += 28
+        x, y, width, height = self.half_area(position)
 
-        self.display.set_font("bitmap14_outline")
+        self.display.set_font("bitmap8")
+        self.display.set_pen(self.CYAN)
+        self.display.text(text, x + 10, y + 30, wordwrap=width - 20, scale=3)
 
-        self.display.set_pen(self.ORANGE)
-        self.display.text(f"{device.time}", 105 + border_thickness,
-                          offset_text, scale=2)
+        if detail:
+            self.display.set_pen(self.WHITE)
+            self.display.text(detail, x + 10, y + 70, wordwrap=width - 20,
+                              scale=2)
 
-        self.display.set_font("bitmap16")
+        self.display.set_font("bitmap6")
+        self.present()
 
-        self.display.set_pen(self.YELLOW)
-        self.display.text(
-            f"{streak_data['pulsations_current'] if streak_data else 'N/A'}",
-            self.WIDTH - 132 - border_thickness * 2,
-            start_y + ((clear_height - 70) // 2), scale=4)
+    def clear_half (self, position, present=True):
+        """
+        Limpia una mitad de la pantalla y olvida lo que había dibujado.
+
+        Args:
+            position (int): 0 para la mitad superior, 1 para la inferior.
+            present (bool): Envía el cambio a la pantalla inmediatamente.
+        """
+        area = self.half_area(position)
+
+        self.display.set_pen(self.BLACK)
+        self.display.rectangle(*area)
+        self.mark_dirty(*area)
+
+        self.layouts[position] = None
+        self.drawn_devices[position] = None
+
+        if self.chart_position == position:
+            self.reset_chart()
+
+        if present:
+            self.present()
+
+    def clear_content (self, divider=True):
+        """
+        Limpia todo el interior del marco y olvida lo dibujado, para pintar
+        otra página. No envía nada a la pantalla.
+
+        Args:
+            divider (bool): Dibuja la línea central de las dos mitades.
+        """
+        border_thickness = 3
+        area = (border_thickness * 2, border_thickness * 2,
+                self.WIDTH - border_thickness * 3,
+                self.HEIGHT - border_thickness * 3)
+
+        self.display.set_pen(self.BLACK)
+        self.display.rectangle(*area)
+
+        # La línea central cruza el marco de lado a lado
+        if not divider:
+            self.display.rectangle(0, self.HEIGHT // 2, self.WIDTH, 2)
 
+        self.draw_frame(divider)
+        self.mark_dirty(0, 0, self.WIDTH, self.HEIGHT)
+
+        self.layouts = [None, None]
+        self.drawn_devices = [None, None]
+        self.reset_chart()
+
+    def draw_summary_header (self, text):
+        """
+        Dibuja el título del resumen de equipos.
+        """
+        area = (9, 8, self.WIDTH - 18, self.SUMMARY_TOP - 10)
+
+        self.display.set_pen(self.BLACK)
+        self.display.rectangle(*area)
+        self.mark_dirty(*area)
+
+        self.display.set_font("bitmap8")
+        self.display.set_pen(self.CYAN)
+        self.display.text(text, 12, 10, scale=2)
         self.display.set_font("bitmap6")
 
-        self.display.update()
+    def summary_rows (self):
+        """
+        Returns:
+            int: Filas del resumen que caben en una página, bajo el título
+                 y dentro del marco.
+        """
+        return (self.HEIGHT - self.SUMMARY_TOP - 4) // self.SUMMARY_ROW
+
+    def draw_summary_row (self, index, text):
+        """
+        Redibuja una fila del resumen de equipos.
+
+        Args:
+            index (int): Fila dentro de la página, menor que summary_rows().
+            text (str|None): Texto de la fila o None para dejarla vacía.
+        """
+        y = self.SUMMARY_TOP + index * self.SUMMARY_ROW
+        area = (9, y, self.WIDTH - 18, self.SUMMARY_ROW - 2)
 
-        if showbar:
-            self.showbar(device.avg_collection)
+        self.display.set_pen(self.BLACK)
+        self.display.rectangle(*area)
+        self.mark_dirty(*area)
+
+        if text is None:
+            return
+
+        self.display.set_font("bitmap8")
+        self.display.set_pen(self.WHITE)
+        self.display.text(text, 12, y + 3, scale=2)
+        self.display.set_font("bitmap6")
+
+    def device_texts (self, device, texts=None):
+        """
+        Textos de los campos de un dispositivo tal y como los dibuja
+        draw_device(). Pueden calcularse al recibir los datos y guardarse
+        para dibujarlos más tarde sin volver a formatearlos.
+
+        Args:
+            device (Computer): Dispositivo.
+            texts (dict): Diccionario a rellenar, para reutilizarlo.
+
+        Returns:
+            dict: Texto de cada campo.
+        """
+        if texts is None:
+            texts = {}
+
+        for name in self.DEVICE_FIELDS:
+            value = getattr(device, name)
+            texts[name] = 'N/A' if value is None else str(value)
+
+        return texts
+
+    def draw_device (self, position, device, texts=None):
+        """
+        Dibuja en una mitad solo los campos cuyo valor ha cambiado desde el
+        último dibujado, sin enviar nada a la pantalla.
+
+        Args:
+            position (int): 0 para la mitad superior, 1 para la inferior.
+            device (Computer): Dispositivo a dibujar.
+            texts (dict): Textos ya calculados con device_texts().
+        """
+        if texts is None:
+            texts = self.device_texts(device)
+
+        if self.drawn_devices[position] != device.device_id \
+                or self.layouts[position] is None:
+            # Otro dispositivo o mitad pisada por la gráfica: empezamos de cero
+            self.clear_half(position, present=False)
+            self.layouts[position] = self.create_layout(position)
+            self.drawn_devices[position] = device.device_id
+
+        fields = self.layouts[position]
+        changed = []
+
+        for name, field in fields.items():
+            text = field.fixed if field.fixed is not None else texts[name]
+
+            if text != field.last:
+                field.text = text
+                changed.append(field)
+
+        if not changed:
+            return
 
+        boxes = []
+        self.display.set_pen(self.BLACK)
+
+        for field in changed:
+            self.display.set_font(field.font)
+            field.measure(self.display)
+
+            box = field.box()
+            boxes.append(box)
+            self.display.rectangle(*box)
+            self.mark_dirty(*box)
+
+        # Los vecinos que se solapan con una zona limpiada se redibujan con
+        # su mismo texto, sin limpiarlos, para no propagar el borrado.
+        for field in fields.values():
+            if field.text is None:
+                for box in boxes:
+                    if field.overlaps(box):
+                        field.text = field.last
+                        field.width = field.last_width
+                        break
+
+        # Dibujamos en el orden del diseño para respetar las superposiciones
+        for field in fields.values():
+            if field.text is not None:
+                field.draw(self.display)
+
+        self.display.set_font("bitmap6")
+
+    def begin_frame (self):
+        """
+        Prepara la pantalla antes de dibujar un fotograma.
+        """
+        self.on = True
+        self.display.set_backlight(1.0)
+        self.led.set_rgb(200, 0, 0)
+
+        if self.DEBUG:
+            print("Actualizando Pico Display")
+
+    def end_frame (self):
+        """
+        Envía el fotograma a la pantalla.
+        """
+        self.present()
         self.led.set_rgb(0, 200, 0)
 
-    def showbar (self, avg_collection):
+    def draw (self, position, device, showbar = False):
+        """
+        Dibuja un dispositivo y, si procede, la gráfica sin enviar nada a
+        la pantalla.
+        """
+        self.draw_device(position, device)
+
+        if showbar:
+            # La gráfica ocupa la mitad libre de la pantalla
+            self.showbar(device.history, 1 - position)
+
+    def update (self, position, device, showbar = False):
+        self.begin_frame()
+        self.draw(position, device, showbar)
+        self.end_frame()
+
+    def reset_chart (self):
+        """
+        Olvida la gráfica dibujada para que la siguiente se pinte entera.
+        """
+        self.chart_position = None
+        self.chart_history = None
+        self.chart_total = 0
+        self.chart_count = 0
+        self.chart_max = None
+
+    def chart_geometry (self, size):
+        """
+        Calcula una sola vez las dimensiones de las barras para un histórico
+        de tamaño fijo.
+
+        Args:
+            size (int): Número máximo de barras.
+
+        Returns:
+            tuple: (tamaño, ancho de barra, paso entre barras, alto máximo).
+        """
+        geometry = self.bar_geometry
+
+        if geometry is None or geometry[0] != size:
+            # Espaciamos las barras 3 pixeles y restamos la cantidad total de
+            # espacios entre las barras del ancho total.
+            bar_width = (self.WIDTH - 12 - (size * 3)) // size
+            geometry = (size, bar_width, bar_width + 3, (self.HEIGHT // 2) - 10)
+            self.bar_geometry = geometry
+
+        return geometry
+
+    def chart_buffer (self, position):
+        """
+        FrameBuffer sobre la zona de la gráfica dentro del framebuffer de la
+        pantalla, para desplazarla sin redibujarla.
+
+        Args:
+            position (int): Mitad de la pantalla.
+
+        Returns:
+            FrameBuffer|None: None si el firmware no incluye framebuf.
+        """
+        if framebuf is None:
+            return None
+
+        chart = self.chart_buffers[position]
+
+        if chart is None:
+            x, y, width, height = self.half_area(position)
+            # En PEN_P8 cada píxel es un byte
+            buffer = memoryview(self.display)[y * self.WIDTH + x:]
+            chart = framebuf.FrameBuffer(buffer, width, height, framebuf.GS8,
+                                         self.WIDTH)
+            self.chart_buffers[position] = chart
+
+        return chart
+
+    def bar_height (self, value, max_value):
+        # Restamos 10 píxeles de altura (ya estabas restando 6, ahora solamente añades 4 más).
+        bar_height = (value / max_value) * self.bar_geometry[3]
+
+        return int(bar_height) if bar_height > 0 else 0
+
+    def draw_bar (self, index, value, max_value, base_y):
+        """
+        Dibuja una barra y el círculo de su pico.
+        """
+        bar_width, step = self.bar_geometry[1:3]
+        x = (index * step) + 6
+        bar_height = self.bar_height(value, max_value)
+
+        # Elige el color de la barra en función del valor
+        scale = self.CHART_SCALE
+
+        if value < 100 * scale:
+            self.display.set_pen(self.BLUE)
+        elif 150 * scale <= value <= 250 * scale:
+            self.display.set_pen(self.ORANGE)
+        else:
+            self.display.set_pen(self.RED)
+
+        # Dibujar la barra
+        self.display.rectangle(x, base_y - bar_height, bar_width, bar_height)
+
+        # Dibuja un círculo en el pico
+        self.display.set_pen(self.INDIGO)
+        self.display.circle(x + bar_width // 2, base_y - bar_height,
+                            2)  # radio de 2 para el círculo
+
+    def draw_link (self, index, previous, value, max_value, base_y):
+        """
+        Dibuja la línea que une el pico de la barra anterior con el de esta.
+        """
+        bar_width, step = self.bar_geometry[1:3]
+        start_height = base_y - self.bar_height(previous, max_value)
+        end_height = base_y - self.bar_height(value, max_value)
+        mid_height = (start_height + end_height) // 2
+        center_x = (index * step) + 6 + bar_width // 2
+        mid_x = center_x - step
+
+        self.display.set_pen(self.YELLOW)
+        # Dibuja una línea desde la posición previa a la mitad de la barra actual
+        self.display.line(mid_x, start_height, mid_x, mid_height)
+        # Dibuja una línea desde el centro de la barra hasta la posición actual
+        self.display.line(mid_x, mid_height, center_x, end_height)
+
+    def showbar (self, avg_collection, position=1):
+        """
+        Dibuja la gráfica de medias en una mitad de la pantalla, sin enviarla
+        a la pantalla.
+
+        Si la gráfica ya estaba dibujada para el mismo histórico y su máximo
+        no ha cambiado, desplaza las barras existentes y dibuja solo las
+        nuevas, así el coste no depende del tamaño del histórico.
+
+        Args:
+            avg_collection (RingStats): Histórico de medias del dispositivo.
+            position (int): Mitad en la que dibujar la gráfica.
+        """
         if not avg_collection:  # Si la colección está vacía.
             return
 
+        # La gráfica pisa los campos que hubiera en esa mitad
+        self.layouts[position] = None
+        self.drawn_devices[position] = None
+
+        area = self.half_area(position)
+
+        # Base de las barras, 3px por encima del final de la zona interior
+        base_y = area[1] + area[3] - 3
+
+        step = self.chart_geometry(avg_collection.size)[2]
+        # El máximo de la ventana se mantiene de forma incremental
+        max_value = avg_collection.max() or 1
+        count = len(avg_collection)
+        total = avg_collection.total
+        added = total - self.chart_total
+
+        # Muestras que han salido de la ventana desde el último dibujado
+        shift = (total - count) - (self.chart_total - self.chart_count)
+
+        if self.chart_position != position \
+                or self.chart_history is not avg_collection \
+                or self.chart_max != max_value \
+                or added > count or shift >= count \
+                or (shift and self.chart_buffer(position) is None):
+            self.draw_chart(avg_collection, area, base_y, max_value)
+        elif added:
+            first = count - added
+
+            if shift:
+                # Desplazamos la gráfica y limpiamos el hueco de la derecha
+                self.chart_buffer(position).scroll(-shift * step, 0)
+
+                self.display.set_pen(self.BLACK)
+                self.display.rectangle(area[0] + area[2] - shift * step,
+                                       area[1], shift * step, area[3])
+
+                # La primera barra conserva el enlace con la que ha salido
+                self.display.rectangle(area[0], area[1], step - 3, area[3])
+                self.draw_bar(0, avg_collection[0], max_value, base_y)
+
+                if first > 1:
+                    self.draw_link(1, avg_collection[0], avg_collection[1],
+                                   max_value, base_y)
+
+            previous = avg_collection[first - 1] if first else None
+
+            for i in range(first, count):
+                value = avg_collection[i]
+                self.draw_bar(i, value, max_value, base_y)
+
+                if previous is not None:
+                    self.draw_link(i, previous, value, max_value, base_y)
+
+                previous = value
+        else:
+            return
+
+        self.chart_position = position
+        self.chart_history = avg_collection
+        self.chart_total = total
+        self.chart_count = count
+        self.chart_max = max_value
+
+        self.mark_dirty(*area)
+
+    def draw_chart (self, avg_collection, area, base_y, max_value):
+        """
+        Dibuja la gráfica completa, reescalando todas las barras.
+        """
         self.display.set_pen(self.BLACK)  # color para limpiar la pantalla
-        # Conservamos un margen de 3px tanto en el borde derecho como en el inferior
-        self.display.rectangle(6, self.HEIGHT // 2 + 3, self.WIDTH - 9,
-                               self.HEIGHT // 2 - 9)
+        # Conservamos el marco y la línea central
+        self.display.rectangle(*area)
 
         # Dibujar la línea horizontal central.
         self.display.set_pen(self.YELLOW)
         self.display.rectangle(0, self.HEIGHT // 2, self.WIDTH,
                                2)  # la línea tiene 2 pixeles de alto
 
-        # Espaciamos las barras 3 pixeles y restamos la cantidad total de espacios entre las barras del ancho total.
-        bar_width = (self.WIDTH - 12 - (len(avg_collection) * 3)) // len(
-            avg_collection)
-        max_value = max(avg_collection)
+        previous = None
 
-        prev_height = None
         for i, value in enumerate(avg_collection):
-            # Restamos 10 píxeles de altura (ya estabas restando 6, ahora solamente añades 4 más).
-            bar_height = (value / max_value) * ((self.HEIGHT // 2) - 10)
-            bar_height = int(bar_height) if bar_height > 0 else 0
-
-            # Elige el color de la barra en función del valor
-            if value < 100:
-                self.display.set_pen(self.BLUE)
-            elif 150 <= value <= 250:
-                self.display.set_pen(self.ORANGE)
-            else:
-                self.display.set_pen(self.RED)
-
-            # Dibujar la barra
-            self.display.rectangle((i * (bar_width + 3)) + 6,
-                                   self.HEIGHT - bar_height - 6, bar_width,
-                                   bar_height)
-
-            # Dibuja un círculo en el pico
-            self.display.set_pen(self.INDIGO)
-            self.display.circle((i * (bar_width + 3)) + 6 + bar_width // 2,
-                                self.HEIGHT - bar_height - 6,
-                                2)  # radio de 2 para el círculo
+            self.draw_bar(i, value, max_value, base_y)
 
             # Dibujar una línea encima de las barras con la misma restricción de altura que las barras
-            self.display.set_pen(self.YELLOW)
-            if prev_height is not None:
-                start_height = self.HEIGHT - prev_height - 6
-                end_height = self.HEIGHT - bar_height - 6
-                mid_height = (start_height + end_height) // 2
-                mid_x = ((i - 1) * (bar_width + 3)) + 6 + bar_width // 2
+            if previous is not None:
+                self.draw_link(i, previous, value, max_value, base_y)
 
-                # Dibuja una línea desde la posición previa a la mitad de la barra actual
-                self.display.line(mid_x, start_height, mid_x, mid_height)
-                # Dibuja una línea desde el centro de la barra hasta la posición actual
-                self.display.line(mid_x, mid_height,
-                                  (i * (bar_width + 3)) + 6 + bar_width // 2,
-                                  end_height)
-
-            prev_height = bar_height
-
-        self.display.update()
+            previous = value
 
     def debug_balls(self):
 
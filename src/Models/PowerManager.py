@@ -0,0 +1,119 @@
+from machine import Timer
+import _thread
+import utime
+
+
+class PowerManager:
+    """
+    Gestiona el brillo de la pantalla por etapas según la inactividad.
+
+    Un Timer de un solo disparo programa la siguiente etapa, así ningún core
+    queda esperando activamente. El callback del Timer no toca la pantalla:
+    deja la etapa pendiente y el hilo de renderizado la aplica con apply(),
+    de forma que solo ese hilo usa el bus SPI.
+
+    touch() se llama desde el core 0 con cada mensaje y desde el hilo de
+    renderizado al pulsar un botón: solo anota la actividad. El Timer se reprograma únicamente desde su callback y desde
+    apply(), protegido por un lock.
+    """
+
+    def __init__ (self, display, stages, debug=False):
+        """
+        Args:
+            display (PicoDisplay2): Pantalla a gestionar.
+            stages (list): Etapas como tuplas (ms de inactividad, brillo)
+                           ordenadas por tiempo. Un brillo None apaga la
+                           pantalla.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.display = display
+        self.stages = stages
+        self.DEBUG = debug
+
+        self.stage = 0  # 0 = pantalla activa, n = etapa stages[n - 1] aplicada
+        self.pending = None  # Etapa pendiente de aplicar por el renderizado
+        self.wake = False  # Actividad con la pantalla atenuada, sin aplicar
+        self.last_activity = utime.ticks_ms()
+
+        self.lock = _thread.allocate_lock()
+        self.timer = Timer(-1)
+        self.arm(stages[0][0] if stages else 0)
+
+    def arm (self, delay_ms):
+        """
+        Programa la próxima comprobación del Timer.
+
+        Args:
+            delay_ms (int): Milisegundos hasta la comprobación.
+        """
+        self.timer.deinit()
+
+        if self.stage < len(self.stages):
+            self.timer.init(mode=Timer.ONE_SHOT, period=max(1, delay_ms),
+                            callback=self.on_timer)
+
+    def on_timer (self, timer):
+        with self.lock:
+            self.advance()
+
+    def advance (self):
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self.last_activity)
+        target = self.stages[self.stage][0]
+
+        # Ha habido actividad desde que se programó, volvemos a esperar
+        if elapsed < target:
+            self.arm(target - elapsed)
+            return
+
+        self.stage += 1
+        self.pending = self.stage
+
+        if self.stage < len(self.stages):
+            self.arm(self.stages[self.stage][0] - elapsed)
+
+    def touch (self, *args):
+        """
+        Registra actividad (datos nuevos o pulsación de un botón). Solo
+        asigna atributos, así es barato llamarlo con cada mensaje. Si la
+        pantalla estaba atenuada, apply() la despierta y reprograma el
+        Timer.
+        """
+        self.last_activity = utime.ticks_ms()
+
+        if self.stage:
+            self.wake = True
+
+    def apply (self):
+        """
+        Aplica la etapa pendiente. Debe llamarse desde el hilo que dibuja.
+        """
+        # La etapa pendiente se lee y se limpia bajo el lock para no perder
+        # una que el Timer deje entre medias
+        with self.lock:
+            if self.wake:
+                self.wake = False
+
+                if self.stage:
+                    self.stage = 0
+                    self.pending = 0
+                    self.arm(self.stages[0][0])
+
+            stage = self.pending
+            self.pending = None
+
+        if stage is None:
+            return
+
+        if stage == 0:
+            self.display.wake()
+            return
+
+        brightness = self.stages[stage - 1][1]
+
+        if self.DEBUG:
+            print('Etapa de energía:', stage, brightness)
+
+        if brightness is None:
+            self.display.shutdown()
+        else:
+            self.display.dim(brightness)
@@ -0,0 +1,113 @@
+import _thread
+
+
+class RenderQueue:
+    """
+    Cola acotada entre el núcleo de red (core 0) y el renderizado (core 1).
+
+    Solo guarda el último estado pendiente de cada dispositivo: si llega una
+    actualización de un dispositivo que aún no se ha dibujado, sustituye a
+    la anterior en lugar de encolarse detrás. Así una ráfaga de mensajes se
+    resuelve en un único redibujado.
+    """
+
+    def __init__ (self, max_size=16):
+        """
+        Args:
+            max_size (int): Número máximo de dispositivos pendientes.
+        """
+        self.max_size = max_size
+        self.lock = _thread.allocate_lock()
+        self.pending = {}
+
+        # Segundo diccionario para drain(), se alternan sin reservar memoria
+        self.spare = {}
+
+        # Contadores para diagnóstico
+        self.posted = 0  # Actualizaciones recibidas
+        self.coalesced = 0  # Actualizaciones fusionadas con una pendiente
+        self.dropped = 0  # Actualizaciones descartadas por cola llena
+        self.max_depth = 0  # Profundidad máxima alcanzada
+
+    def put (self, key, item):
+        """
+        Encola el último estado de un dispositivo.
+
+        Args:
+            key (int): Identificador del dispositivo.
+            item (object): Estado a renderizar.
+
+        Returns:
+            bool: False si la cola estaba llena y se descartó.
+        """
+        with self.lock:
+            self.posted += 1
+
+            if key in self.pending:
+                self.coalesced += 1
+            elif len(self.pending) >= self.max_size:
+                self.dropped += 1
+                return False
+
+            self.pending[key] = item
+            depth = len(self.pending)
+
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+        return True
+
+    def get (self):
+        """
+        Extrae un elemento pendiente sin bloquear.
+
+        Returns:
+            object|None: Estado a renderizar o None si la cola está vacía.
+        """
+        with self.lock:
+            if not self.pending:
+                return None
+
+            return self.pending.popitem()[1]
+
+    def drain (self):
+        """
+        Extrae de golpe todos los elementos pendientes. El diccionario
+        devuelto es válido hasta la siguiente llamada a drain().
+
+        Returns:
+            dict: Elementos pendientes indexados por clave.
+        """
+        spare = self.spare
+        spare.clear()
+
+        with self.lock:
+            items = self.pending
+            self.pending = spare
+
+        self.spare = items
+
+        return items
+
+    def depth (self):
+        """
+        Returns:
+            int: Número de dispositivos pendientes de renderizar.
+        """
+        return len(self.pending)
+
+    def stats (self):
+        """
+        Obtiene los contadores de la cola.
+
+        Returns:
+            dict: Profundidad actual y máxima, recibidos, fusionados y
+                  descartados.
+        """
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'posted': self.posted,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,141 @@
+import utime
+from Models.RingStats import RingStats
+
+
+class RenderScheduler:
+    """
+    Bucle de renderizado del segundo core con límite de fotogramas por
+    segundo.
+
+    En cada fotograma vacía la cola de renderizado y dibuja todos los
+    cambios recibidos durante el intervalo, enviando la pantalla una sola
+    vez. Si dos equipos escriben a la vez, sus cambios comparten fotograma
+    en lugar de provocar un envío cada uno.
+    """
+
+    def __init__ (self, display, queue, pages, fps=10, power=None,
+                  debug=False):
+        """
+        Args:
+            display (PicoDisplay2): Pantalla en la que dibujar.
+            queue (RenderQueue): Cola con los cambios pendientes.
+            pages (PageView): Interfaz por páginas que decide qué se dibuja
+                              de cada cambio, incluida la gráfica.
+            fps (int): Fotogramas por segundo máximos.
+            power (PowerManager): Gestor de energía cuyos cambios se aplican
+                                  desde este hilo.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.display = display
+        self.queue = queue
+        self.power = power
+        self.pages = pages
+        self.DEBUG = debug
+        self.set_fps(fps)
+
+        self.frames = 0  # Fotogramas enviados a la pantalla
+        self.updates = 0  # Cambios dibujados
+        self.max_batch = 0  # Máximo de cambios en un mismo fotograma
+
+        # Duración de los últimos fotogramas en microsegundos: el fotograma
+        # completo y solo el dibujo, sin el envío a la pantalla
+        self.frame_times = RingStats(60)
+        self.draw_times = RingStats(60)
+
+    def set_fps (self, fps):
+        """
+        Args:
+            fps (int): Fotogramas por segundo máximos.
+        """
+        self.fps = fps
+        self.frame_ms = 1000 // fps
+
+    def run (self):
+        """
+        Bucle principal del hilo de renderizado, no termina nunca.
+        """
+        next_frame = utime.ticks_ms()
+
+        while True:
+            # Cambios de brillo programados por el Timer del gestor de energía
+            if self.power:
+                self.power.apply()
+
+            # Botones de cambio de página
+            self.pages.poll()
+
+            try:
+                self.render_frame()
+            except Exception as e:
+                if self.DEBUG:
+                    print('Error en el renderizado:', e)
+
+            # Dormimos hasta el siguiente fotograma; si vamos con retraso no
+            # acumulamos deuda de fotogramas.
+            next_frame = utime.ticks_add(next_frame, self.frame_ms)
+            wait = utime.ticks_diff(next_frame, utime.ticks_ms())
+
+            if wait > 0:
+                utime.sleep_ms(wait)
+            else:
+                next_frame = utime.ticks_ms()
+
+    def render_frame (self):
+        """
+        Dibuja todos los cambios pendientes y envía la pantalla una vez.
+
+        Returns:
+            int: Número de cambios dibujados.
+        """
+        # Solo los cambios llegados hasta ahora: los que entren mientras
+        # dibujamos esperan al siguiente fotograma.
+        items = self.queue.drain()
+        pages = self.pages
+
+        if not items and not pages.switch_pending():
+            return 0
+
+        start = utime.ticks_us()
+        display = self.display
+
+        display.begin_frame()
+        batch = pages.render(items)
+
+        self.draw_times.append(utime.ticks_diff(utime.ticks_us(), start))
+
+        display.end_frame()
+
+        self.frames += 1
+        self.updates += batch
+
+        if batch > self.max_batch:
+            self.max_batch = batch
+
+        self.frame_times.append(utime.ticks_diff(utime.ticks_us(), start))
+
+        return batch
+
+    def stats (self):
+        """
+        Obtiene las estadísticas de renderizado.
+
+        Returns:
+            dict: Fotogramas, cambios dibujados y tiempos de fotograma y de
+                  dibujo (us).
+        """
+        frame_times = self.frame_times
+        draw_times = self.draw_times
+
+        return {
+            'fps_cap': self.fps,
+            'frames': self.frames,
+            'updates': self.updates,
+            'max_batch': self.max_batch,
+            'frame_us_last': frame_times.last(),
+            'frame_us_avg': frame_times.mean(),
+            'frame_us_min': frame_times.min(),
+            'frame_us_max': frame_times.max(),
+            'draw_us_last': draw_times.last(),
+            'draw_us_avg': draw_times.mean(),
+            'draw_us_max': draw_times.max(),
+        }
@@ -0,0 +1,156 @@
+from array import array
+
+
+class RingStats:
+    """
+    Buffer circular de enteros de tamaño fijo con estadísticas incrementales.
+
+    Mantiene la suma para la media y dos colas monótonas (también sobre
+    arrays fijos) con los índices candidatos a máximo y mínimo de la
+    ventana, de modo que añadir una muestra y consultar media, máximo o
+    mínimo cuesta O(1) amortizado sin reservar memoria.
+    """
+
+    def __init__ (self, size=30, typecode='i'):
+        """
+        Args:
+            size (int): Número de muestras de la ventana.
+            typecode (str): Tipo de array para las muestras.
+        """
+        self.size = size
+        self.values = array(typecode, [0] * size)
+
+        # Colas monótonas de posiciones absolutas (total de muestras vistas)
+        self.max_queue = array('i', [0] * size)
+        self.min_queue = array('i', [0] * size)
+        self.reset()
+
+    def reset (self):
+        self.count = 0  # Muestras en la ventana
+        self.total = 0  # Muestras añadidas desde el último reset
+        self.sum = 0
+
+        self.max_head = 0
+        self.max_len = 0
+        self.min_head = 0
+        self.min_len = 0
+
+        # Estadísticas globales desde el último reset
+        self.lifetime_min = None
+        self.lifetime_max = None
+
+    def __len__ (self):
+        return self.count
+
+    def __getitem__ (self, index):
+        """
+        Devuelve la muestra por antigüedad: 0 es la más antigua.
+        """
+        if index < 0:
+            index += self.count
+
+        if index < 0 or index >= self.count:
+            raise IndexError('index out of range')
+
+        return self.values[(self.total - self.count + index) % self.size]
+
+    def __iter__ (self):
+        for i in range(self.count):
+            yield self[i]
+
+    def append (self, value):
+        """
+        Añade una muestra, descartando la más antigua si la ventana está
+        llena.
+
+        Args:
+            value (int): Muestra a añadir.
+        """
+        size = self.size
+        position = self.total
+        slot = position % size
+
+        if self.count == size:
+            self.sum -= self.values[slot]
+        else:
+            self.count += 1
+
+        self.values[slot] = value
+        self.sum += value
+        self.total = position + 1
+
+        oldest = self.total - self.count
+
+        # Cola de máximos: índices con valores decrecientes
+        queue = self.max_queue
+        head = self.max_head
+        length = self.max_len
+
+        if length and queue[head] < oldest:
+            head = (head + 1) % size
+            length -= 1
+
+        while length and self.values[
+                queue[(head + length - 1) % size] % size] <= value:
+            length -= 1
+
+        queue[(head + length) % size] = position
+        self.max_head = head
+        self.max_len = length + 1
+
+        # Cola de mínimos: índices con valores crecientes
+        queue = self.min_queue
+        head = self.min_head
+        length = self.min_len
+
+        if length and queue[head] < oldest:
+            head = (head + 1) % size
+            length -= 1
+
+        while length and self.values[
+                queue[(head + length - 1) % size] % size] >= value:
+            length -= 1
+
+        queue[(head + length) % size] = position
+        self.min_head = head
+        self.min_len = length + 1
+
+        if self.lifetime_max is None or value > self.lifetime_max:
+            self.lifetime_max = value
+
+        if self.lifetime_min is None or value < self.lifetime_min:
+            self.lifetime_min = value
+
+    def last (self):
+        """
+        Returns:
+            int|None: Muestra más reciente.
+        """
+        return self.values[(self.total - 1) % self.size] if self.count else None
+
+    def max (self):
+        """
+        Returns:
+            int|None: Máximo de la ventana.
+        """
+        if not self.count:
+            return None
+
+        return self.values[self.max_queue[self.max_head] % self.size]
+
+    def min (self):
+        """
+        Returns:
+            int|None: Mínimo de la ventana.
+        """
+        if not self.count:
+            return None
+
+        return self.values[self.min_queue[self.min_head] % self.size]
+
+    def mean (self):
+        """
+        Returns:
+            int|None: Media entera de la ventana.
+        """
+        return self.sum // self.count if self.count else None
@@ -1,6 +1,11 @@
 from machine import ADC, Pin
 import network
+import ubinascii
+import ujson
+import os
+import utime
 from time import sleep
+from Models.TemperatureSampler import TemperatureSampler
 
 # Constants
 WIFI_DISCONNECTED = 0
@@ -12,14 +17,6 @@ class RpiPico:
     INTEGRATED_TEMP_CORRECTION = 27  # Corrección de temperatura interna para ajustar lecturas
     adc_voltage_correction = 0.706
     voltage_working = 3.3
-    num_of_measurements = 0  # Número de mediciones de temperatura
-
-    max = 0
-    min = 0
-    avg = 0
-    current = 0
-    sum_of_temps = 0  # Suma de todas las lecturas de temperatura
-    locked = False
 
     # Inalámbrico
     wifi = None
@@ -28,7 +25,8 @@ class RpiPico:
 
     def __init__ (self, ssid=None, password=None, debug=False, country="ES",
                   alternatives_ap=None,
-                  hostname="Rpi-Pico-W"):
+                  hostname="Rpi-Pico-W", autoconnect=True,
+                  wifi_cache_path='wifi_cache.json'):
         """
         Constructor de la clase RpiPico.
 
@@ -38,24 +36,38 @@ class RpiPico:
             debug (bool): Indica si se muestran los mensajes de debug. Por defecto False.
             alternatives_ap (tuple): Puedes pasar una tupla con redes adicionales.
             country (str): Código del país. Por defecto 'ES'.
+            hostname (str): Nombre de la placa en la red.
+            autoconnect (bool): Conecta y espera al Wi-Fi en el constructor.
+                                Con False se usa wifi_begin() y wifi_wait()
+                                para arrancar el resto mientras conecta.
+            wifi_cache_path (str): Fichero con la última red conectada.
         """
         self.DEBUG = debug
         self.SSID = ssid
         self.PASSWORD = password
         self.COUNTRY = country
         self.hostname = hostname
-        self.alternatives_ap = alternatives_ap
+        self.alternatives_ap = alternatives_ap or []
+        self.wifi_cache_path = wifi_cache_path
+        self.wifi_cache = None
+        self.wifi_fast = False  # Conexión directa con la red guardada en curso
 
         self.TEMP_SENSOR = ADC(4)  # Sensor interno de Raspberry Pi Pico.
 
+        # Muestreo del sensor en punto fijo, en segundo plano tras
+        # start_temp_sampler()
+        self.temp_sampler = TemperatureSampler(
+            self.TEMP_SENSOR, voltage=self.voltage_working,
+            reference_voltage=self.adc_voltage_correction,
+            reference_temp=self.INTEGRATED_TEMP_CORRECTION)
+
         self.LED_INTEGRATED = Pin("LED",
                                   Pin.OUT)  # Definición del GPIO para el LED integrado
 
-        self.adc_conversion_factor = self.voltage_working / 65535  # Factor de conversión de 16 bits
-
-        if ssid and password:  # Si se proporcionan credenciales Wi-Fi, intenta la conexión
+        if ssid and password and autoconnect:  # Si se proporcionan credenciales Wi-Fi, intenta la conexión
             print('Iniciando la conexión inalámbrica')
-            self.wifi_connect(ssid, password)
+            self.wifi_begin()
+            self.wifi_wait()
 
         sleep(0.100)
 
@@ -66,13 +78,27 @@ class RpiPico:
         Reinicia las estadísticas de temperatura.
 
         Args:
-            temp (float): Valor inicial con el que resetear las estadísticas. Por defecto None.
+            temp (float): Valor inicial con el que resetear las
+                          estadísticas. Por defecto None, se toma una
+                          lectura nueva.
+        """
+        self.temp_sampler.reset()
+
+        if temp is None:
+            self.temp_sampler.sample()
+        else:
+            self.temp_sampler.add(int(round(temp * 100)))
+
+    def start_temp_sampler (self, period_ms=1000):
+        """
+        Lee el sensor periódicamente con un Timer. Desde entonces get_temp()
+        devuelve la última muestra sin esperar al ADC.
+
+        Args:
+            period_ms (int): Milisegundos entre muestras.
         """
-        temp = temp if temp else self.read_sensor_temp()
-        self.max = temp
-        self.min = temp
-        self.avg = temp
-        self.current = temp
+        self.temp_sampler.period_ms = period_ms
+        self.temp_sampler.start()
 
     def read_sensor_temp (self):
         """
@@ -82,37 +108,33 @@ class RpiPico:
             float: Temperatura leída.
         """
         # Continúa si no está bloqueado
-        if self.locked:
-            return self.current
-
-        reading = (
-                              self.TEMP_SENSOR.read_u16() * self.adc_conversion_factor) - self.adc_voltage_correction
-        value = self.INTEGRATED_TEMP_CORRECTION - reading / 0.001721
-
-        cpu_temp = round(float(value), 1)
-        self.current = cpu_temp
-
-        # Actualiza las estadísticas
-        if cpu_temp > self.max:
-            self.max = cpu_temp
-        if cpu_temp < self.min:
-            self.min = cpu_temp
+        if self.temp_sampler.locked:
+            return self.temp_sampler.celsius(self.temp_sampler.latest())
 
-        self.num_of_measurements += 1
-        self.sum_of_temps += cpu_temp
-        self.avg = round(self.sum_of_temps / self.num_of_measurements, 1)
-
-        return cpu_temp
+        return self.temp_sampler.sample() / 100
 
     def get_temp (self):
         """
-        Obtiene la temperatura actual.
+        Obtiene la temperatura actual. Con el muestreo en segundo plano
+        activo no lee el sensor.
 
         Returns:
             float: Temperatura actual.
         """
+        if self.temp_sampler.running:
+            return self.temp_sampler.celsius(self.temp_sampler.latest())
+
         return self.read_sensor_temp()
 
+    def get_temp_centi (self):
+        """
+        Obtiene la última temperatura sin crear floats.
+
+        Returns:
+            int|None: Temperatura en centésimas de grado.
+        """
+        return self.temp_sampler.latest()
+
     def led_on (self):
         """
         Enciende el LED integrado.
@@ -130,14 +152,11 @@ class RpiPico:
         Obtiene las estadísticas actuales de temperatura.
 
         Returns:
-            dict: Contiene la temperatura máxima, mínima, promedio y actual.
+            dict: Contiene la temperatura máxima, mínima, promedio y actual
+                  de la ventana reciente, la EMA y los extremos desde el
+                  arranque.
         """
-        return {
-            'max': self.max,
-            'min': self.min,
-            'avg': self.avg,
-            'current': self.current
-        }
+        return self.temp_sampler.stats()
 
     def wifi_status (self):
         """
@@ -170,27 +189,73 @@ class RpiPico:
         print('Potencia de transmisión (TXPOWER):', self.wifi.config('txpower'))
         print('Hostname:', self.wifi.config('hostname'))
 
-        import ubinascii
-        import network
-
         # Convierte la dirección MAC a formato legible
         mac = ubinascii.hexlify(network.WLAN().config('mac'), ':').decode()
         print('Dirección MAC: ', mac)
 
-    def wifi_connect (self, ssid=None, password=None):
+    def wifi_password (self, ssid):
         """
-        Intenta conectar a Wi-Fi con las credenciales dadas.
+        Busca la contraseña de una red entre las configuradas.
 
-        Args:
-            ssid (str): ID de red para la conexión Wi-Fi.
-            password (str): Contraseña para la conexión Wi-Fi.
+        Returns:
+            str|None: Contraseña o None si la red no está configurada.
+        """
+        if ssid == self.SSID:
+            return self.PASSWORD
 
-        Retorno:
-            bool: True si se logra conectarse, False en caso contrario.
+        for ap in self.alternatives_ap:
+            if ap['ssid'] == ssid:
+                return ap['password']
+
+        return None
+
+    def load_wifi_cache (self):
         """
-        if ssid is None and password is None:
-            ssid, password = self.SSID, self.PASSWORD
+        Lee la última red a la que se conectó la placa.
+
+        Returns:
+            dict|None: ssid y bssid (hexadecimal).
+        """
+        try:
+            with open(self.wifi_cache_path) as f:
+                self.wifi_cache = ujson.load(f)
+        except Exception:
+            self.wifi_cache = None
+
+        return self.wifi_cache
 
+    def save_wifi_cache (self, ssid, bssid):
+        """
+        Guarda la red conectada para conectar directamente en el siguiente
+        arranque. Solo escribe en la flash si ha cambiado. El canal no se
+        guarda: WLAN.connect de rp2 no lo admite.
+        """
+        cache = {
+            'ssid': ssid,
+            'bssid': ubinascii.hexlify(bssid).decode() if bssid else None,
+        }
+
+        if cache == self.wifi_cache:
+            return
+
+        try:
+            tmp_path = self.wifi_cache_path + '.tmp'
+
+            with open(tmp_path, 'w') as f:
+                ujson.dump(cache, f)
+
+            os.rename(tmp_path, self.wifi_cache_path)
+            self.wifi_cache = cache
+        except Exception as e:
+            if self.DEBUG:
+                print('Error al guardar la red Wi-Fi:', e)
+
+    def wifi_begin (self):
+        """
+        Activa el Wi-Fi y, si hay una red guardada, empieza a conectar
+        directamente a ese punto de acceso sin escanear ni esperar. El resto
+        del arranque puede continuar mientras tanto hasta wifi_wait().
+        """
         self.wifi = network.WLAN(network.STA_IF)
         self.wifi.active(True)
 
@@ -200,26 +265,177 @@ class RpiPico:
         # Desactiva el ahorro de energía
         self.wifi.config(pm=0xa11140)
 
-        while not self.wifi_is_connected():
-            # Escaneamos las redes disponibles
-            available_ssids = self.wifi.scan()
-            available_ssids = [ap[0].decode('utf-8') for ap in available_ssids]
+        self.wifi_fast = False
+        cache = self.load_wifi_cache()
+
+        if not cache:
+            return
 
-            # Si la red principal se encuentra disponible, intenta conectar a ella
-            if self.SSID in available_ssids:
-                self.wifi.connect(self.SSID, self.PASSWORD)
+        password = self.wifi_password(cache.get('ssid'))
+
+        if password is None:
+            return
+
+        try:
+            bssid = cache.get('bssid')
+
+            if bssid:
+                self.wifi.connect(cache['ssid'], password,
+                                  bssid=ubinascii.unhexlify(bssid))
             else:
-                # Si no esta la red principal, intenta conectar a las redes secundarias disponibles
-                for ap in self.alternatives_ap:
-                    if ap['ssid'] in available_ssids:
-                        self.wifi.connect(ap['ssid'], ap['password'])
-            sleep(1)
-            # Verificar y mostrar información de conexión si se encuentra conectado
+                self.wifi.connect(cache['ssid'], password)
+
+            self.wifi_fast = True
+        except Exception as e:
+            if self.DEBUG:
+                print('Error al conectar a la red guardada:', e)
+
+    def wifi_wait_connected (self, timeout_ms):
+        """
+        Espera a que termine un intento de conexión.
+
+        Args:
+            timeout_ms (int): Tiempo máximo de espera.
+
+        Returns:
+            bool: True si se ha conectado.
+        """
+        deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+
+        while utime.ticks_diff(deadline, utime.ticks_ms()) > 0:
             if self.wifi_is_connected():
+                return True
+
+            # Estados negativos: contraseña incorrecta, red no encontrada...
+            if self.wifi.status() < 0:
+                return False
+
+            utime.sleep_ms(50)
+
+        return self.wifi_is_connected()
+
+    def wifi_wait (self, timeout_ms=8000):
+        """
+        Termina la conexión iniciada con wifi_begin(). Si no había red
+        guardada o la conexión directa falla, escanea las redes y conecta
+        por el camino lento.
+
+        Args:
+            timeout_ms (int): Espera máxima de la conexión directa.
+
+        Returns:
+            bool: True si se logra conectarse.
+        """
+        if self.wifi is None:
+            self.wifi_begin()
+
+        if self.wifi_fast:
+            self.wifi_fast = False
+
+            if self.wifi_wait_connected(timeout_ms):
                 if self.DEBUG:
                     self.wifi_debug()
+
                 return True
-        return False
+
+            if self.DEBUG:
+                print('La red guardada no responde, escaneando redes')
+
+            self.wifi.disconnect()
+
+        return self.wifi_connect()
+
+    def wifi_connect (self, ssid=None, password=None, timeout_ms=10000):
+        """
+        Intenta conectar a Wi-Fi con las credenciales dadas.
+
+        Args:
+            ssid (str): ID de red para la conexión Wi-Fi.
+            password (str): Contraseña para la conexión Wi-Fi.
+            timeout_ms (int): Espera máxima de cada intento de conexión.
+
+        Retorno:
+            bool: True si se logra conectarse, False en caso contrario.
+        """
+        if ssid is None and password is None:
+            ssid, password = self.SSID, self.PASSWORD
+
+        if self.wifi is None:
+            self.wifi = network.WLAN(network.STA_IF)
+            self.wifi.active(True)
+
+            # Establece el nombre del host
+            network.hostname(self.hostname)
+
+            # Desactiva el ahorro de energía
+            self.wifi.config(pm=0xa11140)
+
+        while not self.wifi_is_connected():
+            # Escaneamos las redes disponibles
+            available = {}
+
+            for ap in self.wifi.scan():
+                available.setdefault(ap[0].decode('utf-8'), ap)
+
+            # Si la red principal se encuentra disponible, intenta conectar a
+            # ella y si no, a las redes secundarias disponibles
+            candidates = [(ssid, password)]
+            candidates += [(ap['ssid'], ap['password'])
+                           for ap in self.alternatives_ap]
+
+            for candidate, key in candidates:
+                ap = available.get(candidate)
+
+                if ap is None:
+                    continue
+
+                self.wifi.connect(candidate, key)
+
+                # Verificar y mostrar información de conexión si se encuentra conectado
+                if self.wifi_wait_connected(timeout_ms):
+                    self.save_wifi_cache(candidate, ap[1])
+
+                    if self.DEBUG:
+                        self.wifi_debug()
+
+                    return True
+
+            sleep(1)
+
+        return True
+
+    def wifi_reconnect (self, use_cache=True):
+        """
+        Lanza un intento de reconexión sin escanear ni esperar a que
+        termine. El resultado se comprueba después con wifi_is_connected().
+
+        Args:
+            use_cache (bool): Conecta al BSSID de la última conexión correcta
+                              en lugar de dejar que el driver lo elija.
+        """
+        if self.wifi is None:
+            self.wifi_begin()
+            return
+
+        if not self.wifi.active():
+            self.wifi.active(True)
+
+        cache = self.wifi_cache
+        ssid = self.SSID
+        bssid = None
+
+        if cache and self.wifi_password(cache.get('ssid')) is not None:
+            ssid = cache['ssid']
+
+            if use_cache:
+                bssid = cache.get('bssid')
+
+        password = self.wifi_password(ssid)
+
+        if bssid:
+            self.wifi.connect(ssid, password, bssid=ubinascii.unhexlify(bssid))
+        else:
+            self.wifi.connect(ssid, password)
 
     def wifi_disconnect (self):
         """
@@ -0,0 +1,527 @@
+import os
+import ustruct as struct
+import ubinascii as binascii
+import utime
+from Models.Computer import Computer
+
+# Cabecera de cada instantánea del log:
+#   2s  SNAPSHOT_MAGIC
+#   B   versión del formato
+#   I   generación, crece con cada instantánea
+#   H   tamaño del contenido
+#   I   crc32 del contenido
+SNAPSHOT_MAGIC = b'KC'
+SNAPSHOT_VERSION = 2  # 2: histórico en centésimas
+SNAPSHOT_HEADER = '<2sBIHI'
+SNAPSHOT_HEADER_SIZE = struct.calcsize(SNAPSHOT_HEADER)
+
+# Cada equipo empieza con un byte de flags y su device_id (entero '<i' o
+# texto). Siguen su posición en pantalla (-1 sin ella), pulsations_total,
+# pulsations_current, pulsation_average y seq, los textos time, timestamp
+# y so (longitud y bytes) y el histórico (número de medias y '<i' cada una,
+# en centésimas como Computer.history)
+DEVICE_FORMAT = '<biifI'
+DEVICE_SIZE = struct.calcsize(DEVICE_FORMAT)
+
+HAS_TOTAL = 0x01
+HAS_CURRENT = 0x02
+HAS_AVERAGE = 0x04
+AVERAGE_INT = 0x08  # La media era un entero
+HAS_SEQ = 0x10
+ID_TEXT = 0x20  # device_id de texto en lugar de entero
+
+NO_TEXT = 0xFF  # Longitud de un texto que no existe
+
+# Rangos de los números del formato: 'i' con signo, 'I' sin signo y 'f'
+INT_MIN = -0x80000000
+INT_MAX = 0x7FFFFFFF
+UINT_MAX = 0xFFFFFFFF
+FLOAT_MAX = 3.4e38
+
+
+def to_int (value, low=INT_MIN, high=INT_MAX):
+    """
+    Convierte un valor del mensaje en un entero que se pueda empaquetar.
+    Los floats sin decimales, como 3.0 de json.loads, se admiten.
+
+    Returns:
+        int|None: Entero dentro del rango o None si no lo es.
+    """
+    if isinstance(value, bool):
+        return None
+
+    # Las comparaciones descartan también inf y nan
+    if isinstance(value, float) and low <= value <= high \
+            and value == int(value):
+        value = int(value)
+
+    if isinstance(value, int) and low <= value <= high:
+        return value
+
+    return None
+
+
+class StateSnapshot:
+    """
+    Guarda en la flash el estado de los dispositivos y su histórico para
+    mostrarlos nada más arrancar, sin esperar a que vuelvan a enviar datos.
+
+    Las instantáneas se añaden al final de un log repartido en varios
+    segmentos que se reutilizan por turnos: cada escritura es un append
+    pequeño en lugar de reescribir un fichero, y cuando un segmento se
+    llena se continúa en el siguiente. Las escrituras por hora están
+    acotadas y solo se escribe si el estado ha cambiado. Cada instantánea
+    lleva su crc32, así una escritura cortada por un apagón se descarta y
+    se usa la anterior.
+    """
+
+    def __init__ (self, path='snapshot', segments=2, segment_size=16384,
+                  max_writes_per_hour=12, max_devices=16, debug=False):
+        """
+        Args:
+            path (str): Prefijo de los segmentos del log.
+            segments (int): Número de segmentos que se alternan.
+            segment_size (int): Tamaño tras el que se pasa al siguiente.
+            max_writes_per_hour (int): Escrituras máximas por hora.
+            max_devices (int): Dispositivos más recientes que se guardan.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.path = path
+        self.segments = segments
+        self.segment_size = segment_size
+        self.min_interval_ms = 3600000 // max_writes_per_hour
+        self.max_devices = max_devices
+        self.DEBUG = debug
+
+        # Segmento en uso y generación de la última instantánea
+        self.segment = 0
+        self.generation = 0
+
+        self.dirty = False
+        self.last_write = None
+
+        # El segmento en uso acaba en una escritura cortada: lo que se
+        # añadiese detrás no se podría leer, hay que pasar al siguiente
+        self.torn = False
+
+        # Contadores para diagnóstico
+        self.writes = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self.skipped = 0  # Equipos sin un device_id que se pueda guardar
+        self.restored = 0
+        self.restore_ms = None
+
+    def segment_path (self, index):
+        return '{}_{}.bin'.format(self.path, index)
+
+    def mark_dirty (self):
+        """
+        Indica que el estado ha cambiado desde la última instantánea. Solo
+        asigna un atributo, se puede llamar en cada mensaje.
+        """
+        self.dirty = True
+
+    def tick (self, registry, now=None):
+        """
+        Tarea periódica: escribe una instantánea si hay cambios y ha pasado
+        el intervalo mínimo entre escrituras.
+
+        Args:
+            registry (DeviceRegistry): Dispositivos a guardar.
+            now (int): ticks_ms actual.
+
+        Returns:
+            bool: True si se ha escrito.
+        """
+        if not self.dirty:
+            return False
+
+        now = utime.ticks_ms() if now is None else now
+
+        if self.last_write is not None and utime.ticks_diff(
+                now, self.last_write) < self.min_interval_ms:
+            return False
+
+        self.last_write = now
+
+        return self.save(registry)
+
+    def save (self, registry):
+        """
+        Añade una instantánea al log.
+
+        Args:
+            registry (DeviceRegistry): Dispositivos a guardar.
+
+        Returns:
+            bool: True si se ha escrito.
+        """
+        generation = self.generation + 1
+
+        try:
+            payload = self.encode(registry)
+            header = struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC,
+                                 SNAPSHOT_VERSION, generation, len(payload),
+                                 binascii.crc32(payload) & 0xFFFFFFFF)
+            size = SNAPSHOT_HEADER_SIZE + len(payload)
+            path = self.segment_path(self.segment)
+            mode = 'ab'
+
+            if self.torn or \
+                    self.file_size(path) + size > self.segment_size:
+                # Segmento lleno: empezamos el siguiente desde cero
+                self.segment = (self.segment + 1) % self.segments
+                path = self.segment_path(self.segment)
+                mode = 'wb'
+
+            with open(path, mode) as f:
+                f.write(header)
+                f.write(payload)
+        except Exception as e:
+            self.errors += 1
+
+            if self.DEBUG:
+                print('Error al guardar la instantánea:', e)
+
+            return False
+
+        self.generation = generation
+        self.dirty = False
+        self.torn = False
+        self.writes += 1
+        self.bytes_written += size
+
+        return True
+
+    def restore (self, registry, now=None):
+        """
+        Carga la última instantánea válida en el registro.
+
+        Args:
+            registry (DeviceRegistry): Registro vacío en el que cargarla.
+            now (int): ticks_ms actual, los dispositivos cuentan su
+                       caducidad desde el arranque.
+
+        Returns:
+            int: Número de dispositivos restaurados.
+        """
+        start = utime.ticks_ms()
+        payload = self.find_latest()
+
+        if payload is None:
+            return 0
+
+        try:
+            devices = self.decode(payload)
+        except Exception as e:
+            self.errors += 1
+
+            if self.DEBUG:
+                print('Instantánea no válida:', e)
+
+            return 0
+
+        now = utime.ticks_ms() if now is None else now
+
+        slots = len(registry.slots)
+
+        # Primero los que tenían una posición que sigue existiendo, para
+        # que vuelvan a ella
+        for device, slot in devices:
+            if 0 <= slot < slots:
+                registry.add(device, now, slot)
+
+        # Después el resto, en las posiciones que hayan quedado libres
+        for device, slot in devices:
+            if not 0 <= slot < slots:
+                registry.add(device, now)
+
+        # Y después el orden de caducidad que tenían
+        for device, _ in devices:
+            registry.touch(device, now)
+
+        self.restored = len(devices)
+        self.restore_ms = utime.ticks_diff(utime.ticks_ms(), start)
+
+        if self.DEBUG:
+            print('Restaurados', self.restored, 'dispositivos en',
+                  self.restore_ms, 'ms')
+
+        return self.restored
+
+    def find_latest (self):
+        """
+        Busca la última instantánea válida. Solo se lee entero el segmento
+        más reciente; de los demás basta su primera cabecera.
+
+        Returns:
+            bytes|None: Contenido de la instantánea.
+        """
+        order = []
+
+        for index in range(self.segments):
+            header = self.read_header(self.segment_path(index))
+
+            if header is not None:
+                order.append((header[1], index))
+
+        # Del segmento más reciente al más antiguo, por si el último solo
+        # tiene instantáneas cortadas
+        order.sort(reverse=True)
+
+        for _, index in order:
+            found = self.scan_segment(index)
+
+            if found is not None:
+                return found
+
+        return None
+
+    def read_header (self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read(SNAPSHOT_HEADER_SIZE)
+        except OSError:
+            return None
+
+        return self.parse_header(data)
+
+    def parse_header (self, data):
+        """
+        Returns:
+            tuple|None: (versión, generación, tamaño, crc) o None.
+        """
+        if len(data) < SNAPSHOT_HEADER_SIZE:
+            return None
+
+        magic, version, generation, size, crc = struct.unpack(
+            SNAPSHOT_HEADER, data)
+
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return None
+
+        return version, generation, size, crc
+
+    def scan_segment (self, index):
+        """
+        Recorre un segmento saltando de cabecera en cabecera y devuelve la
+        última instantánea completa. Deja el log listo para continuar en
+        ese segmento.
+
+        Returns:
+            bytes|None: Contenido de la instantánea.
+        """
+        latest = None
+        torn = False
+
+        try:
+            with open(self.segment_path(index), 'rb') as f:
+                while True:
+                    data = f.read(SNAPSHOT_HEADER_SIZE)
+                    header = self.parse_header(data)
+
+                    if header is None:
+                        torn = len(data) > 0
+                        break
+
+                    _, generation, size, crc = header
+                    payload = f.read(size)
+
+                    if len(payload) < size or \
+                            binascii.crc32(payload) & 0xFFFFFFFF != crc:
+                        torn = True
+                        break
+
+                    latest = payload
+                    self.generation = max(self.generation, generation)
+        except OSError:
+            return None
+
+        if latest is not None:
+            self.segment = index
+            self.torn = torn
+
+        return latest
+
+    def encode (self, registry):
+        """
+        Codifica los dispositivos más recientes. Los números que no caben
+        en el formato se guardan como ausentes y los equipos con un
+        device_id que no es entero ni texto no se guardan.
+
+        Returns:
+            bytearray: Contenido de la instantánea.
+        """
+        devices = []
+        device = registry.newest
+
+        while device is not None and len(devices) < self.max_devices:
+            devices.append(device)
+            device = device.older
+
+        out = bytearray(1)
+        count = 0
+
+        # Del más antiguo al más reciente, como el registro
+        for device in reversed(devices):
+            flags = 0
+            device_id = device.device_id
+            total = to_int(device.pulsations_total)
+            current = to_int(device.pulsations_current)
+            average = device.pulsation_average
+            seq = to_int(device.seq, 0, UINT_MAX)
+
+            if isinstance(device_id, str):
+                flags |= ID_TEXT
+            else:
+                device_id = to_int(device_id)
+
+                if device_id is None:
+                    self.skipped += 1
+                    continue
+
+            if total is not None:
+                flags |= HAS_TOTAL
+
+            if current is not None:
+                flags |= HAS_CURRENT
+
+            if isinstance(average, (int, float)) \
+                    and not isinstance(average, bool) \
+                    and -FLOAT_MAX < average < FLOAT_MAX:
+                flags |= HAS_AVERAGE
+
+                if isinstance(average, int):
+                    flags |= AVERAGE_INT
+            else:
+                average = None
+
+            if seq is not None:
+                flags |= HAS_SEQ
+
+            out.append(flags)
+
+            if flags & ID_TEXT:
+                self.write_text(out, device_id)
+            else:
+                out.extend(struct.pack('<i', device_id))
+
+            out.extend(struct.pack(
+                DEVICE_FORMAT, -1 if device.slot is None else device.slot,
+                total or 0, current or 0, average or 0, seq or 0))
+
+            for text in (device.time, device.timestamp, device.so):
+                self.write_text(out, text)
+
+            history = device.history
+            out.append(len(history))
+
+            for value in history:
+                out.extend(struct.pack('<i', to_int(value) or 0))
+
+            count += 1
+
+        out[0] = count
+
+        return out
+
+    def decode (self, payload):
+        """
+        Reconstruye los dispositivos de una instantánea.
+
+        Returns:
+            list: [(Computer, posición en pantalla)].
+        """
+        view = memoryview(payload)
+        count = payload[0]
+        i = 1
+        devices = []
+
+        for _ in range(count):
+            flags = payload[i]
+            i += 1
+
+            if flags & ID_TEXT:
+                device_id, i = self.read_text(view, i)
+            else:
+                device_id = struct.unpack_from('<i', payload, i)[0]
+                i += 4
+
+            slot, total, current, average, seq = struct.unpack_from(
+                DEVICE_FORMAT, payload, i)
+            i += DEVICE_SIZE
+
+            device = Computer({'device_id': device_id})
+            device.counter = 0
+
+            if flags & HAS_TOTAL:
+                device.pulsations_total = total
+
+            if flags & HAS_CURRENT:
+                device.pulsations_current = current
+
+            if flags & HAS_AVERAGE:
+                device.pulsation_average = int(average) \
+                    if flags & AVERAGE_INT else round(average, 2)
+
+            if flags & HAS_SEQ:
+                device.seq = seq
+
+            device.time, i = self.read_text(view, i)
+            device.timestamp, i = self.read_text(view, i)
+            device.so, i = self.read_text(view, i)
+
+            length = payload[i]
+            i += 1
+
+            for _ in range(length):
+                device.history.append(struct.unpack_from('<i', payload, i)[0])
+                i += 4
+
+            devices.append((device, slot))
+
+        return devices
+
+    def write_text (self, out, text):
+        if text is None:
+            out.append(NO_TEXT)
+            return
+
+        data = str(text).encode()[:NO_TEXT - 1]
+        out.append(len(data))
+        out.extend(data)
+
+    def read_text (self, view, i):
+        """
+        Returns:
+            tuple: (texto o None, posición siguiente).
+        """
+        length = view[i]
+
+        if length == NO_TEXT:
+            return None, i + 1
+
+        return str(bytes(view[i + 1:i + 1 + length]), 'utf-8'), \
+            i + 1 + length
+
+    def file_size (self, path):
+        try:
+            return os.stat(path)[6]
+        except OSError:
+            return 0
+
+    def stats (self):
+        """
+        Returns:
+            dict: Escrituras, bytes escritos, errores y la restauración.
+        """
+        return {
+            'writes': self.writes,
+            'bytes_written': self.bytes_written,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'generation': self.generation,
+            'restored': self.restored,
+            'restore_ms': self.restore_ms,
+        }
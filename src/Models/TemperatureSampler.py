@@ -0,0 +1,163 @@
+from machine import Timer
+from Models.RingStats import RingStats
+
+
+class TemperatureSampler:
+    """
+    Muestreo en segundo plano del sensor de temperatura interno.
+
+    Un Timer periódico lee el ADC varias veces seguidas y suma las lecturas
+    (sobremuestreo) para ganar resolución y quitar ruido. La suma se
+    convierte a centésimas de grado solo con enteros pequeños y se guarda
+    en un RingStats, que mantiene la media, el máximo y el mínimo de la
+    ventana; además se lleva una media exponencial (EMA) en punto fijo.
+
+    Leer la temperatura solo consulta los últimos valores calculados: ni
+    espera al ADC ni crea floats, salvo las funciones que devuelven grados.
+    """
+
+    # Bits de resolución ganados: se suman 4 ** OVERSAMPLE_BITS lecturas
+    OVERSAMPLE_BITS = 2
+
+    # Desplazamiento de la conversión en punto fijo
+    SCALE_SHIFT = 12
+
+    # Peso de cada muestra en la EMA: 1 / 2 ** EMA_SHIFT
+    EMA_SHIFT = 3
+
+    def __init__ (self, sensor, period_ms=1000, window=60, voltage=3.3,
+                  reference_voltage=0.706, reference_temp=27,
+                  slope=0.001721):
+        """
+        Args:
+            sensor (ADC): Sensor a leer.
+            period_ms (int): Milisegundos entre muestras.
+            window (int): Muestras de la ventana de media, máximo y mínimo.
+            voltage (float): Tensión de referencia del ADC.
+            reference_voltage (float): Tensión del sensor a reference_temp.
+            reference_temp (int): Temperatura de referencia en grados.
+            slope (float): Voltios por grado del sensor.
+        """
+        self.sensor = sensor
+        self.period_ms = period_ms
+        self.samples = 4 ** self.OVERSAMPLE_BITS
+
+        # centésimas = offset - (lectura * scale) >> SCALE_SHIFT, con la
+        # lectura sobremuestreada de 16 + OVERSAMPLE_BITS bits. Los floats
+        # solo se usan aquí para calcular las constantes.
+        degrees_per_step = voltage / 65535 / slope * 100
+        self.scale = int(degrees_per_step * (1 << (
+            self.SCALE_SHIFT - self.OVERSAMPLE_BITS)) + 0.5)
+        self.offset = int(reference_temp * 100 +
+                          reference_voltage / slope * 100 + 0.5)
+
+        self.history = RingStats(window)
+        self.timer = None
+        self.running = False  # Muestreo periódico activo
+        self.locked = False  # Pausa el muestreo, p. ej. al usar el ADC
+        self.reset()
+
+    def reset (self):
+        self.history.reset()
+        self.ema = None  # EMA en centésimas << EMA_SHIFT
+        self.count = 0
+
+    def start (self):
+        """
+        Arranca el muestreo periódico en segundo plano.
+        """
+        if self.timer is None:
+            self.timer = Timer(-1)
+
+        self.timer.init(mode=Timer.PERIODIC, period=self.period_ms,
+                        callback=self.on_timer)
+        self.running = True
+
+    def stop (self):
+        if self.timer is not None:
+            self.timer.deinit()
+
+        self.running = False
+
+    def on_timer (self, timer):
+        if not self.locked:
+            self.sample()
+
+    def sample (self):
+        """
+        Toma una muestra sobremuestreada y actualiza las estadísticas.
+
+        Returns:
+            int: Temperatura en centésimas de grado.
+        """
+        read = self.sensor.read_u16
+        total = 0
+
+        for _ in range(self.samples):
+            total += read()
+
+        centi = self.offset - (((total >> self.OVERSAMPLE_BITS) *
+                                self.scale) >> self.SCALE_SHIFT)
+
+        return self.add(centi)
+
+    def add (self, centi):
+        """
+        Añade una temperatura a las estadísticas.
+
+        Args:
+            centi (int): Temperatura en centésimas de grado.
+
+        Returns:
+            int: La misma temperatura.
+        """
+        self.history.append(centi)
+        self.count += 1
+
+        if self.ema is None:
+            self.ema = centi << self.EMA_SHIFT
+        else:
+            self.ema += centi - (self.ema >> self.EMA_SHIFT)
+
+        return centi
+
+    def latest (self):
+        """
+        Lectura sin bloqueo de la última muestra.
+
+        Returns:
+            int|None: Temperatura en centésimas de grado.
+        """
+        return self.history.last()
+
+    def ema_centi (self):
+        """
+        Returns:
+            int|None: Media exponencial en centésimas de grado.
+        """
+        return None if self.ema is None else self.ema >> self.EMA_SHIFT
+
+    def celsius (self, centi):
+        return None if centi is None else centi / 100
+
+    def stats (self):
+        """
+        Estadísticas en grados; solo se convierten al pedirlas.
+
+        Returns:
+            dict: Temperatura actual, EMA, media, máximo y mínimo de la
+                  ventana y extremos desde el arranque.
+        """
+        history = self.history
+        celsius = self.celsius
+
+        return {
+            'current': celsius(history.last()),
+            'ema': celsius(self.ema_centi()),
+            'avg': celsius(history.mean()),
+            'max': celsius(history.max()),
+            'min': celsius(history.min()),
+            'lifetime_max': celsius(history.lifetime_max),
+            'lifetime_min': celsius(history.lifetime_min),
+            'samples': self.count,
+        }
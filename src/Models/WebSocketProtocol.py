@@ -0,0 +1,328 @@
+import uhashlib as hashlib
+import ubinascii as binascii
+
+# GUID fijo definido en el RFC 6455 para calcular Sec-WebSocket-Accept
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Opcodes de los frames
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Códigos de cierre
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+# Tamaño máximo de la cabecera HTTP del handshake
+MAX_HANDSHAKE_SIZE = 2048
+
+
+class WebSocketProtocol:
+    """
+    Implementación mínima del protocolo WebSocket (RFC 6455) en el lado
+    del servidor.
+
+    Trabaja sobre el buffer de un MessageFramer: los frames se
+    desenmascaran en el propio buffer y los mensajes se devuelven como
+    memoryview, sin copias. Gestiona internamente el handshake HTTP Upgrade,
+    los frames de control (ping, pong y close) y la fragmentación de
+    mensajes.
+
+    Las peticiones GET sin Upgrade a una de las rutas registradas se
+    responden como HTTP normal y se cierra la conexión.
+    """
+
+    def __init__ (self, conn, framer, routes=None):
+        """
+        Args:
+            conn (Client): Conexión con el cliente, debe implementar send().
+            framer (MessageFramer): Buffer de recepción de la conexión.
+            routes (dict): Rutas HTTP {path: (función, content type)}.
+        """
+        self.conn = conn
+        self.framer = framer
+        self.routes = routes
+        self.max_message_size = framer.max_message_size
+        self.handshake_done = False
+        self.closed = False
+
+        # Mensaje fragmentado en curso, solo se reserva si llega a usarse
+        self.fragments = None
+        self.fragment_opcode = None
+
+    def next_message (self):
+        """
+        Extrae el siguiente mensaje de datos completo.
+
+        Returns:
+            tuple|None: (opcode, payload) o None si faltan datos.
+        """
+        if not self.handshake_done and not self.do_handshake():
+            return None
+
+        while not self.closed:
+            frame = self.read_frame()
+
+            if frame is None:
+                return None
+
+            fin, opcode, payload = frame
+
+            if opcode >= OP_CLOSE:
+                self.handle_control(opcode, payload)
+                continue
+
+            if opcode == OP_CONTINUATION:
+                if self.fragments is None:
+                    self.close(CLOSE_PROTOCOL_ERROR)
+                    return None
+
+                if len(self.fragments) + len(payload) > self.max_message_size:
+                    self.close(CLOSE_TOO_BIG)
+                    return None
+
+                self.fragments.extend(payload)
+
+                if fin:
+                    message = (self.fragment_opcode, self.fragments)
+                    self.fragments = None
+                    self.fragment_opcode = None
+
+                    return message
+            elif self.fragments is not None:
+                # No se puede iniciar un mensaje sin terminar el anterior
+                self.close(CLOSE_PROTOCOL_ERROR)
+                return None
+            elif fin:
+                return opcode, payload
+            else:
+                # El payload apunta al buffer de recepción, hay que copiarlo
+                self.fragments = bytearray(payload)
+                self.fragment_opcode = opcode
+
+        return None
+
+    def do_handshake (self):
+        """
+        Responde a la petición HTTP Upgrade cuando la cabecera está completa.
+
+        Returns:
+            bool: True si el handshake se ha completado.
+        """
+        framer = self.framer
+
+        # Solo ocurre una vez por conexión, podemos permitirnos la copia
+        request = bytes(framer.view[framer.start:framer.end])
+        end = request.find(b'\r\n\r\n')
+
+        if end < 0:
+            if len(request) > MAX_HANDSHAKE_SIZE:
+                self.reject(b'431 Request Header Fields Too Large')
+
+            return False
+
+        key = None
+        upgrade = False
+        lines = request[:end].split(b'\r\n')
+
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+
+            if name == b'sec-websocket-key':
+                key = value.strip()
+            elif name == b'upgrade' and value.strip().lower() == b'websocket':
+                upgrade = True
+
+        if not upgrade and self.routes:
+            self.respond(lines[0])
+            return False
+
+        if not upgrade or not key:
+            self.reject(b'426 Upgrade Required')
+            return False
+
+        accept = binascii.b2a_base64(hashlib.sha1(key + WS_GUID).digest())
+
+        self.conn.send(b'HTTP/1.1 101 Switching Protocols\r\n'
+                       b'Upgrade: websocket\r\n'
+                       b'Connection: Upgrade\r\n'
+                       b'Sec-WebSocket-Accept: ' + accept.strip() +
+                       b'\r\n\r\n')
+
+        framer.consume(end + 4)
+        self.handshake_done = True
+
+        return True
+
+    def respond (self, request_line):
+        """
+        Responde a una petición HTTP normal con la ruta registrada y marca
+        la conexión como cerrada.
+
+        Args:
+            request_line (bytes): Primera línea de la petición.
+        """
+        parts = request_line.split(b' ')
+        path = parts[1].split(b'?')[0] if len(parts) > 2 else None
+        route = self.routes.get(path)
+
+        if parts[0] != b'GET' or route is None:
+            self.reject(b'404 Not Found')
+            return
+
+        handler, content_type = route
+        body = handler()
+
+        self.conn.send(b'HTTP/1.1 200 OK\r\nContent-Type: ' + content_type +
+                       b'\r\nContent-Length: ' + str(len(body)).encode() +
+                       b'\r\nConnection: close\r\n\r\n')
+        self.conn.send(body)
+        self.closed = True
+
+    def reject (self, status):
+        """
+        Rechaza la petición HTTP y marca la conexión como cerrada.
+
+        Args:
+            status (bytes): Línea de estado HTTP a devolver.
+        """
+        self.conn.send(b'HTTP/1.1 ' + status +
+                       b'\r\nConnection: close\r\nContent-Length: 0\r\n\r\n')
+        self.closed = True
+
+    def read_frame (self):
+        """
+        Extrae un frame completo del buffer si lo hay.
+
+        Returns:
+            tuple|None: (fin, opcode, payload) o None si faltan datos.
+        """
+        framer = self.framer
+        buf = framer.buf
+        start = framer.start
+        size = framer.end - start
+
+        if size < 2:
+            return None
+
+        fin = buf[start] & 0x80
+        opcode = buf[start] & 0x0F
+        masked = buf[start + 1] & 0x80
+        length = buf[start + 1] & 0x7F
+        offset = 2
+
+        if length == 126:
+            if size < 4:
+                return None
+
+            length = (buf[start + 2] << 8) | buf[start + 3]
+            offset = 4
+        elif length == 127:
+            if size < 10:
+                return None
+
+            length = 0
+
+            for i in range(start + 2, start + 10):
+                length = (length << 8) | buf[i]
+
+            offset = 10
+
+        # Los frames del cliente siempre deben ir enmascarados y los de
+        # control no pueden fragmentarse ni superar 125 bytes.
+        if not masked or (opcode >= OP_CLOSE and (not fin or length > 125)):
+            self.close(CLOSE_PROTOCOL_ERROR)
+            return None
+
+        if length > self.max_message_size:
+            self.close(CLOSE_TOO_BIG)
+            return None
+
+        if size < offset + 4 + length:
+            return None
+
+        mask_at = start + offset
+        begin = mask_at + 4
+        m0 = buf[mask_at]
+        m1 = buf[mask_at + 1]
+        m2 = buf[mask_at + 2]
+        m3 = buf[mask_at + 3]
+
+        # Desenmascaramos en el propio buffer de recepción
+        i = begin
+        stop = begin + length
+
+        while i + 3 < stop:
+            buf[i] ^= m0
+            buf[i + 1] ^= m1
+            buf[i + 2] ^= m2
+            buf[i + 3] ^= m3
+            i += 4
+
+        mask = (m0, m1, m2)
+        j = 0
+
+        while i < stop:
+            buf[i] ^= mask[j]
+            i += 1
+            j += 1
+
+        framer.consume(offset + 4 + length)
+
+        return fin, opcode, framer.view[begin:stop]
+
+    def handle_control (self, opcode, payload):
+        """
+        Responde a los frames de control.
+
+        Args:
+            opcode (int): Opcode del frame.
+            payload (memoryview): Contenido del frame.
+        """
+        if opcode == OP_PING:
+            self.send(payload, OP_PONG)
+        elif opcode == OP_CLOSE:
+            # Devolvemos el mismo código de cierre que nos envían
+            if not self.closed:
+                self.send(payload[:2], OP_CLOSE)
+
+            self.closed = True
+
+    def send (self, payload, opcode=OP_TEXT):
+        """
+        Envía un frame al cliente (sin máscara, como exige el RFC).
+
+        Args:
+            payload (bytes): Contenido a enviar.
+            opcode (int): Opcode del frame.
+        """
+        length = len(payload)
+
+        if length < 126:
+            frame = bytearray((0x80 | opcode, length))
+        elif length < 65536:
+            frame = bytearray((0x80 | opcode, 126, length >> 8, length & 0xFF))
+        else:
+            frame = bytearray((0x80 | opcode, 127, 0, 0, 0, 0,
+                               (length >> 24) & 0xFF, (length >> 16) & 0xFF,
+                               (length >> 8) & 0xFF, length & 0xFF))
+
+        frame.extend(payload)
+        self.conn.send(frame)
+
+    def close (self, code=CLOSE_NORMAL):
+        """
+        Envía un frame de cierre y marca la conexión como cerrada.
+
+        Args:
+            code (int): Código de cierre.
+        """
+        if not self.closed:
+            self.send(bytes((code >> 8, code & 0xFF)), OP_CLOSE)
+
+        self.closed = True
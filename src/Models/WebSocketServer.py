@@ -1,46 +1,959 @@
 import usocket as socket
+import uselect as select
+import uerrno as errno
 import ujson as json
-import _thread
+import ustruct as struct
+import utime
+from Models.WebSocketProtocol import WebSocketProtocol, OP_TEXT, OP_BINARY
+from Models.MessageFramer import MessageFramer, FRAMING_LENGTH
+from Models.MessageDecoder import RECORD_MAGIC, RECORD_SIZE, ACK_MAGIC, \
+    ACK_FORMAT, BINARY_VERSION
+
+# Formatos de mensaje que puede negociar cada conexión
+FORMAT_JSON = 'json'
+FORMAT_BINARY = 'binary'
+
+# Modos de conexión admitidos
+MODE_RAW = 'raw'  # Socket TCP plano con mensajes delimitados
+MODE_WEBSOCKET = 'websocket'  # WebSocket (RFC 6455) con conexión persistente
+MODE_AUTO = 'auto'  # Detecta el modo por los primeros bytes recibidos
+
+# Eventos de poll que indican que la conexión ya no es utilizable
+POLL_CLOSED = select.POLLHUP | select.POLLERR
+
+# Los equipos envían device_id al principio del mensaje, basta con mirar
+# los primeros bytes para descartar los no autorizados sin decodificarlo.
+DEVICE_ID_KEY = b'"device_id"'
+PEEK_SIZE = 64
+
+# Primer byte de un lote de mensajes JSON
+OPEN_ARRAY = 0x5B
+
+
+def peek_device_id (payload):
+    """
+    Busca el device_id en los primeros bytes de un mensaje JSON sin
+    decodificarlo.
+
+    Args:
+        payload (memoryview): Mensaje recibido.
+
+    Returns:
+        str|None: Identificador, o None si no aparece completo al principio.
+    """
+    head = bytes(payload[:PEEK_SIZE])
+    start = head.find(DEVICE_ID_KEY)
+
+    if start < 0:
+        return None
+
+    size = len(head)
+    i = start + len(DEVICE_ID_KEY)
+
+    # Espacios y dos puntos entre la clave y el valor
+    while i < size and head[i] in (0x20, 0x3A, 0x09):
+        i += 1
+
+    quoted = i < size and head[i] == 0x22
+
+    if quoted:
+        i += 1
+
+    end = i
+
+    while end < size and (0x30 <= head[end] <= 0x39
+                          or (quoted and head[end] != 0x22)):
+        end += 1
+
+    # Valor vacío o cortado por el final de la ventana
+    if end == i or end >= size:
+        return None
+
+    return head[i:end].decode()
+
+
+class Client:
+    """
+    Estado de una conexión abierta con un equipo.
+    """
+
+    def __init__ (self, conn, addr, framer, now, max_output_size=8192):
+        self.conn = conn
+        self.addr = addr
+        self.framer = framer
+        self.mode = None
+        self.ws = None
+        self.last_activity = now
+
+        # Bytes que el socket aún no ha admitido, se envían con POLLOUT
+        self.out = None
+        self.out_start = 0
+        self.out_since = None  # Último avance de la salida pendiente
+        self.max_output_size = max_output_size
+
+        # Eventos registrados en el poller y cierre a la espera de enviar
+        # lo pendiente
+        self.events = select.POLLIN
+        self.closing = False
+
+        # Formato negociado con un saludo: registros binarios y
+        # confirmaciones cortas en lugar de devolver cada mensaje
+        self.binary = False
+        self.acks = False
+
+        # Instante en el que empezó a llegar un mensaje aún incompleto
+        self.read_started = None
+
+    def send (self, data):
+        """
+        Envía los datos sin esperar. Lo que el socket no admite se guarda
+        en el buffer de salida y el servidor lo envía cuando el socket
+        avisa con POLLOUT, así un cliente lento no detiene a los demás.
+
+        Args:
+            data (bytes): Datos a enviar.
+
+        Raises:
+            OSError: ENOBUFS si la salida pendiente supera el máximo; el
+                     servidor cierra entonces la conexión.
+        """
+        if self.out is None:
+            sent = self.write(data)
+
+            if sent >= len(data):
+                return
+
+            self.out = bytearray(memoryview(data)[sent:])
+            self.out_start = 0
+            self.out_since = utime.ticks_ms()
+        else:
+            if self.out_start:
+                self.out = self.out[self.out_start:]
+                self.out_start = 0
+
+            self.out.extend(data)
+
+        if len(self.out) > self.max_output_size:
+            raise OSError(errno.ENOBUFS)
+
+    def write (self, data):
+        """
+        Returns:
+            int: Bytes que ha admitido el socket, 0 si está lleno.
+        """
+        try:
+            sent = self.conn.send(data)
+        except OSError as e:
+            if e.args[0] != errno.EAGAIN:
+                raise
+
+            return 0
+
+        return sent or 0
+
+    def flush (self):
+        """
+        Envía lo que admita el socket del buffer de salida.
+
+        Returns:
+            bool: True si ya no queda nada pendiente.
+        """
+        out = self.out
+
+        if out is None:
+            return True
+
+        sent = self.write(memoryview(out)[self.out_start:])
+        start = self.out_start + sent
+
+        if start >= len(out):
+            self.out = None
+            self.out_since = None
+            return True
+
+        if sent:
+            # Avanza: el plazo cuenta desde el último envío
+            self.out_since = utime.ticks_ms()
+
+        self.out_start = start
+
+        return False
+
+    def pending (self):
+        """
+        Indica si hay un mensaje a medio recibir.
+
+        Returns:
+            bool: True si quedan bytes sin procesar.
+        """
+        return bool(self.framer.pending() or (self.ws and self.ws.fragments))
+
+    def reply (self, payload):
+        """
+        Responde a un mensaje respetando la separación de mensajes que usa
+        el cliente.
+
+        Args:
+            payload (bytes): Respuesta a enviar.
+        """
+        size = len(payload)
+
+        # Un único envío por respuesta para no esperar al algoritmo de Nagle
+        if self.framer.mode == FRAMING_LENGTH:
+            out = bytearray((size >> 24, (size >> 16) & 0xFF,
+                             (size >> 8) & 0xFF, size & 0xFF))
+            out.extend(payload)
+        else:
+            out = bytearray(payload)
+            out.append(0x0A)
+
+        self.send(out)
 
 
 class WebSocketServer:
 
-    def __init__ (self, callback, ip='0.0.0.0', port=80):
+    def __init__ (self, callback, ip='0.0.0.0', port=80, mode=MODE_AUTO,
+                  max_message_size=2048, max_clients=6, idle_timeout_ms=120000,
+                  read_timeout_ms=5000, device_filter=None, decoder=None,
+                  max_output_size=8192, debug=False):
+        """
+        Args:
+            callback (function): Función que recibe cada mensaje decodificado.
+                                 Si devuelve True se pide al cliente un
+                                 mensaje completo de ese equipo (resync).
+            ip (str): Dirección en la que escuchar.
+            port (int): Puerto en el que escuchar.
+            mode (str): MODE_AUTO, MODE_RAW o MODE_WEBSOCKET.
+            max_message_size (int): Tamaño máximo de un mensaje.
+            max_clients (int): Número máximo de conexiones simultáneas.
+            idle_timeout_ms (int): Tiempo sin recibir datos tras el que se
+                                   cierra la conexión.
+            read_timeout_ms (int): Tiempo máximo para completar un mensaje
+                                   empezado o para enviar lo pendiente.
+            max_output_size (int): Bytes pendientes de enviar a un cliente
+                                   tras los que se cierra su conexión.
+            device_filter (function): Recibe un device_id y devuelve False
+                                      si el equipo no está autorizado.
+            decoder (MessageDecoder): Decodificador especializado que evita
+                                      json.loads para los mensajes conocidos.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
         self.callback = callback
         self.ip = ip
         self.port = port
+        self.mode = mode
+        self.max_message_size = max_message_size
+        self.max_clients = max_clients
+        self.idle_timeout_ms = idle_timeout_ms
+        self.read_timeout_ms = read_timeout_ms
+        self.max_output_size = max_output_size
+        self.device_filter = device_filter
+        self.decoder = decoder
+        self.DEBUG = debug
+
+        # Contadores para diagnóstico, solo se incrementan
+        self.received = 0  # Mensajes recibidos
+        self.rejected = 0  # Descartados por venir de equipos no autorizados
+        self.parse_errors = 0  # Mensajes que no son JSON válido
+        self.callback_errors = 0  # Errores al procesar un mensaje
+        self.batched = 0  # Mensajes recibidos dentro de lotes
+        self.resyncs = 0  # Mensajes completos pedidos tras un hueco
+        self.accepted = 0  # Conexiones aceptadas
+        self.evicted = 0  # Conexiones expulsadas por inactividad o sitio
+
+        # Rutas HTTP servidas en el mismo puerto {path: (función, tipo)}
+        self.routes = {}
+
+        # Confirmación de los registros binarios, reutilizada en cada una
+        self.ack = bytearray(struct.calcsize(ACK_FORMAT))
+
+        # Número de secuencia del último mensaje procesado
+        self.seq = None
+
+        # Equipos a los que pedir un mensaje completo tras cada lectura
+        self.resync = []
+
         self.s = socket.socket()
+        self.poller = select.poll()
+        self.clients = {}
+
+        # Buffers de recepción reservados una sola vez y reutilizados entre
+        # conexiones para no fragmentar el heap.
+        self.framers = [MessageFramer(max_message_size)
+                        for _ in range(max_clients)]
+        self.listening = False
+
+        # Tareas periódicas [próxima ejecución, intervalo, callback]
+        self.tasks = []
+        self.every(1000, self.check_deadlines)
+
+    def every (self, interval_ms, callback):
+        """
+        Registra una tarea que el bucle de eventos ejecuta periódicamente.
+
+        Args:
+            interval_ms (int): Intervalo entre ejecuciones.
+            callback (function): Función a ejecutar, recibe ticks_ms actual.
+        """
+        self.tasks.append([utime.ticks_add(utime.ticks_ms(), interval_ms),
+                           interval_ms, callback])
+
+    def route (self, path, handler, content_type=b'text/plain'):
+        """
+        Sirve una ruta HTTP GET en el mismo puerto que los mensajes. Solo
+        se atiende en MODE_AUTO y MODE_WEBSOCKET, donde se esperan
+        peticiones HTTP.
+
+        Args:
+            path (bytes): Ruta, por ejemplo b'/metrics'.
+            handler (function): Devuelve el cuerpo de la respuesta en bytes.
+            content_type (bytes): Tipo de contenido de la respuesta.
+        """
+        self.routes[path] = (handler, content_type)
+
+    def listen (self):
+        """
+        Abre el socket de escucha en modo no bloqueante.
+        """
+        if self.listening:
+            return
 
-    def start (self):
         self.s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.s.bind((self.ip, self.port))
-        self.s.listen(1)
+        self.s.listen(self.max_clients)
+        self.s.setblocking(False)
+        self.poller.register(self.s, select.POLLIN)
+        self.listening = True
+
+    def start (self):
+        self.listen()
 
         while True:
-            conn, addr = self.s.accept()
-            print('Conexión establecida con:', addr)
+            self.poll_once(self.next_task_timeout())
 
-            # Creamos un nuevo hilo para manejar cada conexión
-            self.handle_client(conn)
+    def next_task_timeout (self):
+        """
+        Calcula cuánto puede esperar poll hasta la siguiente tarea.
 
-    def handle_client (self, conn):
-        while True:
-            data = conn.recv(1024)
+        Returns:
+            int: Milisegundos hasta la próxima tarea periódica.
+        """
+        now = utime.ticks_ms()
+        timeout = 1000
 
-            if data:
+        for task in self.tasks:
+            timeout = min(timeout, max(0, utime.ticks_diff(task[0], now)))
+
+        return timeout
+
+    def poll_once (self, timeout_ms):
+        """
+        Atiende los eventos de red pendientes y las tareas periódicas.
+
+        Args:
+            timeout_ms (int): Tiempo máximo de espera por eventos.
+        """
+        # poll() devuelve una lista, así podemos registrar y eliminar
+        # conexiones mientras recorremos los eventos.
+        for obj, event in self.poller.poll(timeout_ms):
+            if obj is self.s:
+                self.accept()
+                continue
+
+            client = self.clients.get(obj)
+
+            if client is None:
                 try:
-                    data = data.decode('utf-8')
-                    print("Datos recibidos: ", data)
-                    data_dict = json.loads(data)
+                    self.poller.unregister(obj)
+                except Exception:
+                    pass
+
+                continue
+
+            try:
+                if event & select.POLLOUT and client.flush() \
+                        and client.closing:
+                    self.close_client(client)
+                    continue
 
-                    response = json.dumps(data_dict)
-                    conn.send(response.encode('utf-8'))
+                if event & select.POLLIN and not client.closing:
+                    self.handle_client(client)
+                elif event & POLL_CLOSED:
+                    self.close_client(client)
+                    continue
+            except Exception as e:
+                if self.DEBUG:
+                    print("Error en la conexión: ", client.addr, e)
 
-                    if "device_id" in data_dict:
-                        self.callback(data_dict)
+                self.close_client(client)
+                continue
+
+            self.watch(client)
+
+        now = utime.ticks_ms()
+
+        for task in self.tasks:
+            if utime.ticks_diff(now, task[0]) >= 0:
+                task[0] = utime.ticks_add(now, task[1])
+
+                try:
+                    task[2](now)
                 except Exception as e:
-                    print("Error en el manejo de datos: ", e)
+                    if self.DEBUG:
+                        print("Error en tarea periódica: ", e)
+
+    def accept (self):
+        try:
+            conn, addr = self.s.accept()
+        except OSError:
+            return
+
+        if len(self.clients) >= self.max_clients:
+            # Dejamos sitio expulsando al cliente que lleva más tiempo inactivo
+            oldest = None
+
+            for client in self.clients.values():
+                if oldest is None or utime.ticks_diff(
+                        client.last_activity, oldest.last_activity) < 0:
+                    oldest = client
+
+            self.close_client(oldest)
+            self.evicted += 1
+
+        conn.setblocking(False)
+        framer = self.framers.pop()
+        framer.reset()
+        self.clients[conn] = Client(conn, addr, framer, utime.ticks_ms(),
+                                    self.max_output_size)
+        self.poller.register(conn, select.POLLIN)
+        self.accepted += 1
+
+        if self.DEBUG:
+            print('Conexión establecida con:', addr)
+
+    def watch (self, client):
+        """
+        Ajusta los eventos del poller de una conexión: POLLOUT mientras
+        tenga salida pendiente y sin POLLIN si está cerrándose.
+        """
+        if client.conn not in self.clients:
+            return
+
+        events = 0 if client.closing else select.POLLIN
+
+        if client.out is not None:
+            events |= select.POLLOUT
+
+        if events != client.events:
+            client.events = events
+            self.poller.modify(client.conn, events)
+
+    def finish_client (self, client):
+        """
+        Cierra la conexión después de enviar lo que tenga pendiente.
+        """
+        if client.out is None:
+            self.close_client(client)
+        else:
+            client.closing = True
+
+    def close_client (self, client):
+        if self.clients.pop(client.conn, None) is None:
+            return
+
+        self.framers.append(client.framer)
+
+        try:
+            self.poller.unregister(client.conn)
+        except Exception:
+            pass
+
+        try:
+            client.conn.close()
+        except Exception:
+            pass
+
+        if self.DEBUG:
+            print('Conexión cerrada con:', client.addr)
+
+    def close_clients (self):
+        """
+        Cierra todas las conexiones abiertas sin cerrar el socket de
+        escucha, por ejemplo al caerse el Wi-Fi.
+        """
+        for client in list(self.clients.values()):
+            self.close_client(client)
+
+    def check_deadlines (self, now):
+        """
+        Expulsa a los clientes inactivos o que no completan un mensaje.
+
+        Args:
+            now (int): ticks_ms actual.
+        """
+        for client in list(self.clients.values()):
+            if utime.ticks_diff(now, client.last_activity) > self.idle_timeout_ms:
+                self.close_client(client)
+                self.evicted += 1
+            elif client.read_started is not None and utime.ticks_diff(
+                    now, client.read_started) > self.read_timeout_ms:
+                self.close_client(client)
+                self.evicted += 1
+            elif client.out_since is not None and utime.ticks_diff(
+                    now, client.out_since) > self.read_timeout_ms:
+                # No vacía su buffer de recepción: peer lento
+                self.close_client(client)
+                self.evicted += 1
+
+    def detect_mode (self, first_byte):
+        """
+        Determina el modo de la conexión a partir del primer byte recibido.
+
+        Args:
+            first_byte (int): Primer byte recibido del cliente.
+
+        Returns:
+            str: MODE_WEBSOCKET o MODE_RAW.
+        """
+        if self.mode != MODE_AUTO:
+            return self.mode
+
+        # Un handshake WebSocket siempre empieza con una petición GET
+        return MODE_WEBSOCKET if first_byte == 0x47 else MODE_RAW
+
+    def handle_client (self, client):
+        framer = client.framer
+        n = framer.fill(client.conn)
+
+        if n is None:
+            return
 
+        if not n:
+            self.close_client(client)
+            return
+
+        client.last_activity = utime.ticks_ms()
+
+        if client.mode is None:
+            first_byte = framer.buf[framer.start]
+            client.mode = self.detect_mode(first_byte)
+
+            if client.mode == MODE_WEBSOCKET:
+                client.ws = WebSocketProtocol(client, framer, self.routes)
+            elif first_byte == 0:
+                # Una longitud de 4 bytes siempre empieza por 0 con el tamaño
+                # máximo de mensaje admitido, un JSON nunca.
+                framer.mode = FRAMING_LENGTH
+
+        if client.mode == MODE_WEBSOCKET:
+            self.handle_websocket(client)
+        else:
+            self.handle_raw(client)
+
+        if client.pending():
+            if client.read_started is None:
+                client.read_started = client.last_activity
+        else:
+            client.read_started = None
+
+    def handle_raw (self, client):
+        """
+        Socket TCP plano: mensajes JSON separados por salto de línea (o
+        enviados de uno en uno, como hacen los clientes antiguos) o
+        precedidos por su longitud.
+        """
+        framer = client.framer
+        acked = None
+        self.resync.clear()
+
+        while client.conn in self.clients:
+            payload = framer.next_message()
+
+            if payload is None:
+                break
+
+            if not self.process(client, payload):
+                continue
+
+            if client.acks:
+                if self.seq is not None:
+                    acked = self.seq
             else:
-                conn.close()
+                client.reply(payload)
+
+        # Una única confirmación acumulada por lectura, aunque hayan llegado
+        # varios mensajes seguidos
+        if acked is not None and client.conn in self.clients:
+            client.reply(self.encode_ack(client, acked))
+
+        for device_id in self.resync:
+            if client.conn in self.clients:
+                client.reply(self.encode_resync(device_id))
+
+    def handle_websocket (self, client):
+        """
+        Modo WebSocket: la conexión se mantiene abierta y transporta tantos
+        mensajes como el cliente necesite hasta recibir un frame de cierre.
+        """
+        ws = client.ws
+        acked = None
+        self.resync.clear()
+
+        while not ws.closed:
+            message = ws.next_message()
+
+            if message is None:
+                break
+
+            opcode, payload = message
+
+            if opcode not in (OP_TEXT, OP_BINARY):
+                continue
+
+            if not self.process(client, payload):
+                continue
+
+            if client.acks:
+                if self.seq is not None:
+                    acked = self.seq
+            else:
+                ws.send(payload, opcode)
+
+        if acked is not None and not ws.closed:
+            ws.send(self.encode_ack(client, acked),
+                    OP_BINARY if client.binary else OP_TEXT)
+
+        for device_id in self.resync:
+            if not ws.closed:
+                ws.send(self.encode_resync(device_id), OP_TEXT)
+
+        if ws.closed:
+            self.finish_client(client)
+
+    def process (self, client, payload):
+        """
+        Procesa un mensaje en el formato que corresponda. Deja en self.seq
+        el número de secuencia del último mensaje atendido, si lo traía.
+
+        Args:
+            client (Client): Conexión por la que llega.
+            payload (memoryview): Mensaje recibido.
+
+        Returns:
+            bool: True si el mensaje es válido y debe confirmarse al cliente.
+        """
+        self.seq = None
+        size = len(payload)
+
+        if client.binary and size and size % RECORD_SIZE == 0 \
+                and payload[0] == RECORD_MAGIC:
+            return self.process_binary(payload)
+
+        return self.process_message(payload, client)
+
+    def encode_ack (self, client, seq):
+        """
+        Confirmación acumulada: el servidor ha atendido todos los mensajes
+        de la conexión hasta ese seq.
+
+        Args:
+            client (Client): Conexión a la que se confirma.
+            seq (int): Número de secuencia del último mensaje atendido.
+
+        Returns:
+            bytes: {"ack": seq} en JSON o 5 bytes en el formato binario.
+        """
+        if client.binary:
+            struct.pack_into(ACK_FORMAT, self.ack, 0, ACK_MAGIC, seq)
+
+            return self.ack
+
+        return b'{"ack":' + str(seq).encode() + b'}'
+
+    def encode_resync (self, device_id):
+        """
+        Petición de un mensaje completo, siempre en JSON: el cliente la
+        distingue de las confirmaciones binarias por su primer byte.
+
+        Args:
+            device_id (int|str): Equipo del que falta algún delta.
+
+        Returns:
+            bytes: {"resync": device_id}.
+        """
+        self.resyncs += 1
+
+        return json.dumps({'resync': device_id}).encode()
+
+    def deliver (self, message, device_id):
+        """
+        Entrega un mensaje decodificado al callback si el equipo está
+        autorizado.
+
+        Args:
+            message (dict|MessageRecord): Mensaje decodificado.
+            device_id (int|str): Equipo que lo envía.
+
+        Returns:
+            bool: True si se ha procesado.
+        """
+        if self.device_filter and not self.device_filter(device_id):
+            self.rejected += 1
+            return False
+
+        try:
+            resync = self.callback(message)
+        except Exception as e:
+            self.callback_errors += 1
+
+            if self.DEBUG:
+                print("Error en el manejo de datos: ", e)
+
+            return False
+
+        if resync and device_id not in self.resync:
+            self.resync.append(device_id)
+
+        seq = message.get('seq') if isinstance(message, dict) else message.seq
+
+        if isinstance(seq, int):
+            self.seq = seq
+
+        return True
+
+    def process_message (self, payload, client=None):
+        """
+        Decodifica un mensaje JSON, o un lote de ellos, y lo entrega al
+        callback.
+
+        Con un decodificador del esquema el callback recibe su MessageRecord
+        y solo los mensajes que no encajan pasan por json.loads.
+
+        Args:
+            payload (memoryview): Mensaje recibido.
+            client (Client): Conexión por la que llega, para los saludos.
+
+        Returns:
+            bool: True si el mensaje es válido y debe confirmarse al cliente.
+        """
+        device_filter = self.device_filter
+        decoder = self.decoder
+        self.received += 1
+
+        # Descartamos los equipos no autorizados antes de decodificar, con
+        # o sin decodificador. En un lote solo veríamos el primero, se
+        # filtran al entregarlos.
+        if device_filter and len(payload) and payload[0] != OPEN_ARRAY:
+            device_id = peek_device_id(payload)
+
+            if device_id is not None and not device_filter(device_id):
+                self.rejected += 1
+                return False
+
+        if decoder:
+            if decoder.begin_batch(payload):
+                return self.process_batch(payload)
+
+            try:
+                record = decoder.decode(payload)
+            except Exception:
+                record = None
+
+            if record is not None:
+                return self.deliver(record, record.device_id)
+
+        try:
+            if self.DEBUG:
+                print("Datos recibidos: ", bytes(payload))
+
+            # json.loads de MicroPython acepta cualquier objeto con buffer,
+            # así evitamos crear un str intermedio.
+            data_dict = json.loads(payload)
+        except Exception as e:
+            self.parse_errors += 1
+
+            if self.DEBUG:
+                print("Error al decodificar el mensaje: ", e)
+
+            return False
+
+        try:
+            if isinstance(data_dict, list):
+                return self.deliver_all(data_dict, 0)
+
+            if "hello" in data_dict:
+                self.negotiate(client, data_dict)
+                return False
+
+            if "device_id" in data_dict:
+                return self.deliver(data_dict, data_dict["device_id"])
+
+            return True
+        except Exception as e:
+            self.callback_errors += 1
+
+            if self.DEBUG:
+                print("Error en el manejo de datos: ", e)
+
+        return False
+
+    def process_batch (self, payload):
+        """
+        Entrega en una sola pasada los mensajes de un lote JSON. Si alguno
+        no encaja en el esquema, el resto del lote se decodifica con
+        json.loads.
+
+        Args:
+            payload (memoryview): Array JSON de mensajes.
+
+        Returns:
+            bool: True si se ha procesado algún mensaje o el lote está vacío.
+        """
+        decoder = self.decoder
+        applied = 0
+        delivered = False
+
+        try:
+            record = decoder.next_in_batch()
+
+            while record is not None:
+                applied += 1
+
+                if self.deliver(record, record.device_id):
+                    delivered = True
+
+                record = decoder.next_in_batch()
+        except ValueError:
+            try:
+                items = json.loads(payload)
+            except Exception:
+                self.parse_errors += 1
+                self.batched += applied
+
+                return delivered
+
+            return self.deliver_all(items, applied) or delivered
+
+        self.batched += applied
+
+        return delivered or not applied
+
+    def deliver_all (self, items, start):
+        """
+        Entrega los mensajes de un lote decodificado con json.loads.
+
+        Args:
+            items (list): Mensajes del lote.
+            start (int): Primer mensaje aún sin entregar.
+
+        Returns:
+            bool: True si se ha procesado algún mensaje o el lote está vacío.
+        """
+        delivered = False
+
+        for i in range(start, len(items)):
+            item = items[i]
+
+            if isinstance(item, dict) and "device_id" in item:
+                if self.deliver(item, item["device_id"]):
+                    delivered = True
+
+        self.batched += len(items)
+
+        return delivered or not items
+
+    def process_binary (self, payload):
+        """
+        Decodifica uno o varios registros binarios seguidos y los entrega
+        al callback.
+
+        Args:
+            payload (memoryview): Registro o lote de registros recibido.
+
+        Returns:
+            bool: True si se ha procesado algún registro.
+        """
+        decoder = self.decoder
+        size = len(payload)
+        offset = 0
+        delivered = False
+        self.received += 1
+
+        if size > RECORD_SIZE:
+            self.batched += size // RECORD_SIZE
+
+        while offset < size:
+            record = decoder.decode_binary(payload, offset)
+
+            if record is None:
+                self.parse_errors += 1
                 break
+
+            if self.deliver(record, record.device_id):
+                delivered = True
+
+            offset += RECORD_SIZE
+
+        return delivered
+
+    def negotiate (self, client, hello):
+        """
+        Responde al saludo con el que un cliente elige el formato de sus
+        mensajes y de las confirmaciones.
+
+        Con "acks" cada lectura se confirma con el seq del último mensaje
+        atendido en lugar de devolver cada mensaje, y el cliente puede
+        enviar varios sin esperar. El formato binario siempre usa estas
+        confirmaciones y solo se acepta con decodificador especializado.
+
+        Tras aceptarlo, en un socket plano los mensajes pasan a ir
+        precedidos por su longitud, ya que un registro binario puede
+        contener saltos de línea; en WebSocket cada frame es un mensaje.
+
+        Args:
+            client (Client): Conexión que saluda.
+            hello (dict): Saludo, {"hello": 1, "format": "binary",
+                          "acks": true}.
+        """
+        if client is None:
+            return
+
+        binary = self.decoder is not None \
+            and hello.get('format') == FORMAT_BINARY
+        acks = binary or hello.get('acks') is True
+        reply = {'hello': BINARY_VERSION,
+                 'format': FORMAT_BINARY if binary else FORMAT_JSON,
+                 'acks': acks}
+
+        if binary:
+            reply['record_size'] = RECORD_SIZE
+
+        reply = json.dumps(reply).encode()
+
+        if client.ws:
+            client.ws.send(reply, OP_TEXT)
+        else:
+            client.reply(reply)
+
+            if binary:
+                client.framer.mode = FRAMING_LENGTH
+
+        client.binary = binary
+        client.acks = acks
+
+    def stats (self):
+        """
+        Returns:
+            dict: Mensajes, errores y conexiones atendidas.
+        """
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'parse_errors': self.parse_errors,
+            'callback_errors': self.callback_errors,
+            'batched': self.batched,
+            'resyncs': self.resyncs,
+            'accepted': self.accepted,
+            'evicted': self.evicted,
+            'connections': len(self.clients),
+        }
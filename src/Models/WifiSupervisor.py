@@ -0,0 +1,104 @@
+import utime
+
+
+class WifiSupervisor:
+    """
+    Vigila la conexión Wi-Fi desde el bucle del servidor y reconecta con
+    espera exponencial cuando se cae.
+
+    Los intentos no bloquean: se lanza la conexión y las siguientes
+    comprobaciones ven si ha terminado, así el servidor sigue atendiendo
+    sus tareas y el socket de escucha, los dispositivos y la pantalla se
+    conservan mientras dura el corte.
+    """
+
+    def __init__ (self, controller, min_backoff_ms=2000, max_backoff_ms=60000,
+                  on_change=None, debug=False):
+        """
+        Args:
+            controller (RpiPico): Controlador con la conexión Wi-Fi.
+            min_backoff_ms (int): Espera tras el primer intento fallido.
+            max_backoff_ms (int): Espera máxima entre intentos.
+            on_change (function): Recibe True al recuperar la conexión y
+                                  False al perderla.
+            debug (bool): Indica si se muestran los mensajes de debug.
+        """
+        self.controller = controller
+        self.min_backoff_ms = min_backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.on_change = on_change
+        self.DEBUG = debug
+
+        self.connected = True
+        self.backoff_ms = min_backoff_ms
+        self.next_attempt = None
+        self.attempts = 0  # Intentos desde que se perdió la conexión
+        self.lost_at = None
+
+        # Contadores para diagnóstico
+        self.drops = 0
+        self.reconnects = 0
+        self.last_downtime_ms = 0
+
+    def check (self, now):
+        """
+        Tarea periódica del servidor.
+
+        Args:
+            now (int): ticks_ms actual.
+        """
+        if self.controller.wifi_is_connected():
+            if not self.connected:
+                self.connected = True
+                self.reconnects += 1
+                self.last_downtime_ms = utime.ticks_diff(now, self.lost_at)
+                self.backoff_ms = self.min_backoff_ms
+                self.attempts = 0
+
+                if self.DEBUG:
+                    print('Wi-Fi recuperado en', self.last_downtime_ms, 'ms')
+
+                if self.on_change:
+                    self.on_change(True)
+
+            return
+
+        if self.connected:
+            self.connected = False
+            self.drops += 1
+            self.lost_at = now
+            self.next_attempt = now
+
+            if self.DEBUG:
+                print('Wi-Fi perdido, reconectando')
+
+            if self.on_change:
+                self.on_change(False)
+
+        if utime.ticks_diff(now, self.next_attempt) < 0:
+            return
+
+        # Alternamos el punto de acceso guardado con dejar elegir al driver,
+        # por si el router ha cambiado de BSSID.
+        try:
+            self.controller.wifi_reconnect(use_cache=self.attempts % 2 == 0)
+        except Exception as e:
+            if self.DEBUG:
+                print('Error al reconectar el Wi-Fi:', e)
+
+        self.attempts += 1
+        self.next_attempt = utime.ticks_add(now, self.backoff_ms)
+        self.backoff_ms = min(self.backoff_ms * 2, self.max_backoff_ms)
+
+    def stats (self):
+        """
+        Returns:
+            dict: Estado de la conexión, cortes y reconexiones.
+        """
+        return {
+            'connected': self.connected,
+            'drops': self.drops,
+            'reconnects': self.reconnects,
+            'attempts': self.attempts,
+            'last_downtime_ms': self.last_downtime_ms,
+        }
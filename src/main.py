@@ -1,11 +1,21 @@
 #from machine import Pin, SPI
 import _thread, gc
-from time import sleep_ms, sleep, time
+from time import sleep_ms
 from Models.Api import Api
 from Models.RpiPico import RpiPico
 from Models.PicoDisplay2 import PicoDisplay2
 from Models.WebSocketServer import WebSocketServer
+from Models.MessageDecoder import MessageDecoder
 from Models.Computer import Computer
+from Models.DeviceRegistry import DeviceRegistry
+from Models.RenderQueue import RenderQueue
+from Models.RenderScheduler import RenderScheduler
+from Models.PageView import PageView
+from Models.PowerManager import PowerManager
+from Models.BootTimer import BootTimer
+from Models.WifiSupervisor import WifiSupervisor
+from Models.Metrics import Metrics, CONTENT_TYPE
+from Models.StateSnapshot import StateSnapshot
 import utime
 
 # Importo variables de entorno
@@ -14,110 +24,200 @@ import env
 # Habilito recolector de basura
 gc.enable()
 
-# Rpi Pico Model
+# Tiempos de cada fase del arranque
+boot = BootTimer(debug=env.DEBUG)
+
+# Rpi Pico Model. El Wi-Fi conecta mientras se prepara el resto.
 controller = RpiPico(ssid=env.AP_NAME, password=env.AP_PASS, debug=env.DEBUG,
                      alternatives_ap=env.ALTERNATIVES_AP,
-                     hostname="Raupulus KeyCounter")
+                     hostname="Raupulus KeyCounter", autoconnect=False)
 #controller = RpiPico(debug=env.DEBUG)
+controller.wifi_begin()
+
+# Temperatura del chip muestreada por un Timer, leerla no bloquea
+controller.start_temp_sampler(period_ms=1000)
+boot.mark('wifi_begin')
 
 # Display Model
 display = PicoDisplay2(controller=controller, debug=env.DEBUG)
-
-sleep_ms(20)
+display.show_status('Conectando', env.AP_NAME)
+boot.mark('display')
 
 # Api
+# El listado de equipos se carga de la flash y se revalida en segundo plano
 api = Api(controller=controller, url=env.API_URL, path=env.API_PATH,
-          token=env.API_TOKEN, device_id=env.DEVICE_ID, debug=env.DEBUG)
+          token=env.API_TOKEN, device_id=env.DEVICE_ID, debug=env.DEBUG,
+          ttl_ms=getattr(env, 'API_CACHE_MINUTES', 15) * 60 * 1000)
 
-sleep_ms(20)
+# Cola entre el núcleo de red (core 0) y el renderizado (core 1)
+render_queue = RenderQueue()
 
-# Variables para el manejo de bloqueo con el segundo core
-thread_lock = _thread.allocate_lock()
-thread_lock_acquired = False
+# Atenúa la pantalla a mitad del tiempo de inactividad y la apaga al final
+time_to_display_off = env.TIME_TO_DISPLAY_OFF * 60 * 1000
+power = PowerManager(display, [(time_to_display_off // 2, 0.5),
+                               (time_to_display_off, None)], debug=env.DEBUG)
+boot.mark('models')
 
-sleep_ms(3000)
+# Esperamos al Wi-Fi; si la red guardada no responde se escanean las redes
+controller.wifi_wait()
+display.show_status('Esperando datos', controller.wifi.ifconfig()[0])
 
-# Timer para apagar la pantalla
-last_conn_time = utime.ticks_ms()
+# La consulta DNS bloquea: se resuelve aquí y no en cada revalidación
+api.resolve()
+boot.mark('wifi')
 
-# Listado de dispositivos recientes
-devices = []
 
+def on_slot (slot, device):
+    """
+    Redibuja una posición de la pantalla cuando cambia de dispositivo.
+    """
+    render_queue.put(slot, (slot, device))
 
-def find_device_by_id (device_id):
-    current_time = utime.time()  # time in seconds since the Epoch
-    ten_minutes_ago = current_time - 300  # 300 seconds is 5 minutes
 
-    current_device = None
-    device_position = None
+# Dispositivos que se muestran a la vez en las páginas de la pantalla
+max_devices = getattr(env, 'DISPLAY_DEVICES', 8)
 
-    # Iterate over a copy of the device list
-    for index, device in enumerate(devices.copy()):
-        device_last_seen_unix = utime.mktime(device.last_seen)
+# Dispositivos recientes, caducan a los 5 minutos sin enviar datos
+registry = DeviceRegistry(ttl_ms=300000, max_slots=max_devices,
+                          on_slot=on_slot)
 
-        if device.device_id == device_id:
-            current_device = device
-            device_position = index  # store the current position
-        elif device_last_seen_unix < ten_minutes_ago:
-            devices.remove(device)
+# Páginas de dos equipos, resumen y gráfica, cambiadas con los botones.
+# Un equipo solo en su página muestra además su gráfica.
+pages = PageView(display, max_devices,
+                 buttons=(display.button_a, display.button_b,
+                          display.button_x, display.button_y),
+                 on_press=power.touch, debug=env.DEBUG)
 
-    return device_position, current_device
+# Renderizado en el segundo core, agrupando los cambios en fotogramas
+scheduler = RenderScheduler(display, render_queue, pages,
+                            fps=getattr(env, 'DISPLAY_FPS', 10), power=power,
+                            debug=env.DEBUG)
 
+# Último estado guardado en la flash: los dispositivos se muestran al
+# arrancar sin esperar a que vuelvan a enviar datos
+snapshot = StateSnapshot(
+    max_writes_per_hour=getattr(env, 'SNAPSHOT_WRITES_PER_HOUR', 12),
+    debug=env.DEBUG)
 
-def updateDisplay(pos, device):
-    thread_lock.acquire()
-    global thread_lock_acquired, last_conn_time
+if snapshot.restore(registry):
+    for device in registry.slots:
+        if device is not None:
+            render_queue.put(device.slot, (device.slot, device))
 
-    try:
-        display.update(pos, device, True if len(devices) is 1 else False)
-        last_conn_time = utime.ticks_ms()
+boot.mark('restore')
 
-    except Exception as e:
-        if env.DEBUG:
-            print('Error in updateDisplay function:', e)
-    finally:
-        thread_lock.release()
-        thread_lock_acquired = False
-
-    while not thread_lock_acquired and display.on:
-        # Apagar la pantalla automáticamente
-        diff = utime.ticks_diff(utime.ticks_ms(), last_conn_time)
-        if diff > env.TIME_TO_DISPLAY_OFF * 60 * 1000:
-            if env.DEBUG:
-                print('Apagando pantalla')
 
-            display.shutdown()
-
-def thread1 (data):
+def on_message (data):
     """
-    Segundo hilo para acciones secundarias.
+    Recibe cada mensaje del servidor en el core 0, actualiza el dispositivo
+    y deja su estado en la cola de renderizado si ha cambiado.
+
+    Returns:
+        bool: True si faltan deltas del equipo y hay que pedirle un mensaje
+              completo.
     """
-    global thread_lock_acquired
+    if env.DEBUG:
+        print('')
+        print('Datos a procesar:', data)
 
-    if not thread_lock_acquired:
-        thread_lock_acquired = True
+    power.touch()
 
-        if env.DEBUG:
-            print('')
-            print('Datos a procesar:', data)
+    # Hito del arranque: primer mensaje atendido
+    boot.mark_once('first_message')
 
+    now = utime.ticks_ms()
+    registry.sweep(now)
+
+    # MessageRecord del decodificador o diccionario si no encajaba
+    if isinstance(data, dict):
         device_id = data['device_id']
-        pos, device = find_device_by_id(device_id)
+    else:
+        device_id = data.device_id
 
-        if device is None:
-            device = Computer(data)
-            devices.append(device)
-        else:
-            device.update(data)
+    device = registry.get(device_id)
+
+    if device is None:
+        device = Computer(data)
+        registry.add(device, now)
+        changed = True
+    else:
+        changed = device.update(data)
+        registry.touch(device, now)
+
+    if env.DEBUG:
+        print('devices:', len(registry))
+        print('device:', device)
+
+    if changed:
+        snapshot.mark_dirty()
+
+    # Los dispositivos sin posición en pantalla esperan a que quede una libre
+    # y los mensajes sin cambios no se redibujan
+    if device.slot is not None and changed and not render_queue.put(
+            device.slot, (device.slot, device)) and env.DEBUG:
+        print('Cola de renderizado llena:', render_queue.stats())
+
+    return device.resync_due()
 
-        if env.DEBUG:
-            print('devices:', devices)
-            print('device:', device)
 
-        #display.update(pos, device, True if len(devices) is 1 else False)
+# Servidor creado una única vez: el socket de escucha, los dispositivos y la
+# pantalla se conservan aunque falle el bucle o se caiga el Wi-Fi.
+# Solo se aceptan los equipos autorizados en la api y los mensajes se
+# decodifican sin pasar por json.loads salvo que no encajen en el esquema.
+websocket_server = WebSocketServer(on_message, device_filter=api.is_allowed,
+                                   decoder=MessageDecoder(), debug=env.DEBUG)
+
+
+def on_wifi_change (connected):
+    """
+    Al perder el Wi-Fi las conexiones abiertas ya no sirven; al recuperarlo
+    avisamos a la api por si ha cambiado la IP. La dirección del servidor
+    solo se vuelve a resolver aquí, una vez por reconexión.
+    """
+    if connected:
+        api.resolve()
+        api.invalidate()
+    else:
+        websocket_server.close_clients()
+
+
+wifi_supervisor = WifiSupervisor(controller, on_change=on_wifi_change,
+                                 debug=env.DEBUG)
+
+# Caducamos dispositivos aunque no lleguen mensajes
+websocket_server.every(5000, registry.sweep)
+
+# Revalida el listado de equipos de la api cuando caduca. La petición no
+# bloquea y avanza un paso en cada llamada, por eso el intervalo es corto.
+websocket_server.every(200, api.revalidate)
+
+# Reconecta el Wi-Fi sin detener el servidor
+websocket_server.every(1000, wifi_supervisor.check)
+
+# Guarda el estado en la flash si ha cambiado, con escrituras acotadas
+websocket_server.every(60000, lambda now: snapshot.tick(registry, now))
+
+# Métricas en /metrics del mismo puerto. Los contadores se leen de cada
+# modelo al pedirlas, el camino de los mensajes no cambia.
+metrics = Metrics(controller=controller, debug=env.DEBUG)
+metrics.register('server', websocket_server.stats,
+                 ('received', 'rejected', 'parse_errors', 'callback_errors',
+                  'batched', 'resyncs', 'accepted', 'evicted'))
+metrics.register('queue', render_queue.stats,
+                 ('posted', 'coalesced', 'dropped'))
+metrics.register('render', scheduler.stats, ('frames', 'updates'))
+metrics.register('pages', pages.stats, ('switches', 'background_updates'))
+metrics.register('devices', lambda: {'active': len(registry)})
+metrics.register('wifi', wifi_supervisor.stats, ('drops', 'reconnects'))
+metrics.register('api', api.stats, ('fetches', 'not_modified', 'errors'))
+metrics.register('boot_ms', boot.stats)
+metrics.register('snapshot', snapshot.stats,
+                 ('writes', 'bytes_written', 'errors'))
+websocket_server.route(b'/metrics', metrics.render, CONTENT_TYPE)
+
+# Recolección de basura en momentos tranquilos, midiendo cada pausa
+websocket_server.every(10000, metrics.collect_garbage)
 
-        # Iniciar un nuevo hilo que llama a updateDisplay(data)
-        _thread.start_new_thread(updateDisplay, (pos, device))
 
 def thread0 ():
     """
@@ -130,11 +230,16 @@ def thread0 ():
 
     print(devices_info)
 
-    # Iniciamos el servidor WebSocket en un nuevo hilo
-    websocket_server = WebSocketServer(thread1)
+    websocket_server.listen()
+
+    if boot.mark_once('server'):
+        boot.report()
 
     websocket_server.start()
 
+# Un único hilo de renderizado para todo el ciclo de vida del programa
+_thread.start_new_thread(scheduler.run, ())
+
 while True:
     try:
         thread0()
@@ -146,9 +251,10 @@ while True:
         if env.DEBUG:
             print('Memoria antes de liberar: ', gc.mem_free())
 
-        gc.collect()
+        metrics.collect_garbage()
 
         if env.DEBUG:
             print("Memoria después de liberar:", gc.mem_free())
 
-        sleep(5)
+        # Nada se reconstruye al reanudar, basta con una pausa corta
+        sleep_ms(100)
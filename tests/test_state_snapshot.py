@@ -0,0 +1,55 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'Emulation', 'modules'),
+                os.path.join(ROOT, 'src')]
+
+from Models.Computer import Computer  # noqa: E402
+from Models.DeviceRegistry import DeviceRegistry  # noqa: E402
+from Models.StateSnapshot import StateSnapshot  # noqa: E402
+
+
+def make_registry (*devices):
+    registry = DeviceRegistry(max_slots=4)
+
+    for data in devices:
+        registry.add(Computer(data), 0)
+
+    return registry
+
+
+def test_float_id_and_out_of_range_total (tmp_path):
+    registry = make_registry(
+        {'device_id': 3.0, 'session': {'pulsations_total': 2 ** 40},
+         'streak': {'pulsations_current': 5, 'pulsation_average': 1.5}},
+        {'device_id': 4, 'session': {'pulsations_total': 10}})
+    snapshot = StateSnapshot(path=str(tmp_path / 'snapshot'))
+
+    assert snapshot.save(registry)
+
+    restored = DeviceRegistry(max_slots=4)
+    assert StateSnapshot(path=str(tmp_path / 'snapshot')).restore(
+        restored) == 2
+
+    device = restored.get(3)
+    assert device.device_id == 3 and isinstance(device.device_id, int)
+    assert device.pulsations_total is None
+    assert device.pulsations_current == 5
+    assert device.pulsation_average == 1.5
+    assert restored.get(4).pulsations_total == 10
+
+
+def test_unencodable_device_is_skipped (tmp_path):
+    registry = make_registry({'device_id': 2.5}, {'device_id': 'abc'},
+                             {'device_id': 7, 'seq': -1})
+    snapshot = StateSnapshot(path=str(tmp_path / 'snapshot'))
+
+    assert snapshot.save(registry)
+    assert snapshot.stats()['skipped'] == 1
+
+    restored = DeviceRegistry(max_slots=4)
+    StateSnapshot(path=str(tmp_path / 'snapshot')).restore(restored)
+
+    assert [device.device_id for device in restored] == ['abc', 7]
+    assert restored.get(7).seq is None